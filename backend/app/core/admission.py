@@ -0,0 +1,157 @@
+"""
+Admission Control
+Adaptive concurrency limit in front of the routers, so a slow database turns
+into quick 503s for optional work instead of every request queueing until it
+times out.
+
+The limit follows AIMD on time to first byte: it grows by 1/limit per request
+answered within ADMISSION_TARGET_LATENCY_MS while the limit is in use, and
+shrinks by ADMISSION_BACKOFF (at most once per target latency) when answers
+are slower. Each priority may fill only its share of the limit, so low
+priority reads (insights, year overview, exports, debug) are shed first and
+habit and hive logging keep the last slots.
+"""
+
+import re
+import time
+from enum import IntEnum
+from typing import Callable, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.responses import ORJSONResponse
+
+
+class Priority(IntEnum):
+    LOW = 0
+    NORMAL = 1
+    HIGH = 2
+
+
+# (method, path pattern, priority); the first match wins, anything else is NORMAL
+ROUTE_PRIORITIES: Tuple[Tuple[str, "re.Pattern[str]", Priority], ...] = (
+    ("POST", re.compile(r"^/api/habits/[^/]+/log$"), Priority.HIGH),
+    ("DELETE", re.compile(r"^/api/habits/[^/]+/log$"), Priority.HIGH),
+    ("POST", re.compile(r"^/api/hives/[^/]+/log$"), Priority.HIGH),
+    ("POST", re.compile(r"^/api/auth/"), Priority.HIGH),
+    ("GET", re.compile(r"^/api/habits/insights/"), Priority.LOW),
+    ("GET", re.compile(r"^/api/activity/(year-overview|milestones)$"), Priority.LOW),
+    ("GET", re.compile(r"^/api/hives/leaderboard$"), Priority.LOW),
+    ("GET", re.compile(r"^/api/export/?$"), Priority.LOW),
+    ("GET", re.compile(r"^/api/notifications/(logs|debug/)"), Priority.LOW),
+    ("POST", re.compile(r"^/api/notifications/test$"), Priority.LOW),
+)
+
+# Share of the limit requests of each priority may fill
+PRIORITY_SHARE = {Priority.LOW: 0.5, Priority.NORMAL: 0.9, Priority.HIGH: 1.0}
+
+# Not admitted through the limiter: liveness checks, docs and long-lived
+# event streams, which would hold a slot for as long as the client listens
+EXEMPT_PATHS = {"/", "/health", "/docs", "/redoc", "/openapi.json"}
+EXEMPT_PATTERN = re.compile(r"^/api/hives/[^/]+/events$")
+
+
+def route_priority(method: str, path: str) -> Priority:
+    for route_method, pattern, priority in ROUTE_PRIORITIES:
+        if method == route_method and pattern.match(path):
+            return priority
+    return Priority.NORMAL
+
+
+class AdaptiveLimiter:
+    """In-flight request count against an AIMD concurrency limit."""
+
+    def __init__(
+        self,
+        initial_limit: float,
+        min_limit: float,
+        max_limit: float,
+        target_latency: float,
+        backoff: float = 0.9,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.in_flight = 0
+        self.shed = 0
+        self._clock = clock
+        self._last_decrease = float("-inf")
+
+    def try_acquire(self, priority: Priority) -> bool:
+        if self.in_flight >= max(1, int(self.limit * PRIORITY_SHARE[priority])):
+            self.shed += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, latency: float) -> None:
+        """Free a slot and adapt the limit to the request's time to first byte."""
+        self.in_flight -= 1
+        if latency > self.target_latency:
+            now = self._clock()
+            # One decrease per target latency, so a burst of slow answers to
+            # requests admitted together does not collapse the limit
+            if now - self._last_decrease >= self.target_latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.in_flight * 2 >= self.limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+
+def create_limiter() -> AdaptiveLimiter:
+    return AdaptiveLimiter(
+        initial_limit=settings.ADMISSION_INITIAL_LIMIT,
+        min_limit=settings.ADMISSION_MIN_LIMIT,
+        max_limit=settings.ADMISSION_MAX_LIMIT,
+        target_latency=settings.ADMISSION_TARGET_LATENCY_MS / 1000,
+        backoff=settings.ADMISSION_BACKOFF,
+    )
+
+
+class AdmissionMiddleware:
+    """ASGI middleware answering 503 when a request's priority is over its share of the limit."""
+
+    def __init__(self, app: ASGIApp, limiter: AdaptiveLimiter = None):
+        self.app = app
+        self.limiter = limiter or create_limiter()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope.get("path", "")
+        if (
+            scope["type"] != "http"
+            or not settings.ADMISSION_ENABLED
+            or path in EXEMPT_PATHS
+            or EXEMPT_PATTERN.match(path)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiter
+        if not limiter.try_acquire(route_priority(scope["method"], path)):
+            response = ORJSONResponse(
+                {"detail": "Server is busy, retry shortly"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        first_byte = None
+
+        async def send_timed(message: Message) -> None:
+            nonlocal first_byte
+            if first_byte is None and message["type"] == "http.response.start":
+                first_byte = time.monotonic()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            # Streamed bodies hold their slot until done, but only the time to
+            # first byte reflects upstream latency
+            limiter.release((first_byte or time.monotonic()) - started)
@@ -31,6 +31,32 @@ def verify_test_token(token: str) -> Dict[str, Any]:
             detail="Invalid authentication token"
         )
 
+def verify_access_token(token: str) -> Dict[str, Any]:
+    """
+    Decode a bearer token after checking its signature, as PostgREST does:
+    Supabase tokens against SUPABASE_JWT_SECRET with aud "authenticated",
+    TEST_MODE tokens against JWT_SECRET_KEY. Expiry allows
+    AUTH_TOKEN_MAX_SKEW_SECONDS of clock skew, like get_current_user.
+    Raises jwt.InvalidTokenError for forged, unsigned or expired tokens.
+    """
+    if settings.TEST_MODE:
+        return pyjwt.decode(
+            token,
+            settings.JWT_SECRET_KEY,
+            algorithms=["HS256"],
+            options={"verify_exp": False, "verify_aud": False, "require": ["sub"]},
+        )
+    if not settings.SUPABASE_JWT_SECRET:
+        raise RuntimeError("SUPABASE_JWT_SECRET is required to verify access tokens")
+    return pyjwt.decode(
+        token,
+        settings.SUPABASE_JWT_SECRET,
+        algorithms=["HS256"],
+        audience="authenticated",
+        leeway=settings.AUTH_TOKEN_MAX_SKEW_SECONDS,
+        options={"require": ["sub", "exp"]},
+    )
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
     """Get current user from JWT token"""
     token = credentials.credentials
@@ -7,10 +7,67 @@ class Settings(BaseSettings):
     SUPABASE_ANON_KEY: str = os.getenv("SUPABASE_ANON_KEY", "")
     SUPABASE_SERVICE_KEY: str = os.getenv("SUPABASE_SERVICE_KEY", "")
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "habithive-test-secret-key-2024")
+    # Supabase project JWT secret, for verifying access tokens the API itself
+    # trusts (STORAGE_BACKEND=postgres connects without PostgREST's check)
+    SUPABASE_JWT_SECRET: str = os.getenv("SUPABASE_JWT_SECRET", "")
     TEST_MODE: bool = os.getenv("TEST_MODE", "false").lower() == "true"
     AUTH_TOKEN_MAX_SKEW_SECONDS: int = int(os.getenv("AUTH_TOKEN_MAX_SKEW_SECONDS", "14400"))
     PORT: int = int(os.getenv("PORT", "8002"))
 
+    # Data access backend used outside TEST_MODE (see app/repositories)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "postgrest")
+
+    # Direct Postgres connection for STORAGE_BACKEND=postgres
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    DATABASE_POOL_MIN_SIZE: int = int(os.getenv("DATABASE_POOL_MIN_SIZE", "2"))
+    DATABASE_POOL_MAX_SIZE: int = int(os.getenv("DATABASE_POOL_MAX_SIZE", "10"))
+    DATABASE_POOL_MAX_IDLE_SECONDS: float = float(os.getenv("DATABASE_POOL_MAX_IDLE_SECONDS", "300"))
+    DATABASE_COMMAND_TIMEOUT: float = float(os.getenv("DATABASE_COMMAND_TIMEOUT", "10"))
+    DATABASE_STATEMENT_CACHE_SIZE: int = int(os.getenv("DATABASE_STATEMENT_CACHE_SIZE", "100"))
+
+    # Process-wide profile display cache (rosters, leaderboards, activity)
+    PROFILE_CACHE_MAX_ENTRIES: int = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "10000"))
+    PROFILE_CACHE_TTL_SECONDS: float = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300"))
+
+    # Contact matching: pepper shared with the app's contact hashes, and the
+    # per-process Bloom filter over profile_phone_hashes
+    CONTACT_HASH_PEPPER: str = os.getenv("CONTACT_HASH_PEPPER", "dev_contact_pepper")
+    CONTACT_BLOOM_REFRESH_SECONDS: float = float(os.getenv("CONTACT_BLOOM_REFRESH_SECONDS", "300"))
+    CONTACT_BLOOM_ERROR_RATE: float = float(os.getenv("CONTACT_BLOOM_ERROR_RATE", "0.01"))
+    CONTACT_MATCH_MAX_BATCH: int = int(os.getenv("CONTACT_MATCH_MAX_BATCH", "5000"))
+
+    # Per-request limits for contact uploads and differential sync chunks
+    CONTACT_UPLOAD_MAX_CONTACTS: int = int(os.getenv("CONTACT_UPLOAD_MAX_CONTACTS", "5000"))
+    CONTACT_UPLOAD_MAX_BYTES: int = int(os.getenv("CONTACT_UPLOAD_MAX_BYTES", "1048576"))
+
+    # Largest CSV accepted by POST /api/habits/import
+    HABIT_IMPORT_MAX_BYTES: int = int(os.getenv("HABIT_IMPORT_MAX_BYTES", "10485760"))
+
+    # Per-user token buckets (app/core/rate_limit.py), off unless enabled;
+    # "memory" keeps them per process, "shared" in Postgres for every worker
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_RATE_PER_SECOND: float = float(os.getenv("RATE_LIMIT_RATE_PER_SECOND", "5"))
+    RATE_LIMIT_BURST: float = float(os.getenv("RATE_LIMIT_BURST", "200"))
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    # Proxies in front of the app that append to X-Forwarded-For (1 on
+    # Railway); 0 keys anonymous callers by the socket peer
+    RATE_LIMIT_PROXY_HOPS: int = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "0"))
+
+    # Adaptive concurrency limit and load shedding (app/core/admission.py),
+    # off unless enabled like the rate limiter
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "false").lower() == "true"
+    ADMISSION_INITIAL_LIMIT: float = float(os.getenv("ADMISSION_INITIAL_LIMIT", "40"))
+    ADMISSION_MIN_LIMIT: float = float(os.getenv("ADMISSION_MIN_LIMIT", "4"))
+    ADMISSION_MAX_LIMIT: float = float(os.getenv("ADMISSION_MAX_LIMIT", "200"))
+    ADMISSION_TARGET_LATENCY_MS: float = float(os.getenv("ADMISSION_TARGET_LATENCY_MS", "500"))
+    ADMISSION_BACKOFF: float = float(os.getenv("ADMISSION_BACKOFF", "0.9"))
+
+    # Seed TEST_MODE stores with a synthetic dataset on startup (0 disables)
+    TEST_MODE_DATASET_USERS: int = int(os.getenv("TEST_MODE_DATASET_USERS", "0"))
+    TEST_MODE_DATASET_YEARS: float = float(os.getenv("TEST_MODE_DATASET_YEARS", "1"))
+    TEST_MODE_DATASET_SEED: int = int(os.getenv("TEST_MODE_DATASET_SEED", "42"))
+
     # OneSignal configuration
     ONESIGNAL_APP_ID: str = os.getenv("ONESIGNAL_APP_ID", "")
     ONESIGNAL_REST_API_KEY: str = os.getenv("ONESIGNAL_REST_API_KEY", "")
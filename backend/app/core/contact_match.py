@@ -0,0 +1,209 @@
+"""
+Contact Matching
+Hashing and prefiltering for matching uploaded contacts against the
+profile_phone_hashes index.
+
+Phones are hashed the way the app hashes address book entries,
+sha256(pepper || e164) as lowercase hex. Each process keeps a Bloom filter of
+every indexed hash so that most of a contact batch (people who are not
+registered) is rejected without a database round trip; only the survivors go
+to match_contact_hashes. The filter is loaded in a worker thread (the
+PostgREST client is synchronous), first at startup and then whenever it is
+older than CONTACT_BLOOM_REFRESH_SECONDS.
+
+Profiles that existed before the index are hashed by
+backfill_phone_hashes, which the app runs at startup while the index is
+empty. After rotating CONTACT_HASH_PEPPER, rebuild it by hand:
+    select public.rebuild_profile_phone_hashes('<new pepper>');
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Iterable, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.supabase import get_supabase_admin
+
+logger = logging.getLogger(__name__)
+
+# Rows per request when loading the index through PostgREST
+LOAD_PAGE_SIZE = 1000
+
+
+def phone_hash(phone: Optional[str]) -> Optional[str]:
+    """sha256(pepper || e164) for a profile phone; None when there is no phone."""
+    phone = (phone or "").strip()
+    if not phone:
+        return None
+    return hashlib.sha256(f"{settings.CONTACT_HASH_PEPPER}{phone}".encode()).hexdigest()
+
+
+class BloomFilter:
+    """
+    Bloom filter over sha256 hex digests.
+
+    The inputs are already uniformly distributed, so the k probe positions
+    come from double hashing two 64 bit slices of the digest instead of
+    hashing again.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: str) -> Iterable[int]:
+        h1 = int(digest[:16], 16)
+        h2 = int(digest[16:32], 16) | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, digest: str) -> None:
+        for position in self._positions(digest):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+
+class PhoneHashFilter:
+    """
+    Process-wide Bloom filter of profile_phone_hashes, rebuilt from the table
+    every CONTACT_BLOOM_REFRESH_SECONDS.
+
+    Hashes written by this process are added immediately; a phone registered
+    through another process can be missed until the next rebuild, so a
+    contact that does not match now will match on a later sync.
+    """
+
+    def __init__(self, refresh_seconds: float, error_rate: float):
+        self.refresh_seconds = refresh_seconds
+        self.error_rate = error_rate
+        self._filter: Optional[BloomFilter] = None
+        self._built_at = 0.0
+        self._lock = asyncio.Lock()
+        self._added: Optional[List[str]] = None
+
+    def add(self, digest: str) -> None:
+        if self._filter is not None:
+            self._filter.add(digest)
+        if self._added is not None:
+            self._added.append(digest)
+
+    def invalidate(self) -> None:
+        self._filter = None
+
+    async def _current(self) -> BloomFilter:
+        if self._filter is None or time.monotonic() - self._built_at >= self.refresh_seconds:
+            async with self._lock:
+                if self._filter is None or time.monotonic() - self._built_at >= self.refresh_seconds:
+                    self._added = []
+                    try:
+                        bloom = await run_in_threadpool(self._build)
+                        # Hashes written while the table was being read
+                        for digest in self._added:
+                            bloom.add(digest)
+                        self._filter, self._built_at = bloom, time.monotonic()
+                    finally:
+                        self._added = None
+        return self._filter
+
+    def _build(self) -> BloomFilter:
+        hashes = load_phone_hashes()
+        bloom = BloomFilter(int(len(hashes) * 1.25) + 1024, self.error_rate)
+        for digest in hashes:
+            bloom.add(digest)
+        return bloom
+
+    async def warm(self) -> None:
+        """Build the filter ahead of the first match request."""
+        await self._current()
+
+    async def candidates(self, digests: Iterable[str]) -> List[str]:
+        """The digests that may be registered (no false negatives as of the last rebuild)."""
+        bloom = await self._current()
+        return [digest for digest in digests if digest in bloom]
+
+
+def load_phone_hashes() -> List[str]:
+    """Every indexed hash, paged by primary key through the service role."""
+    admin = get_supabase_admin()
+    hashes: List[str] = []
+    last = ""
+    while True:
+        response = (
+            admin.table("profile_phone_hashes")
+            .select("phone_hash")
+            .gt("phone_hash", last)
+            .order("phone_hash")
+            .limit(LOAD_PAGE_SIZE)
+            .execute()
+        )
+        page = [row["phone_hash"] for row in response.data or []]
+        hashes.extend(page)
+        if len(page) < LOAD_PAGE_SIZE:
+            return hashes
+        last = page[-1]
+
+
+def backfill_phone_hashes() -> Optional[int]:
+    """
+    Hash every profile phone into an empty index (profiles created before
+    profile_phone_hashes existed); returns the rows written, or None when the
+    index already has rows.
+    """
+    admin = get_supabase_admin()
+    if admin.table("profile_phone_hashes").select("phone_hash").limit(1).execute().data:
+        return None
+    response = admin.rpc(
+        "rebuild_profile_phone_hashes",
+        {"p_pepper": settings.CONTACT_HASH_PEPPER},
+    ).execute()
+    return response.data
+
+
+async def prepare_contact_matching() -> None:
+    """Startup task: backfill the phone index if needed, then load the filter."""
+    try:
+        written = await run_in_threadpool(backfill_phone_hashes)
+        if written is not None:
+            logger.info("Backfilled %s profile phone hashes", written)
+            phone_hash_filter.invalidate()
+        await phone_hash_filter.warm()
+    except Exception:
+        # Matching still works: the filter is loaded on the first request
+        logger.exception("Contact matching warm-up failed")
+
+
+async def sync_phone_hash(user_id: str, phone: Optional[str]) -> bool:
+    """
+    Point the index at a profile's current phone (or drop it). The profile
+    write has already succeeded, so a failure is logged rather than raised;
+    the row stays stale until the phone is saved again or the index is
+    rebuilt (rebuild_profile_phone_hashes).
+    """
+    digest = phone_hash(phone)
+    try:
+        await run_in_threadpool(
+            lambda: get_supabase_admin().rpc(
+                "set_profile_phone_hash",
+                {"p_user_id": str(user_id), "p_phone_hash": digest},
+            ).execute()
+        )
+    except Exception:
+        logger.exception("Could not index the phone hash of profile %s", user_id)
+        return False
+    if digest:
+        phone_hash_filter.add(digest)
+    return True
+
+
+phone_hash_filter = PhoneHashFilter(
+    refresh_seconds=settings.CONTACT_BLOOM_REFRESH_SECONDS,
+    error_rate=settings.CONTACT_BLOOM_ERROR_RATE,
+)
@@ -0,0 +1,94 @@
+"""
+Contact Sync
+Bucketing and request parsing for differential contact uploads.
+
+Contact hashes fall into 256 buckets by their first two hex characters. The
+app sends one digest per non-empty bucket (sha256 of the bucket's sorted
+hashes joined with newlines, as SQL contact_bucket_digests computes it), and
+uploads only the buckets the server reports as different. Chunks are NDJSON,
+one {"contact_hash", "display_name"} object per line, parsed as the body
+streams in so oversized uploads are cut off early.
+"""
+
+import hashlib
+import json
+import re
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+BUCKET_PREFIX_LENGTH = 2
+
+_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+_BUCKET_PATTERN = re.compile(r"^[0-9a-f]{%d}$" % BUCKET_PREFIX_LENGTH)
+
+
+class ChunkTooLarge(ValueError):
+    """The chunk is over the byte or contact limit"""
+
+
+def normalize_hash(value: str) -> Optional[str]:
+    """Lowercase sha256 hex digest, or None when the value is not one."""
+    value = value.strip().lower()
+    return value if _HASH_PATTERN.match(value) else None
+
+
+def is_bucket(value: str) -> bool:
+    return bool(_BUCKET_PATTERN.match(value))
+
+
+def bucket_of(contact_hash: str) -> str:
+    return contact_hash[:BUCKET_PREFIX_LENGTH]
+
+
+def bucket_digest(hashes: Iterable[str]) -> str:
+    return hashlib.sha256("\n".join(sorted(hashes)).encode()).hexdigest()
+
+
+def bucket_digests(hashes: Iterable[str]) -> Dict[str, str]:
+    """Digest per non-empty bucket, the same value the app sends."""
+    buckets: Dict[str, List[str]] = {}
+    for contact_hash in hashes:
+        buckets.setdefault(bucket_of(contact_hash), []).append(contact_hash)
+    return {bucket: bucket_digest(members) for bucket, members in buckets.items()}
+
+
+async def parse_chunk(
+    stream: AsyncIterator[bytes],
+    max_bytes: int,
+    max_contacts: int,
+) -> Dict[str, Optional[str]]:
+    """
+    contact_hash -> display_name from an NDJSON body, read incrementally.
+    Raises ChunkTooLarge past either limit and ValueError for malformed lines.
+    """
+    contacts: Dict[str, Optional[str]] = {}
+    received = 0
+    pending = b""
+
+    def take(line: bytes) -> None:
+        line = line.strip()
+        if not line:
+            return
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON line: {e.msg}") from e
+        if not isinstance(item, dict) or not isinstance(item.get("contact_hash"), str):
+            raise ValueError("Each line needs a contact_hash")
+        contact_hash = normalize_hash(item["contact_hash"])
+        if contact_hash is None:
+            raise ValueError("contact_hash must be a sha256 hex digest")
+        display_name = item.get("display_name")
+        contacts[contact_hash] = display_name if isinstance(display_name, str) else None
+        if len(contacts) > max_contacts:
+            raise ChunkTooLarge(f"More than {max_contacts} contacts in one chunk")
+
+    async for piece in stream:
+        received += len(piece)
+        if received > max_bytes:
+            raise ChunkTooLarge(f"Chunk larger than {max_bytes} bytes")
+        pending += piece
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            take(line)
+    take(pending)
+    return contacts
@@ -0,0 +1,101 @@
+"""
+Direct Postgres Access
+asyncpg connection pool used by the "postgres" storage backend.
+
+Every request runs inside a transaction that switches to the `authenticated`
+role and publishes the caller's JWT claims the same way PostgREST does, so
+auth.uid() and row level security behave exactly as they do over HTTP. The
+token's signature is verified first, since nothing in between checks it.
+"""
+
+import json
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, AsyncIterator
+
+import asyncpg
+import jwt
+
+from app.core.auth import verify_access_token
+from app.core.config import settings
+
+
+_pool: Optional[asyncpg.Pool] = None
+
+# The role is fixed: token claims never pick the database role
+SET_REQUEST_CLAIMS = """
+select
+  set_config('role', 'authenticated', true),
+  set_config('request.jwt.claims', $1, true),
+  set_config('request.jwt.claim.sub', $2, true),
+  set_config('request.jwt.claim.role', 'authenticated', true)
+"""
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """Decode json/jsonb columns into Python objects like PostgREST does."""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=json.dumps,
+            decoder=json.loads,
+            schema="pg_catalog",
+        )
+
+
+async def init_pool() -> asyncpg.Pool:
+    """Create the process-wide pool (called from the app lifespan)."""
+    global _pool
+    if _pool is None:
+        if not settings.DATABASE_URL:
+            raise RuntimeError("DATABASE_URL is required when STORAGE_BACKEND=postgres")
+        if not settings.SUPABASE_JWT_SECRET:
+            raise RuntimeError("SUPABASE_JWT_SECRET is required when STORAGE_BACKEND=postgres")
+        _pool = await asyncpg.create_pool(
+            dsn=settings.DATABASE_URL,
+            min_size=settings.DATABASE_POOL_MIN_SIZE,
+            max_size=settings.DATABASE_POOL_MAX_SIZE,
+            max_inactive_connection_lifetime=settings.DATABASE_POOL_MAX_IDLE_SECONDS,
+            command_timeout=settings.DATABASE_COMMAND_TIMEOUT,
+            # Hot queries are module-level constants, so they are prepared once
+            # per connection and reused from this cache. Set to 0 behind
+            # PgBouncer in transaction mode.
+            statement_cache_size=settings.DATABASE_STATEMENT_CACHE_SIZE,
+            init=_init_connection,
+        )
+    return _pool
+
+
+async def close_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def get_pool() -> asyncpg.Pool:
+    if _pool is None:
+        raise RuntimeError("Database pool is not initialised")
+    return _pool
+
+
+def request_claims(current_user: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    JWT claims for the caller, read from their access token once its
+    signature and audience check out (PostgREST would check them; a direct
+    connection has to). The role is always `authenticated`, whatever the
+    token says. Raises jwt.InvalidTokenError for a token that does not verify
+    or belongs to someone else.
+    """
+    payload = verify_access_token(current_user.get("access_token") or "")
+    if str(payload["sub"]) != str(current_user["id"]):
+        raise jwt.InvalidTokenError("Token subject does not match the caller")
+    return {**payload, "role": "authenticated"}
+
+
+@asynccontextmanager
+async def user_transaction(claims: Dict[str, Any]) -> AsyncIterator[asyncpg.Connection]:
+    """Acquire a connection and open a transaction scoped to verified request_claims."""
+    async with get_pool().acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(SET_REQUEST_CLAIMS, json.dumps(claims, default=str), str(claims["sub"]))
+            yield conn
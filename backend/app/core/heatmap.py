@@ -0,0 +1,64 @@
+"""
+Compact Heatmaps
+Dense day-indexed series for the opt-in compact heatmap format.
+
+A series covers `days` consecutive days from a start date and is accumulated
+into one preallocated array, so building a year of data allocates a few
+hundred bytes per series instead of a dict entry and ISO key per day. It is
+sent as base64 of:
+
+    bits  one bit per day (day 0 = least significant bit of byte 0), for
+          checkbox habits whose values are only ever 0 or 1
+    u8    one byte per day
+    u16   two bytes per day, little-endian, when a value exceeds 255;
+          values above 65535 are sent as 65535
+"""
+
+import base64
+import sys
+from array import array
+from datetime import date
+from typing import Dict
+
+
+class DenseSeries:
+    """Per-day counters for [start, start + days)"""
+
+    def __init__(self, start: date, days: int, fill: int = 0):
+        self.start = start
+        self.values = array("L", [fill]) * days
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def add(self, day: date, value: int) -> None:
+        index = (day - self.start).days
+        if 0 <= index < len(self.values):
+            self.values[index] += value
+
+    def set(self, day: date, value: int) -> None:
+        index = (day - self.start).days
+        if 0 <= index < len(self.values):
+            self.values[index] = value
+
+    def max(self) -> int:
+        return max(self.values, default=0)
+
+    def encode(self, bits: bool = False) -> Dict[str, str]:
+        """
+        {encoding, data} in the narrowest encoding that holds every value.
+        u16 is the widest: a day above 65535 is capped at 65535 (max() still
+        reports the true value, so max_total can exceed what the series holds).
+        """
+        if bits and self.max() <= 1:
+            packed = bytearray((len(self.values) + 7) // 8)
+            for index, value in enumerate(self.values):
+                if value:
+                    packed[index >> 3] |= 1 << (index & 7)
+            return {"encoding": "bits", "data": base64.b64encode(packed).decode()}
+        if self.max() <= 0xFF:
+            return {"encoding": "u8", "data": base64.b64encode(array("B", self.values).tobytes()).decode()}
+        wide = array("H", (min(value, 0xFFFF) for value in self.values))
+        if sys.byteorder == "big":
+            wide.byteswap()
+        return {"encoding": "u16", "data": base64.b64encode(wide.tobytes()).decode()}
@@ -0,0 +1,148 @@
+"""
+Hive Event Broker
+In-process fan-out of small hive deltas to Server-Sent Event subscribers.
+
+Events are only delivered to subscribers connected to the process that
+handled the write, so the API must run as a single worker (the Procfile
+starts one uvicorn process; main warns when WEB_CONCURRENCY asks for more).
+Scaling out needs a shared channel such as Postgres LISTEN/NOTIFY in front
+of publish.
+
+A stream ends when its member leaves, when the hive is deleted, or when a
+periodic membership check (MEMBERSHIP_CHECK_SECONDS) finds the member gone,
+which also covers removals made outside this process.
+"""
+
+import asyncio
+import json
+import time
+from datetime import date, datetime
+from typing import Awaitable, Callable, Dict, Any, Set, Optional, AsyncIterator
+from uuid import UUID
+
+# Events a subscriber may fall behind by before it is dropped; the client
+# reconnects and refetches the hive detail instead of us buffering for it.
+SUBSCRIBER_QUEUE_SIZE = 32
+HEARTBEAT_SECONDS = 15.0
+MEMBERSHIP_CHECK_SECONDS = 60.0
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def format_event(event: str, data: Dict[str, Any]) -> bytes:
+    """Encode one SSE frame."""
+    payload = json.dumps(data, default=_default, separators=(",", ":"))
+    return f"event: {event}\ndata: {payload}\n\n".encode()
+
+
+class HiveEventBroker:
+    """
+    hive_id -> subscriber queues.
+
+    Each event is encoded once and the same bytes object is queued for every
+    subscriber, so a connection costs one bounded queue and nothing else.
+    A subscriber whose queue is full is closed rather than allowed to grow.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        # queue -> subscribing user, for closing a member's streams
+        self._users: Dict[asyncio.Queue, Optional[str]] = {}
+
+    def subscriber_count(self, hive_id: Optional[str] = None) -> int:
+        if hive_id is not None:
+            return len(self._subscribers.get(str(hive_id), ()))
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def subscribe(self, hive_id: str, user_id: Optional[str] = None) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(str(hive_id), set()).add(queue)
+        self._users[queue] = str(user_id) if user_id is not None else None
+        return queue
+
+    def unsubscribe(self, hive_id: str, queue: asyncio.Queue) -> None:
+        self._users.pop(queue, None)
+        queues = self._subscribers.get(str(hive_id))
+        if not queues:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[str(hive_id)]
+
+    def _close(self, hive_id: str, queue: asyncio.Queue) -> None:
+        """Unsubscribe a queue and end its stream after what it already holds."""
+        self.unsubscribe(hive_id, queue)
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def close(self, hive_id: str, user_id: Optional[str] = None) -> int:
+        """End the streams of one member of a hive (every stream when user_id is None)."""
+        queues = [
+            queue for queue in self._subscribers.get(str(hive_id), ())
+            if user_id is None or self._users.get(queue) == str(user_id)
+        ]
+        for queue in queues:
+            self._close(hive_id, queue)
+        return len(queues)
+
+    def publish(self, hive_id: str, event: str, data: Dict[str, Any]) -> int:
+        """Queue an event for every subscriber of a hive; returns how many received it."""
+        queues = self._subscribers.get(str(hive_id))
+        if not queues:
+            return 0
+        frame = format_event(event, data)
+        delivered = 0
+        for queue in list(queues):
+            try:
+                queue.put_nowait(frame)
+                delivered += 1
+            except asyncio.QueueFull:
+                # Too slow to keep up: end the stream so the client resyncs
+                self._close(hive_id, queue)
+        return delivered
+
+    async def stream(
+        self,
+        hive_id: str,
+        is_disconnected,
+        heartbeat: float = HEARTBEAT_SECONDS,
+        user_id: Optional[str] = None,
+        still_member: Optional[Callable[[], Awaitable[bool]]] = None,
+        membership_check: float = MEMBERSHIP_CHECK_SECONDS,
+    ) -> AsyncIterator[bytes]:
+        """
+        Yield SSE frames for a hive until the client goes away, falls behind,
+        or (checked on heartbeats) still_member reports it has left.
+        """
+        queue = self.subscribe(hive_id, user_id)
+        checked_at = time.monotonic()
+        try:
+            yield format_event("ready", {"hive_id": str(hive_id)})
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        break
+                    if still_member and time.monotonic() - checked_at >= membership_check:
+                        checked_at = time.monotonic()
+                        if not await still_member():
+                            break
+                    yield b": keepalive\n\n"
+                    continue
+                if frame is None:
+                    break
+                yield frame
+        finally:
+            self.unsubscribe(hive_id, queue)
+
+
+hive_events = HiveEventBroker()
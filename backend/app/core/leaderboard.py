@@ -0,0 +1,87 @@
+"""
+Hive Leaderboards
+Window counts over persisted hive_member_stats rows.
+
+Each (hive, member) row keeps an all-time completed_total and recent_mask, a
+bitmap of completed days ending at recent_anchor (bit n = anchor - n days).
+Any window up to RECENT_DAYS long is a popcount of the mask, so ranking a
+roster never touches hive_member_days.
+"""
+
+from datetime import date
+from typing import Dict, Any, Iterable, List, Optional
+
+from app.repositories.base import as_date
+
+RECENT_DAYS = 63
+RECENT_MASK = (1 << RECENT_DAYS) - 1
+
+# Leaderboard window -> days covered (None = all time)
+WINDOWS: Dict[str, Optional[int]] = {"today": 1, "7d": 7, "30d": 30, "all": None}
+
+
+def apply_member_day(stats: Dict[str, Any], day: date, was_done: bool, is_done: bool) -> Dict[str, Any]:
+    """Fold one member-day write into a stats row (SQL apply_hive_member_day)."""
+    anchor = as_date(stats.get("recent_anchor")) or day
+    mask = stats.get("recent_mask") or 0
+    if day > anchor:
+        shift = (day - anchor).days
+        mask = (mask << shift) & RECENT_MASK if shift < RECENT_DAYS else 0
+        anchor = day
+
+    offset = (anchor - day).days
+    if offset < RECENT_DAYS:
+        if is_done:
+            mask |= 1 << offset
+        else:
+            mask &= ~(1 << offset)
+
+    stats["recent_anchor"] = anchor
+    stats["recent_mask"] = mask
+    stats["completed_total"] = (stats.get("completed_total") or 0) + int(is_done) - int(was_done)
+    if is_done:
+        last = as_date(stats.get("last_completed_on"))
+        stats["last_completed_on"] = max(last, day) if last else day
+    return stats
+
+
+def window_count(stats: Optional[Dict[str, Any]], today: date, days: Optional[int]) -> int:
+    """Completed days in the `days` ending today (all time when days is None)."""
+    if not stats:
+        return 0
+    if days is None:
+        return stats.get("completed_total") or 0
+
+    anchor = as_date(stats.get("recent_anchor"))
+    mask = stats.get("recent_mask") or 0
+    if anchor is None or not mask:
+        return 0
+    # Bits for today .. today - days + 1 sit at offsets (anchor - today) onwards
+    start = (anchor - today).days
+    if start < 0:
+        days += start
+        start = 0
+    if days <= 0:
+        return 0
+    return bin((mask >> start) & ((1 << days) - 1)).count("1")
+
+
+def rank_members(
+    stats_rows: Iterable[Dict[str, Any]],
+    members: Iterable[Dict[str, Any]],
+    today: date,
+    window: str,
+) -> List[Dict[str, Any]]:
+    """
+    Per-user totals for a window across the given active memberships, best
+    first: [{user_id, completed, hives}]. Ties keep the order of first appearance.
+    """
+    days = WINDOWS[window]
+    stats_by_member = {(str(row["hive_id"]), str(row["user_id"])): row for row in stats_rows}
+    totals: Dict[str, Dict[str, Any]] = {}
+    for member in members:
+        hive_id, user_id = str(member["hive_id"]), str(member["user_id"])
+        entry = totals.setdefault(user_id, {"user_id": user_id, "completed": 0, "hives": 0})
+        entry["completed"] += window_count(stats_by_member.get((hive_id, user_id)), today, days)
+        entry["hives"] += 1
+    return sorted(totals.values(), key=lambda entry: -entry["completed"])
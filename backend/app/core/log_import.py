@@ -0,0 +1,122 @@
+"""
+Log Import
+Incremental CSV reader for habit history uploads.
+
+The body is decoded and split into records as it streams in, so an import is
+validated and written batch by batch instead of being buffered whole. The
+first record is the header; column names are matched case-insensitively and
+a few common spellings from other trackers are accepted.
+
+Lines are split on "\n" only and fed to a single csv.reader, which handles
+"\r\n" endings and quoted fields spanning lines (and upload chunks). The
+reader is only advanced once a whole record has been buffered.
+"""
+
+import codecs
+import csv
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Iterator, List, Tuple
+
+# Alternative header spellings -> canonical column
+COLUMN_ALIASES = {
+    "date": "log_date",
+    "day": "log_date",
+    "habit_name": "habit",
+    "name": "habit",
+    "count": "value",
+}
+
+
+class ImportTooLarge(ValueError):
+    """The upload is over HABIT_IMPORT_MAX_BYTES"""
+
+
+def _column(name: str) -> str:
+    name = name.strip().lower().replace(" ", "_")
+    return COLUMN_ALIASES.get(name, name)
+
+
+class _LineFeed:
+    """
+    The lines a csv.reader pulls from, fed as the body arrives. Tracks quote
+    parity to count the buffered lines that end a record, so the reader is
+    never advanced into a record that is still incomplete.
+    """
+
+    def __init__(self):
+        self._lines: Deque[str] = deque()
+        self._in_quotes = False
+        self.records = 0
+        self.consumed = 0
+
+    def push(self, line: str) -> None:
+        self._lines.append(line)
+        # Quotes are escaped by doubling, so an odd count toggles quoting
+        if line.count('"') % 2:
+            self._in_quotes = not self._in_quotes
+        if not self._in_quotes:
+            self.records += 1
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        if not self._lines:
+            raise StopIteration
+        self.consumed += 1
+        return self._lines.popleft()
+
+
+async def read_csv(stream: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[Tuple[int, Dict[str, str]]]:
+    """
+    Yield (line number, {column: value}) for each data row of a CSV body; the
+    line number is the physical line the record starts on.
+    Raises ImportTooLarge past max_bytes and ValueError for a missing header
+    or malformed CSV.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    received = 0
+    pending = ""
+    header: List[str] = []
+
+    def records(final: bool = False):
+        # At the end of the body everything left is read, which also covers
+        # stray quotes inside unquoted fields that threw the parity off
+        nonlocal header
+        while feed.records or final:
+            line_no = feed.consumed + 1
+            try:
+                values = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                raise ValueError(f"line {line_no}: {e}") from e
+            feed.records = max(feed.records - 1, 0)
+            if not header:
+                header = [_column(name) for name in values]
+                continue
+            if not any(value.strip() for value in values):
+                continue
+            yield line_no, dict(zip(header, values))
+
+    async for piece in stream:
+        received += len(piece)
+        if received > max_bytes:
+            raise ImportTooLarge(f"Import larger than {max_bytes} bytes")
+        pending += decoder.decode(piece)
+        *lines, pending = pending.split("\n")
+        # Keep the last, possibly incomplete, line for the next piece
+        for line in lines:
+            feed.push(line + "\n")
+        for record in records():
+            yield record
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        feed.push(pending)
+    for record in records(final=True):
+        yield record
+    if not header:
+        raise ValueError("CSV is empty")
@@ -0,0 +1,135 @@
+"""
+Indexed In-Memory Store
+Backs the TEST_MODE data so lookups stay O(matches) instead of scanning every row.
+"""
+
+from collections.abc import MutableMapping
+from typing import Dict, Any, List, Optional, Iterator, Tuple, Union
+from uuid import UUID
+
+
+IndexSpec = Union[str, Tuple[str, ...]]
+
+
+def _normalize(value: Any) -> Any:
+    """Make UUIDs and their string form hit the same index bucket."""
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+class IndexedTable(MutableMapping):
+    """
+    Mapping of primary key -> row dict with secondary indexes.
+
+    Indexes must only cover columns that are never mutated in place (ids, dates);
+    reassign the row (`table[key] = row`) after changing an indexed column.
+    Each index bucket keeps insertion order, so results come back in the order
+    rows were first written.
+    """
+
+    def __init__(self, *indexes: IndexSpec):
+        self._rows: Dict[Any, Dict[str, Any]] = {}
+        self._indexes: Dict[Tuple[str, ...], Dict[Tuple[Any, ...], Dict[Any, Dict[str, Any]]]] = {}
+        for spec in indexes:
+            columns = (spec,) if isinstance(spec, str) else tuple(spec)
+            self._indexes[columns] = {}
+
+    # ----- MutableMapping protocol -----
+
+    def __getitem__(self, key: Any) -> Dict[str, Any]:
+        return self._rows[_normalize(key)]
+
+    def __setitem__(self, key: Any, row: Dict[str, Any]) -> None:
+        key = _normalize(key)
+        previous = self._rows.get(key)
+        if previous is not None:
+            self._unindex(key, previous)
+        self._rows[key] = row
+        for columns, index in self._indexes.items():
+            index.setdefault(self._index_key(columns, row), {})[key] = row
+
+    def __delitem__(self, key: Any) -> None:
+        key = _normalize(key)
+        row = self._rows.pop(key)
+        self._unindex(key, row)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: object) -> bool:
+        return _normalize(key) in self._rows
+
+    def values(self):
+        return self._rows.values()
+
+    def items(self):
+        return self._rows.items()
+
+    def clear(self) -> None:
+        self._rows.clear()
+        for index in self._indexes.values():
+            index.clear()
+
+    # ----- queries -----
+
+    def where(self, **criteria: Any) -> List[Dict[str, Any]]:
+        """Rows whose columns equal every criterion, served from the widest matching index."""
+        return [row for _, row in self._matching(criteria)]
+
+    def first(self, **criteria: Any) -> Optional[Dict[str, Any]]:
+        for _, row in self._matching(criteria):
+            return row
+        return None
+
+    def delete_where(self, **criteria: Any) -> int:
+        keys = [key for key, _ in self._matching(criteria)]
+        for key in keys:
+            del self[key]
+        return len(keys)
+
+    # ----- internals -----
+
+    def _matching(self, criteria: Dict[str, Any]) -> List[Tuple[Any, Dict[str, Any]]]:
+        criteria = {column: _normalize(value) for column, value in criteria.items()}
+        columns = self._best_index(criteria)
+
+        if columns is None:
+            candidates = self._rows.items()
+            remaining = list(criteria.items())
+        else:
+            bucket = self._indexes[columns].get(tuple(criteria[c] for c in columns))
+            if not bucket:
+                return []
+            candidates = bucket.items()
+            remaining = [(c, v) for c, v in criteria.items() if c not in columns]
+
+        if not remaining:
+            return list(candidates)
+        return [
+            (key, row) for key, row in candidates
+            if all(_normalize(row.get(column)) == value for column, value in remaining)
+        ]
+
+    def _best_index(self, criteria: Dict[str, Any]) -> Optional[Tuple[str, ...]]:
+        best: Optional[Tuple[str, ...]] = None
+        for columns in self._indexes:
+            if all(c in criteria for c in columns) and (best is None or len(columns) > len(best)):
+                best = columns
+        return best
+
+    @staticmethod
+    def _index_key(columns: Tuple[str, ...], row: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple(_normalize(row.get(column)) for column in columns)
+
+    def _unindex(self, key: Any, row: Dict[str, Any]) -> None:
+        for columns, index in self._indexes.items():
+            index_key = self._index_key(columns, row)
+            bucket = index.get(index_key)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del index[index_key]
@@ -0,0 +1,94 @@
+"""
+PostgREST Passthrough
+Streams a PostgREST JSON array to the client as the bytes PostgREST sent,
+for list endpoints whose response is exactly the selected rows.
+
+Only the envelope is checked (status, content type and the opening "["),
+so the rows are never parsed, validated or re-encoded in Python. Callers
+select exactly the columns the response schema needs.
+"""
+
+from typing import AsyncIterator, List, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=5.0))
+    return _client
+
+
+class PassthroughStream:
+    """An open PostgREST response; iterate it once to forward the body."""
+
+    def __init__(self, response: httpx.Response, first: bytes, chunks: AsyncIterator[bytes]):
+        self.response = response
+        self._first = first
+        self._chunks = chunks
+
+    @property
+    def row_count(self) -> int:
+        """Rows in the body, from Content-Range ("0-49/*", or "*/*" when empty)."""
+        first_last = self.response.headers.get("content-range", "*/*").split("/", 1)[0]
+        if "-" not in first_last:
+            return 0
+        first, last = first_last.split("-", 1)
+        return int(last) - int(first) + 1
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            yield self._first
+            async for chunk in self._chunks:
+                yield chunk
+        finally:
+            await self.response.aclose()
+
+
+async def open_rows(
+    table: str,
+    params: List[Tuple[str, str]],
+    access_token: Optional[str] = None,
+) -> PassthroughStream:
+    """
+    GET /rest/v1/<table> with PostgREST query params, as the service role
+    unless an access token is given. Raises when the response is not a JSON array.
+    """
+    token = access_token or settings.SUPABASE_SERVICE_KEY
+    request = _http().build_request(
+        "GET",
+        f"{settings.SUPABASE_URL}/rest/v1/{table}",
+        params=params,
+        headers={
+            "apikey": settings.SUPABASE_ANON_KEY if access_token else settings.SUPABASE_SERVICE_KEY,
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            # Forward the body as is, without decoding a compressed stream
+            "Accept-Encoding": "identity",
+        },
+    )
+    response = await _http().send(request, stream=True)
+    try:
+        if response.status_code != 200:
+            body = await response.aread()
+            raise Exception(f"PostgREST {response.status_code}: {body[:200].decode(errors='replace')}")
+        if not response.headers.get("content-type", "").startswith("application/json"):
+            raise Exception("PostgREST returned a non-JSON body")
+
+        chunks = response.aiter_raw()
+        first = b""
+        async for chunk in chunks:
+            first += chunk
+            if first.lstrip():
+                break
+        if not first.lstrip().startswith(b"["):
+            raise Exception("PostgREST returned a non-array body")
+        return PassthroughStream(response, first, chunks)
+    except Exception:
+        await response.aclose()
+        raise
@@ -0,0 +1,111 @@
+"""
+Profile Caches
+Process-wide TTL + LRU caches of rarely changing profile columns: display data
+({id, display_name, avatar_url}) for rosters, leaderboards and activity events,
+and day settings ({timezone, day_start_hour}) for resolving a user's local day.
+
+Rows are loaded under the viewer's row level security (profiles are visible
+to their owner and friends), so entries are keyed by (viewer, user): a row
+one caller was allowed to load is never served to another. Loads made with
+the service role use SERVICE_VIEWER.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Callable, Awaitable, Optional, Tuple
+import time
+
+from app.core.config import settings
+
+Loader = Callable[[list], Awaitable[Dict[str, Dict[str, Any]]]]
+
+# Viewer key for rows loaded with the service role
+SERVICE_VIEWER = "service_role"
+
+# (viewer id, user id)
+Key = Tuple[str, str]
+
+
+class ProfileCache:
+    """
+    (viewer id, user id) -> profile columns, evicting the least recently used
+    entry past max_entries and treating entries older than ttl_seconds as
+    misses.
+
+    Only profiles the loader returned are cached, so a user that is hidden
+    (or not created yet) is looked up again next time. Other processes keep
+    their own copy; the TTL bounds how stale they can be after an update.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Key, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, viewer: str, user_id: str) -> Optional[Dict[str, Any]]:
+        key = (str(viewer), str(user_id))
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, row = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return row
+
+    def put(self, viewer: str, user_id: str, row: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        key = (str(viewer), str(user_id))
+        self._entries[key] = (self._clock() + self.ttl_seconds, row)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user's rows as seen by every viewer (a scan; profile updates are rare)."""
+        user_id = str(user_id)
+        for key in [key for key in self._entries if key[1] == user_id]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_many(self, viewer: str, user_ids: Iterable[str], load: Loader) -> Dict[str, Dict[str, Any]]:
+        """
+        Cached rows for user_ids as `viewer` sees them, calling
+        load(missing_ids) (run as that viewer) once for the misses.
+        """
+        result: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for user_id in {str(uid) for uid in user_ids}:
+            row = self.get(viewer, user_id)
+            if row is None:
+                missing.append(user_id)
+            else:
+                result[user_id] = row
+        if missing:
+            for user_id, row in (await load(missing)).items():
+                self.put(viewer, str(user_id), row)
+                result[str(user_id)] = row
+        return result
+
+
+profile_display_cache = ProfileCache(
+    max_entries=settings.PROFILE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PROFILE_CACHE_TTL_SECONDS,
+)
+profile_day_cache = ProfileCache(
+    max_entries=settings.PROFILE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PROFILE_CACHE_TTL_SECONDS,
+)
+
+
+def invalidate_profile(user_id: str) -> None:
+    """Drop every cached copy of a user's profile after it changes."""
+    profile_display_cache.invalidate(user_id)
+    profile_day_cache.invalidate(user_id)
@@ -0,0 +1,204 @@
+"""
+Rate Limiting
+Per-user token buckets in front of the routers, so a client stuck in a retry
+loop spends its own budget instead of Supabase and OneSignal capacity.
+
+Every caller has a bucket of RATE_LIMIT_BURST tokens refilled at
+RATE_LIMIT_RATE_PER_SECOND. A request takes its route's cost (ROUTE_COSTS,
+default 1) or is answered 429 with Retry-After set to when the bucket will
+hold enough. Callers are keyed by the user id of a token whose signature
+verifies (verify_access_token), so a forged token cannot spend someone
+else's budget; anything else is keyed by client address. Behind a proxy the
+address is the X-Forwarded-For entry RATE_LIMIT_PROXY_HOPS from the right:
+each trusted proxy appends the peer it saw, so that entry was written by our
+own edge and everything to its left is whatever the client sent.
+
+The "memory" backend keeps buckets in the process. The "shared" backend
+keeps them in Postgres (take_rate_limit_tokens) so every worker draws from
+the same bucket; it fails open when the database cannot be reached.
+"""
+
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+import httpx
+import jwt as pyjwt
+from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.auth import verify_access_token
+from app.core.config import settings
+from app.core.responses import ORJSONResponse
+
+logger = logging.getLogger(__name__)
+
+# (method, path pattern, cost); the first match wins. Costs roughly follow
+# the upstream calls a request makes.
+ROUTE_COSTS: Tuple[Tuple[str, "re.Pattern[str]", float], ...] = (
+    ("POST", re.compile(r"^/api/notifications/test$"), 10),
+    ("POST", re.compile(r"^/api/habits/import$"), 10),
+    ("GET", re.compile(r"^/api/export/?$"), 10),
+    ("GET", re.compile(r"^/api/hives/leaderboard$"), 4),
+    ("GET", re.compile(r"^/api/hives/[^/]+$"), 8),
+    ("GET", re.compile(r"^/api/hives/?$"), 4),
+    ("GET", re.compile(r"^/api/habits/insights/"), 4),
+    ("GET", re.compile(r"^/api/activity/year-overview$"), 4),
+    ("POST", re.compile(r"^/api/contacts/(upload|match|sync)$"), 5),
+    ("PUT", re.compile(r"^/api/contacts/sync/chunk$"), 5),
+)
+
+# Never limited: liveness checks and the API docs
+EXEMPT_PATHS = {"/", "/health", "/docs", "/redoc", "/openapi.json"}
+
+
+def route_cost(method: str, path: str) -> float:
+    for route_method, pattern, cost in ROUTE_COSTS:
+        if method == route_method and pattern.match(path):
+            return cost
+    return 1
+
+
+class TokenBucketLimiter:
+    """
+    In-process token buckets, one per key, keeping the most recently used
+    max_keys buckets. An evicted key starts again with a full bucket.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_keys: int = 100000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, cost: float) -> float:
+        """Take `cost` tokens; returns 0 when admitted, else seconds until it would be."""
+        cost = min(cost, self.burst)
+        now = self._clock()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+_http: Optional[httpx.AsyncClient] = None
+
+
+class SharedTokenBucketLimiter:
+    """Token buckets in Postgres, shared by every worker (see the rate-limit-buckets migration)."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+
+    async def _take_rpc(self, key: str, cost: float) -> float:
+        if settings.STORAGE_BACKEND == "postgres":
+            from app.core.database import get_pool
+            return await get_pool().fetchval(
+                "select public.take_rate_limit_tokens($1, $2, $3, $4)",
+                key, cost, self.rate, self.burst,
+            )
+
+        global _http
+        if _http is None:
+            _http = httpx.AsyncClient(timeout=httpx.Timeout(2.0))
+        response = await _http.post(
+            f"{settings.SUPABASE_URL}/rest/v1/rpc/take_rate_limit_tokens",
+            json={"p_key": key, "p_cost": cost, "p_rate": self.rate, "p_burst": self.burst},
+            headers={
+                "apikey": settings.SUPABASE_SERVICE_KEY,
+                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
+            },
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def take(self, key: str, cost: float) -> float:
+        try:
+            return float(await self._take_rpc(key, min(cost, self.burst)))
+        except Exception as e:
+            logger.warning("Rate limit backend unavailable, admitting request: %s", e)
+            return 0.0
+
+
+def create_limiter():
+    if settings.RATE_LIMIT_BACKEND == "shared" and not settings.TEST_MODE:
+        return SharedTokenBucketLimiter(settings.RATE_LIMIT_RATE_PER_SECOND, settings.RATE_LIMIT_BURST)
+    return TokenBucketLimiter(
+        settings.RATE_LIMIT_RATE_PER_SECOND,
+        settings.RATE_LIMIT_BURST,
+        settings.RATE_LIMIT_MAX_KEYS,
+    )
+
+
+def client_key(request: Request) -> Optional[str]:
+    """Bucket key for a request: its user, else its address; None for internal calls."""
+    service_key = request.headers.get("x-service-key")
+    if service_key and settings.INTERNAL_SERVICE_KEY and service_key == settings.INTERNAL_SERVICE_KEY:
+        return None
+
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            return f"user:{verify_access_token(authorization[7:])['sub']}"
+        except (pyjwt.PyJWTError, RuntimeError):
+            # Unverifiable (or no SUPABASE_JWT_SECRET): fall back to the address
+            pass
+    return f"ip:{client_address(request)}"
+
+
+def client_address(request: Request) -> str:
+    """The caller's address as seen by the outermost trusted proxy."""
+    peer = request.client.host if request.client else "unknown"
+    hops = settings.RATE_LIMIT_PROXY_HOPS
+    if hops <= 0:
+        return peer
+    forwarded = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    # Fewer entries than trusted proxies: the request skipped the edge
+    return forwarded[-hops] if len(forwarded) >= hops else peer
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 once a caller's bucket is empty."""
+
+    def __init__(self, app: ASGIApp, limiter=None):
+        self.app = app
+        self.limiter = limiter or create_limiter()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        key = client_key(request)
+        if key is not None:
+            wait = await self.limiter.take(key, route_cost(request.method, scope["path"]))
+            if wait > 0:
+                response = ORJSONResponse(
+                    {"detail": "Rate limit exceeded, retry later"},
+                    status_code=429,
+                    headers={"Retry-After": str(max(1, math.ceil(wait)))},
+                )
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
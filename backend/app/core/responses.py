@@ -0,0 +1,34 @@
+"""
+Fast Responses
+JSON rendering for the heavy read endpoints.
+
+The app renders responses with orjson (ORJSONResponse is the app-wide default
+response class). Handlers whose result is already a validated model (or a
+list of models) can return ModelResponse instead: FastAPI passes a returned
+Response through untouched, so the result is not revalidated against the
+route's response_model or walked by jsonable_encoder. pydantic serializes it
+to JSON bytes in one pass. Keep response_model on the route for the schema.
+"""
+
+from typing import Any
+
+from fastapi.responses import ORJSONResponse, Response
+from pydantic_core import to_json
+
+__all__ = ["ORJSONResponse", "ModelResponse"]
+
+
+class ModelResponse(Response):
+    """
+    Serialize trusted pydantic models straight to JSON; `exclude` (pydantic
+    include/exclude syntax) leaves fields out of this response.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, content: Any, *args: Any, exclude: Any = None, **kwargs: Any):
+        self.exclude = exclude
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content, by_alias=True, exclude=self.exclude)
@@ -0,0 +1,100 @@
+"""
+Single-flight Reads
+Identical repository reads issued while one is already in flight wait for
+that call and share its result instead of querying again, so the burst of
+hive detail requests after a hive push costs one query per read, not one
+per member.
+
+Reads run under the caller's RLS identity, so they are keyed on the caller
+by default. A hive-scoped read is keyed on the hive instead once the request
+has confirmed the caller is a member (share_hive_reads): RLS shows every
+member the same hive rows, roster, days and activity. Callers may mutate
+what they get back, so every caller, the one that started the call included,
+gets its own copy and the result itself is never handed out.
+
+Only the asyncpg backend uses this: PostgREST repository methods are
+synchronous underneath, so two of them never overlap and there is nothing to
+coalesce.
+"""
+
+import asyncio
+import functools
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Hashable
+
+# Hives whose membership the current request has confirmed
+_member_hives: ContextVar[FrozenSet[str]] = ContextVar("member_hives", default=frozenset())
+
+
+def share_hive_reads(hive_id: str) -> None:
+    """Let this request's reads of hive_id join flights started by other members."""
+    _member_hives.set(_member_hives.get() | {str(hive_id)})
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple((key, _freeze(item)) for key, item in value.items())
+    return value
+
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    return value
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its result."""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, "asyncio.Task[Any]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def _landed(self, key: Hashable, flight: "asyncio.Task[Any]") -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Mark the error retrieved even if every caller gave up waiting
+        if not flight.cancelled():
+            flight.exception()
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            # The call runs as its own task, so a caller that disconnects
+            # does not cancel it for the others
+            flight = asyncio.ensure_future(call())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda _: self._landed(key, flight))
+        return _copy(await asyncio.shield(flight))
+
+
+flights = SingleFlight()
+
+
+def single_flight(hive_scoped: bool = False):
+    """
+    Coalesce concurrent identical calls of a repository read. With
+    hive_scoped, the first argument is a hive id or a list of them, and the
+    call is shared across members of hives the request has confirmed.
+    """
+
+    def decorate(method: Callable[..., Awaitable[Any]]):
+        @functools.wraps(method)
+        async def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+            scope = self.user_id
+            if hive_scoped and args:
+                hive_ids = {args[0]} if isinstance(args[0], str) else set(map(str, args[0]))
+                if hive_ids and hive_ids <= _member_hives.get():
+                    scope = "hive members"
+            key = (method.__qualname__, scope, _freeze(args), _freeze(kwargs))
+            return await flights.do(key, lambda: method(self, *args, **kwargs))
+
+        return wrapper
+
+    return decorate
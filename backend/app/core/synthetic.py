@@ -0,0 +1,580 @@
+"""
+Synthetic Dataset Generator
+Produces deterministic, production-shaped HabitHive data for scale testing.
+
+The same seed, user count and reference day always produce the same rows, so
+benchmarks of insights, heatmaps and reminder queries can be repeated against
+identical data. Output can be bulk loaded into the Postgres schema from
+data/migrations/init.sql with COPY, or loaded straight into the TEST_MODE stores.
+
+Usage:
+    python -m app.core.synthetic --users 5000 --years 3 --out /tmp/habithive-data
+    psql "$DATABASE_URL" -f /tmp/habithive-data/load.sql
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+from datetime import datetime, date, timedelta, time, timezone
+import argparse
+import csv
+import json
+import os
+import random
+import uuid
+
+
+@dataclass(frozen=True)
+class UserShape:
+    """Behaviour profile for a class of synthetic users"""
+    name: str
+    weight: float
+    habits: Tuple[int, int]
+    log_probability: float
+    counter_share: float
+    reminder_share: float
+    hive_weight: float
+    devices: Tuple[int, int]
+
+
+USER_SHAPES: Dict[str, UserShape] = {
+    "light": UserShape("light", 0.5, (1, 2), 0.35, 0.1, 0.3, 1.0, (0, 1)),
+    "typical": UserShape("typical", 0.4, (3, 5), 0.65, 0.25, 0.5, 2.0, (1, 1)),
+    "power": UserShape("power", 0.1, (6, 12), 0.9, 0.4, 0.8, 4.0, (1, 3)),
+}
+
+TIMEZONES = [
+    "America/New_York", "America/Chicago", "America/Denver", "America/Los_Angeles",
+    "Europe/London", "Europe/Berlin", "Asia/Kolkata", "Asia/Tokyo", "Australia/Sydney",
+]
+
+HABIT_TEMPLATES = [
+    ("Drink Water", "💧", "#34C8ED", "counter", 8),
+    ("Read", "📚", "#FF9F1C", "checkbox", 1),
+    ("Meditate", "🧘", "#9B5DE5", "checkbox", 1),
+    ("Workout", "💪", "#F15BB5", "checkbox", 1),
+    ("Walk", "🚶", "#00BBF9", "counter", 3),
+    ("Journal", "📝", "#FEE440", "checkbox", 1),
+    ("Stretch", "🤸", "#00F5D4", "counter", 2),
+    ("Sleep Early", "😴", "#4361EE", "checkbox", 1),
+    ("Practice Guitar", "🎸", "#FB5607", "counter", 2),
+    ("No Sugar", "🍬", "#FF006E", "checkbox", 1),
+]
+
+# Column order for each table in COPY format. Tables are listed in load order so
+# foreign keys are satisfied even if replication role is not switched.
+TABLE_COLUMNS: Dict[str, List[str]] = {
+    "auth.users": ["id", "aud", "role", "phone", "created_at", "updated_at"],
+    "profiles": [
+        "id", "display_name", "avatar_url", "phone", "timezone", "day_start_hour",
+        "theme", "notification_habits", "created_at", "updated_at",
+    ],
+    "device_tokens": [
+        "id", "user_id", "apns_token", "environment", "onesignal_player_id",
+        "last_used_at", "created_at",
+    ],
+    "habits": [
+        "id", "user_id", "name", "emoji", "color_hex", "type", "target_per_day",
+        "schedule_daily", "schedule_weekmask", "reminder_enabled", "reminder_time",
+        "is_active", "current_streak", "longest_streak", "total_completions",
+        "last_completed_date", "created_at", "updated_at",
+    ],
+    "habit_logs": ["id", "habit_id", "user_id", "log_date", "value", "source", "created_at", "updated_at"],
+    "hives": [
+        "id", "name", "description", "owner_id", "emoji", "color_hex", "type",
+        "target_per_day", "rule", "threshold", "schedule_daily", "schedule_weekmask",
+        "current_streak", "longest_streak", "last_advanced_on", "is_active",
+        "max_members", "invite_code", "created_at", "updated_at",
+    ],
+    "hive_members": ["hive_id", "user_id", "role", "joined_at", "left_at", "is_active"],
+    "hive_member_days": ["hive_id", "user_id", "day_date", "value", "created_at"],
+    "hive_days": ["hive_id", "day_date", "complete_count", "required_count", "advanced", "created_at"],
+    "activity_events": ["id", "actor_id", "hive_id", "habit_id", "type", "data", "is_public", "created_at"],
+}
+
+
+@dataclass(frozen=True)
+class DatasetConfig:
+    """Size and shape of a synthetic dataset"""
+    users: int = 1000
+    hives: Optional[int] = None
+    members_per_hive: int = 10
+    years: float = 1.0
+    seed: int = 42
+    today: Optional[date] = None
+
+    @property
+    def hive_count(self) -> int:
+        if self.hives is not None:
+            return self.hives
+        return max(1, self.users // 5)
+
+    @property
+    def reference_day(self) -> date:
+        return self.today or date.today()
+
+    @property
+    def history_days(self) -> int:
+        return max(1, int(self.years * 365))
+
+
+def _rng(config: DatasetConfig, *parts: Any) -> random.Random:
+    """Independent, reproducible random stream for one entity of one table."""
+    return random.Random(":".join(str(p) for p in (config.seed, *parts)))
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _timestamp(day: date, rng: random.Random) -> datetime:
+    return datetime.combine(day, time(hour=rng.randint(6, 22), minute=rng.randint(0, 59)), tzinfo=timezone.utc)
+
+
+def _streaks(done_days: List[date], today: date) -> Tuple[int, int]:
+    """Current and longest run of consecutive days in an ascending day list."""
+    longest = run = 0
+    previous: Optional[date] = None
+    for day in done_days:
+        run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+
+    current = 0
+    if previous is not None and today - previous <= timedelta(days=1):
+        current = run
+    return current, longest
+
+
+class SyntheticDataset:
+    """Lazily generated dataset; small tables are materialised, large ones streamed."""
+
+    def __init__(self, config: DatasetConfig):
+        self.config = config
+        self.today = config.reference_day
+        self.start = self.today - timedelta(days=config.history_days - 1)
+        self.users = self._build_users()
+        self.habits = self._build_habits()
+        self.hives, self.members = self._build_hives()
+        self._hive_stats: Dict[str, Dict[str, Any]] = {}
+        self._habit_stats: Dict[str, Dict[str, Any]] = {}
+
+    # ----- materialised tables -----
+
+    def _build_users(self) -> List[Dict[str, Any]]:
+        shapes = list(USER_SHAPES.values())
+        weights = [shape.weight for shape in shapes]
+        users = []
+        for index in range(self.config.users):
+            rng = _rng(self.config, "user", index)
+            shape = rng.choices(shapes, weights=weights)[0]
+            joined = self.start - timedelta(days=rng.randint(0, 30))
+            created = _timestamp(joined, rng)
+            users.append({
+                "id": _uuid(rng),
+                "display_name": f"Bee {index:06d}",
+                "avatar_url": None,
+                "phone": f"+1555{index:07d}",
+                "timezone": rng.choice(TIMEZONES),
+                "day_start_hour": rng.choice([0, 3, 4, 4, 4, 5]),
+                "theme": rng.choice(["honey", "mint", "night"]),
+                "notification_habits": True,
+                "created_at": created,
+                "updated_at": created,
+                "shape": shape.name,
+            })
+        return users
+
+    def _build_habits(self) -> List[Dict[str, Any]]:
+        habits = []
+        for user in self.users:
+            shape = USER_SHAPES[user["shape"]]
+            rng = _rng(self.config, "habits", user["id"])
+            count = rng.randint(*shape.habits)
+            for template in rng.sample(HABIT_TEMPLATES, min(count, len(HABIT_TEMPLATES))):
+                name, emoji, color_hex, habit_type, target = template
+                if habit_type == "counter" and rng.random() > shape.counter_share:
+                    habit_type, target = "checkbox", 1
+                reminder = rng.random() < shape.reminder_share
+                habits.append({
+                    "id": _uuid(rng),
+                    "user_id": user["id"],
+                    "name": name,
+                    "emoji": emoji,
+                    "color_hex": color_hex,
+                    "type": habit_type,
+                    "target_per_day": target,
+                    "schedule_daily": True,
+                    "schedule_weekmask": 127,
+                    "reminder_enabled": reminder,
+                    "reminder_time": time(hour=rng.randint(6, 21), minute=rng.choice([0, 15, 30, 45])) if reminder else None,
+                    "is_active": rng.random() > 0.05,
+                    "created_at": user["created_at"],
+                    "updated_at": user["created_at"],
+                    "log_probability": shape.log_probability,
+                })
+        return habits
+
+    def _build_hives(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        rng = _rng(self.config, "hives")
+        weights = [USER_SHAPES[user["shape"]].hive_weight for user in self.users]
+        size = min(self.config.members_per_hive, len(self.users))
+        hives: List[Dict[str, Any]] = []
+        members: List[Dict[str, Any]] = []
+
+        for index in range(self.config.hive_count):
+            roster: List[Dict[str, Any]] = []
+            seen = set()
+            while len(roster) < size:
+                user = rng.choices(self.users, weights=weights)[0]
+                if user["id"] not in seen:
+                    seen.add(user["id"])
+                    roster.append(user)
+
+            name, emoji, color_hex, habit_type, target = rng.choice(HABIT_TEMPLATES)
+            created_day = self.start + timedelta(days=rng.randint(0, max(0, self.config.history_days // 2)))
+            created = _timestamp(created_day, rng)
+            hive_id = _uuid(rng)
+            hives.append({
+                "id": hive_id,
+                "name": f"{name} Hive {index}",
+                "description": None,
+                "owner_id": roster[0]["id"],
+                "emoji": emoji,
+                "color_hex": color_hex,
+                "type": habit_type,
+                "target_per_day": target,
+                "rule": "all_must_complete",
+                "threshold": None,
+                "schedule_daily": True,
+                "schedule_weekmask": 127,
+                "is_active": True,
+                "max_members": 10,
+                "invite_code": f"{rng.getrandbits(48):012x}",
+                "created_at": created,
+                "updated_at": created,
+            })
+            for position, user in enumerate(roster):
+                members.append({
+                    "hive_id": hive_id,
+                    "user_id": user["id"],
+                    "role": "owner" if position == 0 else "member",
+                    "joined_at": created + timedelta(hours=position),
+                    "left_at": None,
+                    "is_active": True,
+                })
+        return hives, members
+
+    def devices(self) -> Iterator[Dict[str, Any]]:
+        for user in self.users:
+            rng = _rng(self.config, "devices", user["id"])
+            for _ in range(rng.randint(*USER_SHAPES[user["shape"]].devices)):
+                yield {
+                    "id": _uuid(rng),
+                    "user_id": user["id"],
+                    "apns_token": f"{rng.getrandbits(256):064x}",
+                    "environment": "prod",
+                    "onesignal_player_id": _uuid(rng),
+                    "last_used_at": datetime.combine(self.today, time(), tzinfo=timezone.utc),
+                    "created_at": user["created_at"],
+                }
+
+    # ----- streamed tables -----
+
+    def habit_logs(self) -> Iterator[Dict[str, Any]]:
+        """Yield every habit log; per-habit streak columns are recorded as a side effect."""
+        for habit in self.habits:
+            rng = _rng(self.config, "logs", habit["id"])
+            target = habit["target_per_day"]
+            # Users go through good and bad stretches rather than flipping coins daily
+            probability = habit["log_probability"]
+            done_days: List[date] = []
+            total = 0
+            day = max(self.start, habit["created_at"].date())
+            while day <= self.today:
+                if rng.random() < 0.02:
+                    probability = min(0.98, max(0.05, habit["log_probability"] + rng.uniform(-0.3, 0.3)))
+                if rng.random() < probability:
+                    value = target if target == 1 or rng.random() < 0.7 else rng.randint(1, target)
+                    created = _timestamp(day, rng)
+                    if value >= target:
+                        done_days.append(day)
+                    total += 1
+                    yield {
+                        "id": _uuid(rng),
+                        "habit_id": habit["id"],
+                        "user_id": habit["user_id"],
+                        "log_date": day,
+                        "value": value,
+                        "source": "api",
+                        "created_at": created,
+                        "updated_at": created,
+                    }
+                day += timedelta(days=1)
+
+            current, longest = _streaks(done_days, self.today)
+            self._habit_stats[habit["id"]] = {
+                "current_streak": current,
+                "longest_streak": longest,
+                "total_completions": total,
+                "last_completed_date": done_days[-1] if done_days else None,
+            }
+
+    def hive_member_days(self) -> Iterator[Dict[str, Any]]:
+        """Yield member days per hive; hive_days rows and hive streaks are derived alongside."""
+        members_by_hive: Dict[str, List[Dict[str, Any]]] = {}
+        for member in self.members:
+            members_by_hive.setdefault(member["hive_id"], []).append(member)
+        probability_by_user = {
+            user["id"]: USER_SHAPES[user["shape"]].log_probability for user in self.users
+        }
+
+        for hive in self.hives:
+            rng = _rng(self.config, "member_days", hive["id"])
+            roster = members_by_hive.get(hive["id"], [])
+            target = hive["target_per_day"]
+            hive_days: List[Dict[str, Any]] = []
+            advanced_days: List[date] = []
+            day = hive["created_at"].date()
+            while day <= self.today:
+                completed_by: List[str] = []
+                for member in roster:
+                    if rng.random() >= probability_by_user[member["user_id"]] + 0.1:
+                        continue
+                    value = target if rng.random() < 0.85 else rng.randint(1, target)
+                    if value >= target:
+                        completed_by.append(member["user_id"])
+                    yield {
+                        "hive_id": hive["id"],
+                        "user_id": member["user_id"],
+                        "day_date": day,
+                        "value": value,
+                        "done": value > 0,
+                        "created_at": _timestamp(day, rng),
+                    }
+                complete = len(completed_by)
+                advanced = bool(roster) and complete == len(roster)
+                if advanced:
+                    advanced_days.append(day)
+                hive_days.append({
+                    "hive_id": hive["id"],
+                    "day_date": day,
+                    "complete_count": complete,
+                    "required_count": len(roster),
+                    "advanced": advanced,
+                    "created_at": datetime.combine(day + timedelta(days=1), time(), tzinfo=timezone.utc),
+                    "completed_by": completed_by,
+                })
+                day += timedelta(days=1)
+
+            current, longest = _streaks(advanced_days, self.today)
+            self._hive_stats[hive["id"]] = {
+                "current_streak": current,
+                "longest_streak": longest,
+                "last_advanced_on": advanced_days[-1] if advanced_days else None,
+                "hive_days": hive_days,
+            }
+
+    def hive_days(self) -> Iterator[Dict[str, Any]]:
+        self._require(self._hive_stats, "hive_member_days")
+        for stats in self._hive_stats.values():
+            yield from stats["hive_days"]
+
+    def activity_events(self) -> Iterator[Dict[str, Any]]:
+        """Dense hive feed: joins, one completion per finished member day and streak advances."""
+        self._require(self._hive_stats, "hive_member_days")
+        for member in self.members:
+            rng = _rng(self.config, "activity_join", member["hive_id"], member["user_id"])
+            yield {
+                "id": _uuid(rng),
+                "actor_id": member["user_id"],
+                "hive_id": member["hive_id"],
+                "habit_id": None,
+                "type": "hive_joined",
+                "data": {},
+                "is_public": False,
+                "created_at": member["joined_at"],
+            }
+
+        owners = {hive["id"]: hive["owner_id"] for hive in self.hives}
+        for hive_id, stats in self._hive_stats.items():
+            rng = _rng(self.config, "activity_hive", hive_id)
+            for hive_day in stats["hive_days"]:
+                for actor_id in hive_day["completed_by"]:
+                    yield {
+                        "id": _uuid(rng),
+                        "actor_id": actor_id,
+                        "hive_id": hive_id,
+                        "habit_id": None,
+                        "type": "habit_completed",
+                        "data": {"day": hive_day["day_date"].isoformat()},
+                        "is_public": False,
+                        "created_at": _timestamp(hive_day["day_date"], rng),
+                    }
+                if hive_day["advanced"]:
+                    yield {
+                        "id": _uuid(rng),
+                        "actor_id": owners[hive_id],
+                        "hive_id": hive_id,
+                        "habit_id": None,
+                        "type": "hive_advanced",
+                        "data": {"day": hive_day["day_date"].isoformat()},
+                        "is_public": False,
+                        "created_at": hive_day["created_at"],
+                    }
+
+    # ----- tables that depend on streamed statistics -----
+
+    def habit_rows(self) -> Iterator[Dict[str, Any]]:
+        self._require(self._habit_stats, "habit_logs")
+        for habit in self.habits:
+            yield {**habit, **self._habit_stats.get(habit["id"], {})}
+
+    def hive_rows(self) -> Iterator[Dict[str, Any]]:
+        self._require(self._hive_stats, "hive_member_days")
+        for hive in self.hives:
+            stats = self._hive_stats.get(hive["id"], {})
+            yield {
+                **hive,
+                "current_streak": stats.get("current_streak", 0),
+                "longest_streak": stats.get("longest_streak", 0),
+                "last_advanced_on": stats.get("last_advanced_on"),
+            }
+
+    @staticmethod
+    def _require(stats: Dict[str, Any], table: str) -> None:
+        if not stats:
+            raise RuntimeError(f"Generate {table} before reading derived tables")
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+
+def write_copy_files(dataset: SyntheticDataset, out_dir: str) -> Dict[str, int]:
+    """Write one CSV per table plus a load.sql that COPYs them in dependency order."""
+    os.makedirs(out_dir, exist_ok=True)
+    out_dir = os.path.abspath(out_dir)
+    counts: Dict[str, int] = {}
+
+    def dump(table: str, rows: Iterator[Dict[str, Any]]) -> None:
+        columns = TABLE_COLUMNS[table]
+        path = os.path.join(out_dir, f"{table.replace('.', '_')}.csv")
+        written = 0
+        with open(path, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            for row in rows:
+                writer.writerow([_csv_value(row.get(column)) for column in columns])
+                written += 1
+        counts[table] = written
+        print(f"🐝 {table}: {written} rows")
+
+    auth_users = (
+        {"id": u["id"], "aud": "authenticated", "role": "authenticated", "phone": u["phone"],
+         "created_at": u["created_at"], "updated_at": u["updated_at"]}
+        for u in dataset.users
+    )
+
+    # Streamed tables first: they record the statistics the parent rows need
+    dump("habit_logs", dataset.habit_logs())
+    dump("hive_member_days", dataset.hive_member_days())
+    dump("auth.users", auth_users)
+    dump("profiles", iter(dataset.users))
+    dump("device_tokens", dataset.devices())
+    dump("habits", dataset.habit_rows())
+    dump("hives", dataset.hive_rows())
+    dump("hive_members", iter(dataset.members))
+    dump("hive_days", dataset.hive_days())
+    dump("activity_events", dataset.activity_events())
+
+    lines = [
+        "-- Generated by app.core.synthetic; load with: psql \"$DATABASE_URL\" -f load.sql",
+        "begin;",
+        "-- Skip triggers (handle_new_user) and FK checks while bulk loading",
+        "set local session_replication_role = replica;",
+    ]
+    for table in TABLE_COLUMNS:
+        qualified = table if "." in table else f"public.{table}"
+        path = os.path.join(out_dir, f"{table.replace('.', '_')}.csv")
+        lines.append(f"\\copy {qualified} ({', '.join(TABLE_COLUMNS[table])}) from '{path}' with (format csv)")
+    lines.append("commit;")
+    lines.append("-- Triggers were skipped, so fill timelines and leaderboard stats explicitly")
+    lines.append("select public.backfill_activity_timeline();")
+    lines.append("select public.rebuild_hive_member_stats();")
+    lines.extend(f"analyze public.{table};" for table in TABLE_COLUMNS if "." not in table)
+
+    with open(os.path.join(out_dir, "load.sql"), "w", encoding="utf-8") as handle:
+        handle.write("\n".join(lines) + "\n")
+    return counts
+
+
+def load_test_stores(dataset: SyntheticDataset) -> Dict[str, int]:
+    """Populate the in-memory TEST_MODE stores used by the routers."""
+    from app.repositories import memory
+
+    for log in dataset.habit_logs():
+        memory.habit_logs[log["id"]] = log
+    for day in dataset.hive_member_days():
+        memory.hive_member_days[(day["hive_id"], day["user_id"], day["day_date"])] = day
+    for day in dataset.hive_days():
+        memory.hive_days[(day["hive_id"], day["day_date"])] = {k: v for k, v in day.items() if k != "completed_by"}
+
+    for user in dataset.users:
+        memory.profiles[user["id"]] = {k: v for k, v in user.items() if k != "shape"}
+    for habit in dataset.habit_rows():
+        memory.habits[habit["id"]] = {k: v for k, v in habit.items() if k != "log_probability"}
+    for hive in dataset.hive_rows():
+        memory.hives[hive["id"]] = hive
+    for member in dataset.members:
+        memory.hive_members[(member["hive_id"], member["user_id"])] = dict(member)
+    for event in dataset.activity_events():
+        memory.activity_events[event["id"]] = event
+    memory.backfill_timeline()
+    memory.rebuild_member_stats()
+
+    return {
+        "profiles": len(memory.profiles),
+        "habits": len(memory.habits),
+        "habit_logs": len(memory.habit_logs),
+        "hives": len(memory.hives),
+        "hive_members": len(memory.hive_members),
+        "hive_member_days": len(memory.hive_member_days),
+        "hive_days": len(memory.hive_days),
+        "hive_member_stats": len(memory.hive_member_stats),
+        "activity_events": len(memory.activity_events),
+        "activity_timeline": len(memory.activity_timeline),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic HabitHive dataset")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--hives", type=int, default=None, help="Defaults to users / 5")
+    parser.add_argument("--members-per-hive", type=int, default=10)
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--today", type=date.fromisoformat, default=None, help="Reference day (YYYY-MM-DD)")
+    parser.add_argument("--out", required=True, help="Directory for CSV files and load.sql")
+    args = parser.parse_args(argv)
+
+    config = DatasetConfig(
+        users=args.users,
+        hives=args.hives,
+        members_per_hive=args.members_per_hive,
+        years=args.years,
+        seed=args.seed,
+        today=args.today,
+    )
+    counts = write_copy_files(SyntheticDataset(config), args.out)
+    print(f"✅ Wrote {sum(counts.values())} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+User Day
+In-process equivalent of SQL public.user_local_date:
+
+    (p_at at time zone coalesce(timezone, 'UTC')
+       - make_interval(hours => coalesce(day_start_hour, 4)))::date
+
+The offset is subtracted from the local wall-clock time, not from the instant,
+so DST transitions shift the boundary exactly as they do in Postgres.
+"""
+
+from datetime import datetime, date, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Any, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DEFAULT_DAY_START_HOUR = 4
+
+
+@lru_cache(maxsize=512)
+def _zone(name: str):
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        # Postgres would reject the name; keep serving the UTC day instead
+        return timezone.utc
+
+
+def local_date(profile: Optional[Dict[str, Any]], at: Optional[datetime] = None) -> date:
+    """The user's day at `at` (default now) for a row holding timezone/day_start_hour."""
+    profile = profile or {}
+    tz = _zone(profile.get("timezone") or "UTC")
+    day_start_hour = profile.get("day_start_hour")
+    if day_start_hour is None:
+        day_start_hour = DEFAULT_DAY_START_HOUR
+
+    at = at or datetime.now(timezone.utc)
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    local = at.astimezone(tz).replace(tzinfo=None)
+    return (local - timedelta(hours=day_start_hour)).date()
@@ -3,10 +3,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import uvicorn
 from dotenv import load_dotenv
+import asyncio
 import os
 
-from app.routers import auth, profiles, habits, hives, activity, contacts, devices, notifications
+from app.routers import auth, profiles, habits, hives, activity, contacts, devices, notifications, export
 from app.core.config import settings
+from app.core.admission import AdmissionMiddleware
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.responses import ORJSONResponse
 
 load_dotenv()
 
@@ -14,16 +18,48 @@ load_dotenv()
 async def lifespan(app: FastAPI):
     print(f"🐝 HabitHive API starting on port {settings.PORT}")
     print(f"📱 Test mode: {settings.TEST_MODE}")
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        # Hive events fan out in process (app/core/hive_events.py)
+        print("⚠️  WEB_CONCURRENCY > 1: hive event streams only see writes handled by their own worker")
+    if settings.TEST_MODE and settings.TEST_MODE_DATASET_USERS > 0:
+        from app.core.synthetic import DatasetConfig, SyntheticDataset, load_test_stores
+        counts = load_test_stores(SyntheticDataset(DatasetConfig(
+            users=settings.TEST_MODE_DATASET_USERS,
+            years=settings.TEST_MODE_DATASET_YEARS,
+            seed=settings.TEST_MODE_DATASET_SEED,
+        )))
+        print(f"🧪 Loaded synthetic dataset: {counts}")
+    use_database = not settings.TEST_MODE and settings.STORAGE_BACKEND == "postgres"
+    if use_database:
+        from app.core.database import init_pool
+        await init_pool()
+        print(f"🐘 Postgres pool ready (max {settings.DATABASE_POOL_MAX_SIZE} connections)")
+    contact_matching = None
+    if not settings.TEST_MODE:
+        # Phone index backfill and Bloom filter load, off the request path
+        from app.core.contact_match import prepare_contact_matching
+        contact_matching = asyncio.create_task(prepare_contact_matching())
     yield
+    if contact_matching:
+        contact_matching.cancel()
+    if use_database:
+        from app.core.database import close_pool
+        await close_pool()
     print("🛑 HabitHive API shutting down")
 
 app = FastAPI(
     title="HabitHive API",
     description="Backend API for HabitHive habit tracking app with social features",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+# Innermost first: requests pass CORS, then the per-user rate limit, then
+# admission control, so 429 and 503 responses carry CORS headers too
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -52,6 +88,7 @@ app.include_router(activity.router, prefix="/api/activity", tags=["activity"])
 app.include_router(contacts.router, prefix="/api/contacts", tags=["contacts"])
 app.include_router(devices.router, prefix="/api/devices", tags=["devices"])
 app.include_router(notifications.router, prefix="/api/notifications", tags=["notifications"])
+app.include_router(export.router, prefix="/api/export", tags=["export"])
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,99 @@
+"""
+Row Mapping
+Builds schema models from repository rows a whole result list at a time.
+
+validate_rows runs one TypeAdapter(list[Model]) validation over the list,
+for rows whose columns other writers may have filled (the activity feed).
+construct_rows is for rows read from our own database, which were validated
+on the way in: it skips validation and only converts the columns whose
+backend value may still be a string (ids, dates, timestamps, times, enums),
+with each column's converter resolved once per model rather than per value.
+"""
+
+from datetime import date, datetime, time
+from enum import Enum
+from functools import lru_cache
+from types import UnionType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type, TypeVar, Union, get_args, get_origin
+from uuid import UUID
+
+from pydantic import BaseModel, TypeAdapter
+
+from app.repositories.base import as_date
+
+M = TypeVar("M", bound=BaseModel)
+Converter = Callable[[Any], Any]
+
+
+def _to_uuid(value: Any) -> UUID:
+    return value if isinstance(value, UUID) else UUID(str(value))
+
+
+def _to_datetime(value: Any) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+
+def _to_time(value: Any) -> time:
+    return value if isinstance(value, time) else time.fromisoformat(str(value))
+
+
+def _converter(annotation: Any) -> Optional[Converter]:
+    """Converter for a field annotation, or None when the raw value is already right."""
+    if get_origin(annotation) in (Union, UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        inner = _converter(args[0]) if len(args) == 1 else None
+        if inner is None:
+            return None
+        return lambda value: None if value is None else inner(value)
+    if annotation is UUID:
+        return _to_uuid
+    if annotation is datetime:
+        return _to_datetime
+    if annotation is date:
+        return as_date
+    if annotation is time:
+        return _to_time
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return annotation
+    return None
+
+
+@lru_cache(maxsize=None)
+def _columns(model: Type[BaseModel]) -> Tuple[Tuple[str, Optional[Converter]], ...]:
+    return tuple((name, _converter(field.annotation)) for name, field in model.model_fields.items())
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def validate_rows(model: Type[M], rows: Iterable[Dict[str, Any]]) -> List[M]:
+    """Validate every row in a single pydantic call."""
+    return _list_adapter(model).validate_python(list(rows))
+
+
+def construct_row(model: Type[M], row: Dict[str, Any], **extra: Any) -> M:
+    """Build a model from a trusted row without validation; `extra` overrides columns."""
+    values: Dict[str, Any] = {}
+    for name, convert in _columns(model):
+        if name in extra:
+            values[name] = extra[name]
+        elif name in row:
+            value = row[name]
+            values[name] = convert(value) if convert is not None and value is not None else value
+    return model.model_construct(**values)
+
+
+def construct_rows(model: Type[M], rows: Iterable[Dict[str, Any]]) -> List[M]:
+    """construct_row for each trusted row."""
+    columns = _columns(model)
+    result = []
+    for row in rows:
+        values = {}
+        for name, convert in columns:
+            if name in row:
+                value = row[name]
+                values[name] = convert(value) if convert is not None and value is not None else value
+        result.append(model.model_construct(**values))
+    return result
@@ -128,6 +128,12 @@ class HabitLog(HabitLogBase):
     source: str = "manual"
     created_at: datetime
 
+class HabitImportResult(BaseModel):
+    imported: int = 0
+    skipped: int = 0
+    habits: int = 0
+    errors: List[str] = []
+
 class LogHabitRequest(BaseModel):
     habit_id: UUID
     value: int = Field(1, gt=0)
@@ -262,6 +268,22 @@ class HiveLeaderboardEntry(BaseModel):
     total_hives: int = 0
 
 
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: UUID
+    display_name: str
+    avatar_url: Optional[str] = None
+    completed: int = 0
+    total_hives: int = 0
+
+
+class HiveLeaderboardResponse(BaseModel):
+    window: Literal["today", "7d", "30d", "all"]
+    hive_id: Optional[UUID] = None
+    day: date
+    entries: List[LeaderboardEntry] = []
+
+
 class HiveOverviewResponse(BaseModel):
     hives: List[Hive]
     leaderboard: List[HiveLeaderboardEntry]
@@ -274,12 +296,26 @@ class HiveHeatmapDay(BaseModel):
     total_count: int
 
 
+class CompactSeries(BaseModel):
+    """Base64 day series, see app/core/heatmap.py"""
+    encoding: Literal["bits", "u8", "u16"]
+    data: str
+
+
+class HiveHeatmapCompact(BaseModel):
+    start_date: date
+    days: int
+    completed: CompactSeries
+    total: CompactSeries
+
+
 class HiveDetail(Hive):
     avg_completion: float = 0.0
     today_summary: HiveTodaySummary = HiveTodaySummary()
     members: List[HiveMemberStatus] = []
     recent_activity: List[ActivityEvent] = []
     heatmap: List[HiveHeatmapDay] = []
+    heatmap_compact: Optional[HiveHeatmapCompact] = None
 
 class HabitStreakSummary(BaseModel):
     habit_id: UUID
@@ -332,12 +368,15 @@ class HabitHeatmapSeries(BaseModel):
     name: str
     emoji: Optional[str] = None
     color_hex: str
-    counts: Dict[str, int]
+    counts: Dict[str, int] = {}
+    compact: Optional[CompactSeries] = None
 
 
 class YearOverviewResponse(BaseModel):
     start_date: date
     end_date: date
-    totals: Dict[str, int]
+    format: Literal["map", "compact"] = "map"
+    totals: Dict[str, int] = {}
+    totals_compact: Optional[CompactSeries] = None
     max_total: int = 0
     habits: List[HabitHeatmapSeries] = []
@@ -0,0 +1,64 @@
+"""
+Storage Repositories
+FastAPI dependencies returning the repository implementations for the
+configured backend: in-memory under TEST_MODE, otherwise STORAGE_BACKEND.
+"""
+
+from typing import Dict, Any
+from fastapi import Depends
+from app.core.auth import get_current_user
+from app.core.config import settings
+from app.repositories.base import (
+    ProfilesRepo, HabitsRepo, HivesRepo, ActivityRepo, Cursor, DayKey,
+    as_date, as_datetime, encode_cursor, decode_cursor,
+)
+
+
+def _backend() -> str:
+    if settings.TEST_MODE:
+        return "memory"
+    return settings.STORAGE_BACKEND
+
+
+def _repos():
+    backend = _backend()
+    if backend == "memory":
+        from app.repositories import memory as module
+        prefix = "Memory"
+    elif backend == "postgrest":
+        from app.repositories import postgrest as module
+        prefix = "Postgrest"
+    elif backend == "postgres":
+        from app.repositories import postgres as module
+        prefix = "Postgres"
+    else:
+        raise RuntimeError(f"Unknown STORAGE_BACKEND: {backend}")
+    return module, prefix
+
+
+def _make(kind: str, current_user: Dict[str, Any]):
+    module, prefix = _repos()
+    return getattr(module, f"{prefix}{kind}Repo")(current_user)
+
+
+def get_profiles_repo(current_user: Dict[str, Any] = Depends(get_current_user)) -> ProfilesRepo:
+    return _make("Profiles", current_user)
+
+
+def get_habits_repo(current_user: Dict[str, Any] = Depends(get_current_user)) -> HabitsRepo:
+    return _make("Habits", current_user)
+
+
+def get_hives_repo(current_user: Dict[str, Any] = Depends(get_current_user)) -> HivesRepo:
+    return _make("Hives", current_user)
+
+
+def get_activity_repo(current_user: Dict[str, Any] = Depends(get_current_user)) -> ActivityRepo:
+    return _make("Activity", current_user)
+
+
+__all__ = [
+    "ProfilesRepo", "HabitsRepo", "HivesRepo", "ActivityRepo", "Cursor", "DayKey",
+    "as_date", "as_datetime", "encode_cursor", "decode_cursor",
+    "get_profiles_repo", "get_habits_repo", "get_hives_repo", "get_activity_repo",
+]
@@ -0,0 +1,311 @@
+"""
+Storage Repositories
+Interfaces the routers use for all data access, independent of the backend.
+
+Every repository is bound to the caller (the dict returned by get_current_user)
+so backends can apply row level security or the equivalent ownership checks.
+Rows are plain dicts keyed by column name. Ids are strings; date and timestamp
+columns may come back as ISO strings or as date/datetime objects depending on
+the backend, so callers should parse them with `as_date` / `as_datetime`.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional, Iterable, Tuple, AsyncIterator
+from datetime import datetime, date, timezone
+import base64
+import uuid
+
+import orjson
+
+from app.core.profile_cache import profile_display_cache, profile_day_cache
+from app.core.user_day import local_date
+
+# Keyset position in a (created_at, id) ordering
+Cursor = Tuple[datetime, str]
+
+# Keyset position in a (day, id) ordering of the caller's per-day rows
+DayKey = Tuple[date, str]
+
+# Columns of the HabitLog response schema, for JSON passthrough listings
+HABIT_LOG_COLUMNS = ("id", "habit_id", "user_id", "log_date", "value", "source", "created_at")
+
+
+def as_date(value: Any) -> Optional[date]:
+    """Normalise a date column value from any backend."""
+    if value is None or (isinstance(value, date) and not isinstance(value, datetime)):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return date.fromisoformat(str(value)[:10])
+
+
+def as_datetime(value: Any) -> Optional[datetime]:
+    """Normalise a timestamp column value to an aware UTC datetime (naive means UTC)."""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Opaque cursor for a row's (created_at, id) position."""
+    raw = f"{as_datetime(row['created_at']).isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    Inverse of encode_cursor; raises ValueError for malformed cursors. The id
+    must be a UUID, since backends interpolate it into PostgREST filters.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|", 1)
+        return as_datetime(created_at), str(uuid.UUID(row_id))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+async def as_chunks(*parts: bytes) -> AsyncIterator[bytes]:
+    """Async byte stream over already built response parts."""
+    for part in parts:
+        yield part
+
+
+class Repo(ABC):
+    """Base class holding the caller identity"""
+
+    def __init__(self, current_user: Dict[str, Any]):
+        self.current_user = current_user
+        self.user_id = str(current_user["id"])
+
+
+class ProfilesRepo(Repo):
+    """Profile lookups shared by the social endpoints"""
+
+    async def list_display(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Map user id -> {id, display_name, avatar_url}, cached per caller (RLS decides who is visible)."""
+        return await profile_display_cache.get_many(self.user_id, user_ids, self.fetch_display)
+
+    @abstractmethod
+    async def fetch_display(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """list_display straight from storage; only the cache misses are passed in."""
+
+    async def user_local_date(self, user_id: Optional[str] = None, at: Optional[datetime] = None) -> date:
+        """The user's current day, honouring timezone and day_start_hour (SQL user_local_date)."""
+        user_id = str(user_id or self.user_id)
+        day_settings = await profile_day_cache.get_many(self.user_id, [user_id], self.fetch_day_settings)
+        return local_date(day_settings.get(user_id), at)
+
+    @abstractmethod
+    async def fetch_day_settings(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Map user id -> {timezone, day_start_hour} straight from storage."""
+
+
+class HabitsRepo(Repo):
+    """Habits and habit logs owned by the caller"""
+
+    @abstractmethod
+    async def list_habits(self, active_only: bool = True) -> List[Dict[str, Any]]:
+        """Caller's habits, newest first."""
+
+    @abstractmethod
+    async def get_habit(self, habit_id: str) -> Optional[Dict[str, Any]]:
+        """A single habit by id, or None."""
+
+    @abstractmethod
+    async def create_habit(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a habit for the caller and return the stored row."""
+
+    @abstractmethod
+    async def update_habit(self, habit_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply a partial update; None if the habit does not exist."""
+
+    @abstractmethod
+    async def delete_habit(self, habit_id: str) -> bool:
+        """Delete a habit and its logs."""
+
+    @abstractmethod
+    async def list_logs(
+        self,
+        habit_id: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        descending: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Caller's logs, optionally for one habit and an inclusive date range, ordered by log_date."""
+
+    @abstractmethod
+    async def list_habit_logs_page(
+        self,
+        habit_id: str,
+        limit: int,
+        oldest: Optional[date] = None,
+        newest: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Up to `limit` of the caller's logs for one habit with oldest <= log_date
+        <= newest, newest first (a range read on idx_logs_habit_date).
+        """
+
+    async def list_logs_json(
+        self,
+        habit_id: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        list_logs as a JSON array of HABIT_LOG_COLUMNS, in byte chunks. Backends
+        override this to hand over the database's own JSON without parsing rows.
+        """
+        rows = await self.list_logs(habit_id=habit_id, start_date=start_date, end_date=end_date)
+        return as_chunks(orjson.dumps([{column: row.get(column) for column in HABIT_LOG_COLUMNS} for row in rows]))
+
+    @abstractmethod
+    async def list_logs_page(self, after: Optional[DayKey], limit: int) -> List[Dict[str, Any]]:
+        """Up to `limit` of the caller's logs ordered by (log_date, habit_id), after that key."""
+
+    @abstractmethod
+    async def log_habit(self, habit_id: str, value: int, at: datetime) -> Dict[str, Any]:
+        """Upsert the log for the user's local day at `at` and refresh habit streak columns."""
+
+    @abstractmethod
+    async def delete_log(self, habit_id: str, log_date: date) -> bool:
+        """Delete the caller's log for a day; False if there was none."""
+
+    @abstractmethod
+    async def upsert_logs(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Bulk upsert {habit_id, log_date, value} rows on (habit_id, log_date) as
+        source 'import', without touching streaks or activity. Rows must be
+        unique per (habit_id, log_date) and belong to the caller's habits.
+        """
+
+    @abstractmethod
+    async def refresh_habit_stats(self, habit_ids: List[str]) -> None:
+        """Recompute the streak and completion columns of the caller's habits."""
+
+
+class HivesRepo(Repo):
+    """Hives, their members and per-day progress"""
+
+    @abstractmethod
+    async def list_memberships(self) -> List[Dict[str, Any]]:
+        """Caller's active memberships (hive_id, user_id, role)."""
+
+    @abstractmethod
+    async def get_membership(self, hive_id: str) -> Optional[Dict[str, Any]]:
+        """Caller's active membership in a hive, or None."""
+
+    @abstractmethod
+    async def list_hives(self, hive_ids: List[str]) -> List[Dict[str, Any]]:
+        """Active hives among the ids, most recently updated first."""
+
+    @abstractmethod
+    async def get_hive(self, hive_id: str) -> Optional[Dict[str, Any]]:
+        """A hive by id whether or not it is active, or None."""
+
+    @abstractmethod
+    async def list_members(self, hive_ids: List[str]) -> List[Dict[str, Any]]:
+        """Active member rows for the hives."""
+
+    @abstractmethod
+    async def count_members(self, hive_id: str) -> int:
+        """Number of active members."""
+
+    @abstractmethod
+    async def list_member_days(
+        self,
+        hive_ids: List[str],
+        start_date: date,
+        end_date: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """hive_member_days rows for the hives within an inclusive date range."""
+
+    @abstractmethod
+    async def list_my_days_page(self, after: Optional[DayKey], limit: int) -> List[Dict[str, Any]]:
+        """Up to `limit` of the caller's own member days ordered by (day_date, hive_id), after that key."""
+
+    @abstractmethod
+    async def list_hive_days(self, hive_id: str, start_date: date) -> List[Dict[str, Any]]:
+        """hive_days aggregates since start_date, newest first."""
+
+    @abstractmethod
+    async def list_member_stats(self, hive_ids: List[str]) -> List[Dict[str, Any]]:
+        """hive_member_stats rows (completed_total, recent_mask, recent_anchor) for the hives."""
+
+    @abstractmethod
+    async def create_hive(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a hive owned by the caller and return the stored row."""
+
+    @abstractmethod
+    async def add_member(self, hive_id: str, role: str = "member") -> None:
+        """Add the caller to a hive."""
+
+    @abstractmethod
+    async def update_hive(self, hive_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply a partial update; None if the hive does not exist."""
+
+    @abstractmethod
+    async def delete_hive(self, hive_id: str) -> None:
+        """Delete a hive and everything hanging off it."""
+
+    @abstractmethod
+    async def create_hive_from_habit(self, habit_id: str, name: Optional[str], backfill_days: int) -> str:
+        """Create a hive mirroring one of the caller's habits; returns the hive id."""
+
+    @abstractmethod
+    async def create_invite(self, hive_id: str, ttl_minutes: int, max_uses: int) -> Dict[str, Any]:
+        """Create an invite code (owner only)."""
+
+    @abstractmethod
+    async def join_with_code(self, code: str) -> str:
+        """Join the hive behind an invite code; returns the hive id."""
+
+    @abstractmethod
+    async def leave_hive(self, hive_id: str) -> None:
+        """Deactivate the caller's membership."""
+
+    @abstractmethod
+    async def log_today(self, hive_id: str, value: int) -> Dict[str, Any]:
+        """Upsert the caller's hive_member_days row for today."""
+
+    @abstractmethod
+    async def advance_day(self, hive_id: str, day: date) -> Dict[str, Any]:
+        """Evaluate a day and advance the shared streak; returns advanced/complete_count/required_count."""
+
+
+class ActivityRepo(Repo):
+    """Activity feed events"""
+
+    @abstractmethod
+    async def list_events(
+        self,
+        hive_ids: List[str],
+        limit: int,
+        with_actor: bool = True,
+        before: Optional[Cursor] = None,
+        after: Optional[Cursor] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Events for the hives, newest first; with_actor adds actor_name/actor_avatar.
+
+        before returns the `limit` newest events older than the cursor; after
+        returns the `limit` oldest events newer than it (still newest first).
+        """
+
+    @abstractmethod
+    async def list_timeline(
+        self,
+        limit: int,
+        before: Optional[Cursor] = None,
+        after: Optional[Cursor] = None,
+    ) -> List[Dict[str, Any]]:
+        """The caller's fanned-out hive events with actor data, paged like list_events."""
+
+    @abstractmethod
+    async def create_event(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert an event authored by the caller and return the stored row."""
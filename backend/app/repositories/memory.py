@@ -0,0 +1,720 @@
+"""
+In-Memory Repositories
+TEST_MODE backend. Tables live in process-wide IndexedTables and the RPCs the
+database provides (log_habit, join_hive_with_code, advance_hive_day, ...) are
+emulated closely enough for the routers to behave the same on every backend.
+
+Failures raise LookupError (missing row), PermissionError (not owner / not a
+member) or ValueError (rejected input) so the routers can map them to 404/403/400.
+"""
+
+from typing import Dict, Any, List, Optional, Iterable
+from datetime import datetime, date, timedelta
+import secrets
+import uuid
+
+from app.core.memory_store import IndexedTable
+from app.core.user_day import local_date
+from app.core.leaderboard import apply_member_day
+from app.repositories.base import (
+    ProfilesRepo, HabitsRepo, HivesRepo, ActivityRepo, Cursor, DayKey, as_date, as_datetime,
+)
+
+
+# Tables, keyed like their primary keys: members by (hive_id, user_id),
+# member days by (hive_id, user_id, day_date), hive days by (hive_id, day_date),
+# member stats by (hive_id, user_id) and invites by code.
+profiles = IndexedTable()
+habits = IndexedTable("user_id")
+habit_logs = IndexedTable("habit_id", "user_id", ("habit_id", "log_date"))
+hives = IndexedTable("owner_id")
+hive_members = IndexedTable("hive_id", "user_id")
+hive_member_days = IndexedTable(("hive_id", "day_date"), "user_id")
+hive_days = IndexedTable("hive_id")
+hive_member_stats = IndexedTable("hive_id")
+hive_invites = IndexedTable("hive_id")
+activity_events = IndexedTable("hive_id", "actor_id")
+# Per-user copies of hive events keyed by (user_id, event_id)
+activity_timeline = IndexedTable("user_id", "hive_id", "actor_id", ("user_id", "hive_id"))
+
+TIMELINE_MAX_EVENTS = 500
+
+
+def generate_invite_code() -> str:
+    """Generate a random invite code"""
+    return secrets.token_hex(6)
+
+
+def _event_position(event: Dict[str, Any]) -> Cursor:
+    return as_datetime(event["created_at"]), str(event["id"])
+
+
+def _page(events: List[Dict[str, Any]], limit: int, before: Optional[Cursor], after: Optional[Cursor]) -> List[Dict[str, Any]]:
+    """Newest-first keyset page over (created_at, id)."""
+    if before:
+        events = [e for e in events if _event_position(e) < before]
+    if after:
+        events = [e for e in events if _event_position(e) > after]
+        events.sort(key=_event_position)
+        return events[:limit][::-1]
+    events.sort(key=_event_position, reverse=True)
+    return events[:limit]
+
+
+def _day_page(rows: Iterable[Dict[str, Any]], day_column: str, id_column: str, after: Optional[DayKey], limit: int) -> List[Dict[str, Any]]:
+    """Keyset page over (day, id) for the export listings."""
+    keyed = sorted(((as_date(row[day_column]), str(row[id_column])), row) for row in rows)
+    return [dict(row) for key, row in keyed if after is None or key > after][:limit]
+
+
+def _timeline_row(user_id: str, event: Dict[str, Any]) -> Dict[str, Any]:
+    profile = profiles.get(str(event["actor_id"])) or {}
+    return {
+        **event,
+        "user_id": user_id,
+        "actor_name": profile.get("display_name"),
+        "actor_avatar": profile.get("avatar_url"),
+    }
+
+
+def trim_timeline(user_id: str, max_events: int = TIMELINE_MAX_EVENTS) -> None:
+    rows = activity_timeline.where(user_id=user_id)
+    if len(rows) > max_events:
+        rows.sort(key=_event_position, reverse=True)
+        for row in rows[max_events:]:
+            del activity_timeline[(user_id, str(row["id"]))]
+
+
+def add_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Store an event and fan hive events out to active members' timelines."""
+    activity_events[event["id"]] = event
+    if event.get("hive_id"):
+        for member in hive_members.where(hive_id=event["hive_id"]):
+            if _is_active(member):
+                activity_timeline[(member["user_id"], event["id"])] = _timeline_row(member["user_id"], event)
+                trim_timeline(member["user_id"])
+    return event
+
+
+def backfill_timeline(user_id: Optional[str] = None, hive_id: Optional[str] = None) -> int:
+    """Copy recent hive events into members' timelines; mirrors backfill_activity_timeline."""
+    criteria = {k: v for k, v in (("user_id", user_id), ("hive_id", hive_id)) if v}
+    members = hive_members.where(**criteria) if criteria else list(hive_members.values())
+    touched = set()
+    count = 0
+    for member in members:
+        if not _is_active(member):
+            continue
+        for event in activity_events.where(hive_id=member["hive_id"]):
+            key = (member["user_id"], event["id"])
+            if key not in activity_timeline:
+                activity_timeline[key] = _timeline_row(member["user_id"], event)
+                count += 1
+        touched.add(member["user_id"])
+    for member_id in touched:
+        trim_timeline(member_id)
+    return count
+
+
+def _streaks(days: Iterable[date]) -> Dict[str, int]:
+    """Current (ending on the latest day) and longest run of consecutive days."""
+    ordered = sorted(set(days))
+    longest = run = 0
+    previous: Optional[date] = None
+    for day in ordered:
+        run = run + 1 if previous and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    return {"current_streak": run, "longest_streak": longest}
+
+
+def _is_active(row: Dict[str, Any]) -> bool:
+    return row.get("is_active", True)
+
+
+def refresh_hive_day(hive_id: str, day: date) -> Optional[Dict[str, Any]]:
+    """
+    Recount a hive_days aggregate like SQL refresh_hive_day; keeps `advanced`
+    and the required_count of an existing row.
+    """
+    hive = hives.get(hive_id)
+    if hive is None:
+        return None
+    target = hive.get("target_per_day") or 1
+    members = [m for m in hive_members.where(hive_id=hive_id) if _is_active(m)]
+    complete_count = 0
+    for member in members:
+        entry = hive_member_days.get((hive_id, member["user_id"], day))
+        if entry and (entry.get("value") or 0) >= target:
+            complete_count += 1
+
+    row = hive_days.get((hive_id, day))
+    if row is None:
+        row = {
+            "hive_id": hive_id,
+            "day_date": day,
+            "advanced": False,
+            "required_count": len(members),
+            "created_at": datetime.utcnow(),
+        }
+        hive_days[(hive_id, day)] = row
+    row["complete_count"] = complete_count
+    return row
+
+
+def _hive_day_scheduled(hive: Dict[str, Any], day: date) -> bool:
+    # schedule_weekmask bit 0 = Monday
+    return hive.get("schedule_daily", True) or bool(hive.get("schedule_weekmask", 127) & (1 << day.weekday()))
+
+
+def _hive_day_met(hive: Dict[str, Any], counts: Dict[str, Any]) -> bool:
+    required_count = counts["required_count"]
+    needed = required_count
+    if hive.get("rule") == "threshold" and hive.get("threshold") is not None:
+        needed = hive["threshold"]
+    return required_count > 0 and counts["complete_count"] >= needed
+
+
+def _previous_scheduled_day(hive: Dict[str, Any], day: date) -> date:
+    for back in range(1, 8):
+        if _hive_day_scheduled(hive, day - timedelta(days=back)):
+            return day - timedelta(days=back)
+    return day - timedelta(days=1)
+
+
+def close_hive_day(hive_id: str, day: date, final: bool) -> Optional[bool]:
+    """
+    Evaluate one hive day like SQL close_hive_day: None for an unscheduled
+    day, otherwise whether it advanced. A final day that did not advance
+    resets current_streak.
+    """
+    hive = hives.get(hive_id)
+    if hive is None:
+        return None
+    counts = refresh_hive_day(hive_id, day)
+    if not _hive_day_scheduled(hive, day):
+        return None
+
+    last = as_date(hive.get("last_advanced_on"))
+    if _hive_day_met(hive, counts):
+        counts["advanced"] = True
+        if last is None or last < day:
+            streak = hive.get("current_streak", 0) + 1 if last == _previous_scheduled_day(hive, day) else 1
+            hive["current_streak"] = streak
+            hive["longest_streak"] = max(hive.get("longest_streak", 0), streak)
+            hive["last_advanced_on"] = day
+            hive["updated_at"] = datetime.utcnow()
+        return True
+
+    if final and (last is None or last < day) and hive.get("current_streak"):
+        hive["current_streak"] = 0
+        hive["updated_at"] = datetime.utcnow()
+    return False
+
+
+def roll_over_hive(hive_id: str, through: date) -> None:
+    """Close every finished day since the hive's last rollover (SQL roll_over_hive)."""
+    hive = hives.get(hive_id)
+    if hive is None:
+        return
+    last = as_date(hive.get("last_rolled_over_on"))
+    day = last + timedelta(days=1) if last else local_date(profiles.get(hive["owner_id"]), hive["created_at"])
+    day = max(day, through - timedelta(days=365))
+    while day <= through:
+        close_hive_day(hive_id, day, True)
+        day += timedelta(days=1)
+    if last is None or last < through:
+        hive["last_rolled_over_on"] = through
+
+
+def record_member_day(hive_id: str, user_id: str, day: date, old_value: Optional[int], new_value: Optional[int]) -> None:
+    """Fold a hive_member_days write into hive_member_stats (SQL hive_member_days_apply_stats)."""
+    hive = hives.get(hive_id) or {}
+    target = hive.get("target_per_day") or 1
+    stats = hive_member_stats.get((hive_id, user_id))
+    if stats is None:
+        stats = {"hive_id": hive_id, "user_id": user_id, "completed_total": 0, "recent_mask": 0}
+        hive_member_stats[(hive_id, user_id)] = stats
+    apply_member_day(stats, day, (old_value or 0) >= target, (new_value or 0) >= target)
+
+
+def rebuild_member_stats() -> int:
+    """Recompute every stats row from hive_member_days (SQL rebuild_hive_member_stats)."""
+    hive_member_stats.clear()
+    for day in sorted(hive_member_days.values(), key=lambda d: as_date(d["day_date"])):
+        record_member_day(day["hive_id"], day["user_id"], as_date(day["day_date"]), None, day.get("value"))
+    return len(hive_member_stats)
+
+
+class MemoryProfilesRepo(ProfilesRepo):
+
+    async def fetch_display(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for uid in {str(uid) for uid in user_ids}:
+            profile = profiles.get(uid)
+            if profile:
+                result[uid] = {
+                    "id": uid,
+                    "display_name": profile.get("display_name"),
+                    "avatar_url": profile.get("avatar_url"),
+                }
+        return result
+
+    async def fetch_day_settings(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        return {
+            uid: {"timezone": profiles[uid].get("timezone"), "day_start_hour": profiles[uid].get("day_start_hour")}
+            for uid in user_ids if uid in profiles
+        }
+
+
+class MemoryHabitsRepo(HabitsRepo):
+
+    def _owned(self, habit_id: str) -> Dict[str, Any]:
+        habit = habits.get(habit_id)
+        if habit is None:
+            raise LookupError("Habit not found")
+        if str(habit["user_id"]) != self.user_id:
+            raise PermissionError("Not authorized")
+        return habit
+
+    async def list_habits(self, active_only: bool = True) -> List[Dict[str, Any]]:
+        rows = [dict(h) for h in habits.where(user_id=self.user_id) if not active_only or _is_active(h)]
+        rows.sort(key=lambda h: str(h["created_at"]), reverse=True)
+        return rows
+
+    async def get_habit(self, habit_id: str) -> Optional[Dict[str, Any]]:
+        habit = habits.get(habit_id)
+        return dict(habit) if habit else None
+
+    async def create_habit(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        habit = {
+            "id": str(uuid.uuid4()),
+            "user_id": self.user_id,
+            **data,
+            "is_active": True,
+            "current_streak": 0,
+            "longest_streak": 0,
+            "last_completed_date": None,
+            "total_completions": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        habits[habit["id"]] = habit
+        return dict(habit)
+
+    async def update_habit(self, habit_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        habit = habits.get(habit_id)
+        if habit is None or str(habit["user_id"]) != self.user_id:
+            return None
+        habit.update(data)
+        habit["updated_at"] = datetime.utcnow()
+        return dict(habit)
+
+    async def delete_habit(self, habit_id: str) -> bool:
+        habit = habits.get(habit_id)
+        if habit is None or str(habit["user_id"]) != self.user_id:
+            return False
+        del habits[habit_id]
+        habit_logs.delete_where(habit_id=habit_id)
+        return True
+
+    async def list_logs(
+        self,
+        habit_id: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        descending: bool = False,
+    ) -> List[Dict[str, Any]]:
+        if habit_id:
+            rows = habit_logs.where(habit_id=habit_id, user_id=self.user_id)
+        else:
+            rows = habit_logs.where(user_id=self.user_id)
+        result = []
+        for row in rows:
+            log_date = as_date(row["log_date"])
+            if start_date and log_date < start_date:
+                continue
+            if end_date and log_date > end_date:
+                continue
+            result.append(dict(row))
+        result.sort(key=lambda row: as_date(row["log_date"]), reverse=descending)
+        return result
+
+    async def list_logs_page(self, after: Optional[DayKey], limit: int) -> List[Dict[str, Any]]:
+        return _day_page(habit_logs.where(user_id=self.user_id), "log_date", "habit_id", after, limit)
+
+    async def list_habit_logs_page(
+        self,
+        habit_id: str,
+        limit: int,
+        oldest: Optional[date] = None,
+        newest: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        rows = [
+            dict(row) for row in habit_logs.where(habit_id=habit_id, user_id=self.user_id)
+            if (oldest is None or as_date(row["log_date"]) >= oldest)
+            and (newest is None or as_date(row["log_date"]) <= newest)
+        ]
+        rows.sort(key=lambda row: as_date(row["log_date"]), reverse=True)
+        return rows[:limit]
+
+    async def log_habit(self, habit_id: str, value: int, at: datetime) -> Dict[str, Any]:
+        habit = self._owned(habit_id)
+        log_date = local_date(profiles.get(self.user_id), at)
+        value = min(max(value, 0), habit.get("target_per_day") or 1)
+        now = datetime.utcnow()
+
+        log = habit_logs.first(habit_id=habit_id, log_date=log_date)
+        if log:
+            log["value"] = value
+            log["updated_at"] = now
+        else:
+            log = {
+                "id": str(uuid.uuid4()),
+                "habit_id": habit_id,
+                "user_id": self.user_id,
+                "log_date": log_date,
+                "value": value,
+                "source": "api",
+                "created_at": now,
+            }
+            habit_logs[log["id"]] = log
+
+        completed = [as_date(l["log_date"]) for l in habit_logs.where(habit_id=habit_id) if l.get("value", 0) > 0]
+        habit.update(_streaks(completed))
+        habit["last_completed_date"] = log_date
+        habit["total_completions"] = len(completed)
+        habit["updated_at"] = now
+
+        if value > 0:
+            add_event({
+                "id": str(uuid.uuid4()),
+                "actor_id": self.user_id,
+                "hive_id": None,
+                "habit_id": habit_id,
+                "type": "habit_completed",
+                "data": {"log_date": log_date.isoformat(), "value": value, "streak": habit["current_streak"]},
+                "created_at": now,
+            })
+        return dict(log)
+
+    async def delete_log(self, habit_id: str, log_date: date) -> bool:
+        return bool(habit_logs.delete_where(habit_id=habit_id, log_date=log_date, user_id=self.user_id))
+
+    async def upsert_logs(self, rows: List[Dict[str, Any]]) -> int:
+        now = datetime.utcnow()
+        for row in rows:
+            log_date = as_date(row["log_date"])
+            log = habit_logs.first(habit_id=row["habit_id"], log_date=log_date)
+            if log:
+                log["value"] = row["value"]
+                log["updated_at"] = now
+            else:
+                log_id = str(uuid.uuid4())
+                habit_logs[log_id] = {
+                    "id": log_id,
+                    "habit_id": row["habit_id"],
+                    "user_id": self.user_id,
+                    "log_date": log_date,
+                    "value": row["value"],
+                    "source": "import",
+                    "created_at": now,
+                }
+        return len(rows)
+
+    async def refresh_habit_stats(self, habit_ids: List[str]) -> None:
+        for habit_id in habit_ids:
+            habit = self._owned(habit_id)
+            logs = list(habit_logs.where(habit_id=habit_id))
+            completed = [as_date(l["log_date"]) for l in logs if l.get("value", 0) > 0]
+            habit.update(_streaks(completed))
+            habit["total_completions"] = len(completed)
+            habit["last_completed_date"] = max(completed, default=None)
+            habit["updated_at"] = datetime.utcnow()
+
+
+class MemoryHivesRepo(HivesRepo):
+
+    def _hive(self, hive_id: str) -> Dict[str, Any]:
+        hive = hives.get(hive_id)
+        if hive is None:
+            raise LookupError("Hive not found")
+        return hive
+
+    def _require_member(self, hive_id: str) -> Dict[str, Any]:
+        member = hive_members.get((hive_id, self.user_id))
+        if not member or not _is_active(member):
+            raise PermissionError("Not a member of this hive")
+        return member
+
+    def _insert_member(self, hive_id: str, role: str) -> None:
+        hive_members[(hive_id, self.user_id)] = {
+            "hive_id": hive_id,
+            "user_id": self.user_id,
+            "role": role,
+            "joined_at": datetime.utcnow(),
+            "left_at": None,
+            "is_active": True,
+        }
+
+    def _insert_hive(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        hive = {
+            "id": str(uuid.uuid4()),
+            "owner_id": self.user_id,
+            "description": None,
+            "rule": "all_must_complete",
+            "threshold": None,
+            "max_members": 10,
+            **data,
+            "is_active": True,
+            "current_streak": 0,
+            "longest_streak": 0,
+            "last_advanced_on": None,
+            "last_rolled_over_on": None,
+            "invite_code": generate_invite_code(),
+            "created_at": now,
+            "updated_at": now,
+        }
+        hives[hive["id"]] = hive
+        return hive
+
+    async def list_memberships(self) -> List[Dict[str, Any]]:
+        return [dict(m) for m in hive_members.where(user_id=self.user_id) if _is_active(m)]
+
+    async def get_membership(self, hive_id: str) -> Optional[Dict[str, Any]]:
+        member = hive_members.get((hive_id, self.user_id))
+        return dict(member) if member and _is_active(member) else None
+
+    async def list_hives(self, hive_ids: List[str]) -> List[Dict[str, Any]]:
+        rows = [dict(hives[h]) for h in hive_ids if h in hives and _is_active(hives[h])]
+        rows.sort(key=lambda h: str(h.get("updated_at")), reverse=True)
+        return rows
+
+    async def get_hive(self, hive_id: str) -> Optional[Dict[str, Any]]:
+        hive = hives.get(hive_id)
+        return dict(hive) if hive else None
+
+    async def list_members(self, hive_ids: List[str]) -> List[Dict[str, Any]]:
+        return [dict(m) for hive_id in hive_ids for m in hive_members.where(hive_id=hive_id) if _is_active(m)]
+
+    async def count_members(self, hive_id: str) -> int:
+        return sum(1 for m in hive_members.where(hive_id=hive_id) if _is_active(m))
+
+    async def list_member_days(
+        self,
+        hive_ids: List[str],
+        start_date: date,
+        end_date: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        end_date = end_date or date.today()
+        rows = []
+        for hive_id in hive_ids:
+            day = start_date
+            while day <= end_date:
+                rows.extend(dict(d) for d in hive_member_days.where(hive_id=hive_id, day_date=day))
+                day += timedelta(days=1)
+        return rows
+
+    async def list_my_days_page(self, after: Optional[DayKey], limit: int) -> List[Dict[str, Any]]:
+        return _day_page(hive_member_days.where(user_id=self.user_id), "day_date", "hive_id", after, limit)
+
+    async def list_hive_days(self, hive_id: str, start_date: date) -> List[Dict[str, Any]]:
+        rows = [dict(d) for d in hive_days.where(hive_id=hive_id) if as_date(d["day_date"]) >= start_date]
+        rows.sort(key=lambda d: as_date(d["day_date"]), reverse=True)
+        return rows
+
+    async def list_member_stats(self, hive_ids: List[str]) -> List[Dict[str, Any]]:
+        return [dict(row) for hive_id in hive_ids for row in hive_member_stats.where(hive_id=hive_id)]
+
+    async def create_hive(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(self._insert_hive(data))
+
+    async def add_member(self, hive_id: str, role: str = "member") -> None:
+        self._hive(hive_id)
+        self._insert_member(hive_id, role)
+
+    async def update_hive(self, hive_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        hive = hives.get(hive_id)
+        if hive is None:
+            return None
+        hive.update(data)
+        hive["updated_at"] = datetime.utcnow()
+        return dict(hive)
+
+    async def delete_hive(self, hive_id: str) -> None:
+        hives.pop(hive_id, None)
+        hive_members.delete_where(hive_id=hive_id)
+        hive_member_days.delete_where(hive_id=hive_id)
+        hive_invites.delete_where(hive_id=hive_id)
+        hive_days.delete_where(hive_id=hive_id)
+        hive_member_stats.delete_where(hive_id=hive_id)
+        activity_timeline.delete_where(hive_id=hive_id)
+
+    async def create_hive_from_habit(self, habit_id: str, name: Optional[str], backfill_days: int) -> str:
+        habit = habits.get(habit_id)
+        if habit is None or str(habit["user_id"]) != self.user_id:
+            raise LookupError("Habit not found")
+
+        hive = self._insert_hive({
+            "name": name or habit["name"],
+            "emoji": habit.get("emoji"),
+            "color_hex": habit["color_hex"],
+            "type": habit["type"],
+            "target_per_day": habit["target_per_day"],
+            "schedule_daily": habit["schedule_daily"],
+            "schedule_weekmask": habit["schedule_weekmask"],
+        })
+        hive_id = hive["id"]
+        self._insert_member(hive_id, "owner")
+
+        if backfill_days > 0:
+            cutoff_date = date.today() - timedelta(days=backfill_days)
+            for log in habit_logs.where(habit_id=habit_id):
+                log_date = as_date(log["log_date"])
+                if log_date >= cutoff_date:
+                    hive_member_days[(hive_id, self.user_id, log_date)] = {
+                        "hive_id": hive_id,
+                        "user_id": self.user_id,
+                        "day_date": log_date,
+                        "value": log["value"],
+                        "done": log["value"] > 0,
+                    }
+                    refresh_hive_day(hive_id, log_date)
+                    record_member_day(hive_id, self.user_id, log_date, None, log["value"])
+        return hive_id
+
+    async def create_invite(self, hive_id: str, ttl_minutes: int, max_uses: int) -> Dict[str, Any]:
+        hive = self._hive(hive_id)
+        if str(hive["owner_id"]) != self.user_id:
+            raise PermissionError("Only owner can create invites")
+
+        now = datetime.utcnow()
+        invite = {
+            "id": str(uuid.uuid4()),
+            "hive_id": hive_id,
+            "code": generate_invite_code(),
+            "created_by": self.user_id,
+            "expires_at": now + timedelta(minutes=ttl_minutes),
+            "max_uses": max_uses,
+            "use_count": 0,
+            "created_at": now,
+        }
+        hive_invites[invite["code"]] = invite
+        hive["invite_code"] = invite["code"]
+        hive["updated_at"] = now
+        return dict(invite)
+
+    async def join_with_code(self, code: str) -> str:
+        invite = hive_invites.get(code)
+        if invite is None:
+            raise ValueError("Invalid invite code")
+        if invite["expires_at"] < datetime.utcnow():
+            raise ValueError("Invite has expired")
+        if invite["use_count"] >= invite["max_uses"]:
+            raise ValueError("Invite has been used too many times")
+
+        hive_id = invite["hive_id"]
+        if self._is_member(hive_id):
+            return hive_id
+
+        hive = self._hive(hive_id)
+        if await self.count_members(hive_id) >= (hive.get("max_members") or 10):
+            raise ValueError("Hive is full (max 10 members)")
+
+        self._insert_member(hive_id, "member")
+        invite["use_count"] += 1
+
+        backfill_timeline(self.user_id, hive_id)
+        add_event({
+            "id": str(uuid.uuid4()),
+            "actor_id": self.user_id,
+            "hive_id": hive_id,
+            "habit_id": None,
+            "type": "hive_joined",
+            "data": {"code": code},
+            "created_at": datetime.utcnow(),
+        })
+        return hive_id
+
+    def _is_member(self, hive_id: str) -> bool:
+        member = hive_members.get((hive_id, self.user_id))
+        return bool(member and _is_active(member))
+
+    async def leave_hive(self, hive_id: str) -> None:
+        member = hive_members.get((hive_id, self.user_id))
+        if member:
+            member["is_active"] = False
+            member["left_at"] = datetime.utcnow()
+            activity_timeline.delete_where(user_id=self.user_id, hive_id=hive_id)
+
+    async def log_today(self, hive_id: str, value: int) -> Dict[str, Any]:
+        self._hive(hive_id)
+        self._require_member(hive_id)
+
+        today = local_date(profiles.get(self.user_id))
+        day = hive_member_days.get((hive_id, self.user_id, today))
+        if day is None:
+            day = {"hive_id": hive_id, "user_id": self.user_id, "day_date": today}
+            hive_member_days[(hive_id, self.user_id, today)] = day
+        old_value = day.get("value")
+        day["value"] = value
+        day["done"] = value > 0
+        refresh_hive_day(hive_id, today)
+        record_member_day(hive_id, self.user_id, today, old_value, value)
+        return dict(day)
+
+    async def advance_day(self, hive_id: str, day: date) -> Dict[str, Any]:
+        hive = self._hive(hive_id)
+        self._require_member(hive_id)
+
+        # Close the finished days first, never the owner's current day
+        owner_today = local_date(profiles.get(hive["owner_id"]))
+        roll_over_hive(hive_id, min(day, owner_today) - timedelta(days=1))
+        advanced = bool(close_hive_day(hive_id, day, False))
+        counts = hive_days[(hive_id, day)]
+
+        return {
+            "advanced": advanced,
+            "complete_count": counts["complete_count"],
+            "required_count": counts["required_count"],
+        }
+
+
+class MemoryActivityRepo(ActivityRepo):
+
+    async def list_events(
+        self,
+        hive_ids: List[str],
+        limit: int,
+        with_actor: bool = True,
+        before: Optional[Cursor] = None,
+        after: Optional[Cursor] = None,
+    ) -> List[Dict[str, Any]]:
+        events = [dict(e) for hive_id in hive_ids for e in activity_events.where(hive_id=hive_id)]
+        events = _page(events, limit, before, after)
+        if with_actor:
+            for event in events:
+                profile = profiles.get(str(event["actor_id"])) or {}
+                event["actor_name"] = profile.get("display_name")
+                event["actor_avatar"] = profile.get("avatar_url")
+        return events
+
+    async def list_timeline(
+        self,
+        limit: int,
+        before: Optional[Cursor] = None,
+        after: Optional[Cursor] = None,
+    ) -> List[Dict[str, Any]]:
+        rows = [dict(r) for r in activity_timeline.where(user_id=self.user_id)]
+        return _page(rows, limit, before, after)
+
+    async def create_event(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        event = {
+            "id": str(uuid.uuid4()),
+            **data,
+            "actor_id": self.user_id,
+            "created_at": datetime.utcnow(),
+        }
+        return dict(add_event(event))
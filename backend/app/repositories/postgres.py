@@ -0,0 +1,543 @@
+"""
+Postgres Repositories
+Direct asyncpg implementations for deployments next to the database.
+
+Queries run under the caller's RLS identity (see app.core.database) and call
+the same RPCs PostgREST would. Hot queries are module-level constants so each
+pooled connection prepares them once and reuses the plan.
+"""
+
+from typing import Dict, Any, List, Optional, Iterable, AsyncIterator
+from datetime import datetime, date
+from uuid import UUID
+import asyncpg
+import json
+import jwt
+from fastapi import HTTPException, status
+
+from app.core.database import request_claims, user_transaction
+from app.core.single_flight import single_flight
+from app.repositories.base import (
+    ProfilesRepo, HabitsRepo, HivesRepo, ActivityRepo, Cursor, DayKey, HABIT_LOG_COLUMNS, as_chunks,
+)
+
+
+def _row(record: Optional[asyncpg.Record]) -> Optional[Dict[str, Any]]:
+    """Record -> dict with string ids, matching the PostgREST payloads."""
+    if record is None:
+        return None
+    return {key: str(value) if isinstance(value, UUID) else value for key, value in record.items()}
+
+
+def _rows(records: Iterable[asyncpg.Record]) -> List[Dict[str, Any]]:
+    return [_row(record) for record in records]
+
+
+def _record_json(data: Dict[str, Any]) -> str:
+    """Serialise a partial row; json_populate_record casts it to the column types."""
+    return json.dumps(data, default=str)
+
+
+def _insert_sql(table: str, columns: List[str]) -> str:
+    column_list = ", ".join(columns)
+    return (
+        f"insert into public.{table} ({column_list}) "
+        f"select {column_list} from json_populate_record(null::public.{table}, $1::text::json) "
+        f"returning *"
+    )
+
+
+def _update_sql(table: str, columns: List[str], where: str) -> str:
+    column_list = ", ".join(columns)
+    return (
+        f"update public.{table} set ({column_list}) = "
+        f"(select {column_list} from json_populate_record(null::public.{table}, $1::text::json)) "
+        f"where {where} returning *"
+    )
+
+
+# ----- hot queries (prepared per connection) -----
+
+SELECT_PROFILES_DISPLAY = """
+select id, display_name, avatar_url from public.profiles where id = any($1::uuid[])
+"""
+
+SELECT_PROFILES_DAY_SETTINGS = """
+select id, timezone, day_start_hour from public.profiles where id = any($1::uuid[])
+"""
+
+SELECT_HABITS = """
+select * from public.habits
+where user_id = $1::uuid and ($2::boolean is false or is_active)
+order by created_at desc
+"""
+
+SELECT_HABIT = "select * from public.habits where id = $1::uuid"
+
+# Open bounds are passed as date.min / date.max so the range always maps onto
+# idx_logs_habit_date
+SELECT_HABIT_LOGS_PAGE = """
+select * from public.habit_logs
+where habit_id = $1::uuid and user_id = $2::uuid
+  and log_date between $3::date and $4::date
+order by log_date desc
+limit $5
+"""
+
+# One statement per import batch; rows are unique on (habit_id, log_date)
+UPSERT_IMPORTED_LOGS = """
+insert into public.habit_logs (habit_id, user_id, log_date, value, source)
+select r.habit_id, $1::uuid, r.log_date, r.value, 'import'
+from json_populate_recordset(null::public.habit_logs, $2::text::json) r
+on conflict (habit_id, log_date)
+do update set value = excluded.value, updated_at = now()
+"""
+
+# Keyset pages over the caller's per-day rows, on idx_logs_user_date and
+# idx_hive_member_days_user
+SELECT_LOGS_PAGE = """
+select * from public.habit_logs
+where user_id = $1::uuid
+  and ($2::date is null or (log_date, habit_id) > ($2::date, $3::uuid))
+order by log_date, habit_id
+limit $4
+"""
+
+SELECT_MY_DAYS_PAGE = """
+select hive_id, user_id, day_date, value, done, created_at from public.hive_member_days
+where user_id = $1::uuid
+  and ($2::date is null or (day_date, hive_id) > ($2::date, $3::uuid))
+order by day_date, hive_id
+limit $4
+"""
+
+# The JSON array is built in Postgres and returned as text, so rows are never
+# decoded in Python (same shape PostgREST produces)
+SELECT_LOGS_JSON = f"""
+select coalesce(json_agg(t order by t.log_date), '[]')::text
+from (
+  select {", ".join(HABIT_LOG_COLUMNS)} from public.habit_logs
+  where user_id = $1::uuid
+    and ($2::uuid is null or habit_id = $2::uuid)
+    and ($3::date is null or log_date >= $3::date)
+    and ($4::date is null or log_date <= $4::date)
+) t
+"""
+
+SELECT_LOGS = """
+select * from public.habit_logs
+where user_id = $1::uuid
+  and ($2::uuid is null or habit_id = $2::uuid)
+  and ($3::date is null or log_date >= $3::date)
+  and ($4::date is null or log_date <= $4::date)
+order by log_date
+"""
+
+SELECT_MEMBERSHIPS = """
+select hive_id, user_id, role from public.hive_members
+where user_id = $1::uuid and is_active
+"""
+
+SELECT_MEMBERSHIP = """
+select hive_id, user_id, role from public.hive_members
+where hive_id = $1::uuid and user_id = $2::uuid and is_active
+"""
+
+SELECT_HIVES = """
+select * from public.hives
+where id = any($1::uuid[]) and is_active
+order by updated_at desc
+"""
+
+SELECT_HIVE = "select * from public.hives where id = $1::uuid"
+
+SELECT_MEMBERS = """
+select * from public.hive_members
+where hive_id = any($1::uuid[]) and is_active
+"""
+
+COUNT_MEMBERS = "select count(*) from public.hive_members where hive_id = $1::uuid and is_active"
+
+SELECT_MEMBER_DAYS = """
+select hive_id, user_id, day_date, value, done from public.hive_member_days
+where hive_id = any($1::uuid[])
+  and day_date >= $2::date
+  and ($3::date is null or day_date <= $3::date)
+"""
+
+SELECT_HIVE_DAYS = """
+select day_date, complete_count, required_count, advanced from public.hive_days
+where hive_id = $1::uuid and day_date >= $2::date
+order by day_date desc
+"""
+
+SELECT_MEMBER_STATS = """
+select hive_id, user_id, completed_total, recent_mask, recent_anchor, last_completed_on
+from public.hive_member_stats
+where hive_id = any($1::uuid[])
+"""
+
+EVENTS_FROM = """
+select e.*{actor}
+from public.activity_events e{join}
+where e.hive_id = any($1::uuid[]){keyset}
+order by e.created_at {direction}, e.id {direction}
+limit $2
+"""
+
+
+def _events_sql(with_actor: bool, keyset: str, direction: str) -> str:
+    return EVENTS_FROM.format(
+        actor=", p.display_name as actor_name, p.avatar_url as actor_avatar" if with_actor else "",
+        join="\nleft join public.profiles p on p.id = e.actor_id" if with_actor else "",
+        keyset=f"\n  and (e.created_at, e.id) {keyset} ($3::timestamptz, $4::uuid)" if keyset else "",
+        direction=direction,
+    )
+
+
+# (with_actor, page) -> query; "before" and "after" are keyset range reads on
+# idx_activity_hive (hive_id, created_at desc)
+SELECT_EVENTS = {
+    (with_actor, page): _events_sql(with_actor, keyset, direction)
+    for with_actor in (True, False)
+    for page, keyset, direction in (
+        ("latest", "", "desc"),
+        ("before", "<", "desc"),
+        ("after", ">", "asc"),
+    )
+}
+
+TIMELINE_FROM = """
+select id, actor_id, hive_id, habit_id, type, data, created_at, actor_name, actor_avatar
+from public.activity_timeline
+where user_id = $1::uuid{keyset}
+order by created_at {direction}, id {direction}
+limit $2
+"""
+
+# page -> query; a range scan of the (user_id, created_at, id) primary key
+SELECT_TIMELINE = {
+    page: TIMELINE_FROM.format(
+        keyset=f"\n  and (created_at, id) {keyset} ($3::timestamptz, $4::uuid)" if keyset else "",
+        direction=direction,
+    )
+    for page, keyset, direction in (
+        ("latest", "", "desc"),
+        ("before", "<", "desc"),
+        ("after", ">", "asc"),
+    )
+}
+
+
+class PostgresRepo:
+    """Opens a transaction under the caller's RLS identity"""
+
+    def __init__(self, current_user: Dict[str, Any]):
+        super().__init__(current_user)
+        try:
+            self.claims = request_claims(current_user)
+        except jwt.InvalidTokenError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid authentication token"
+            )
+
+    def transaction(self):
+        return user_transaction(self.claims)
+
+
+class PostgresProfilesRepo(PostgresRepo, ProfilesRepo):
+
+    async def fetch_display(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        ids = list({str(uid) for uid in user_ids})
+        if not ids:
+            return {}
+        async with self.transaction() as conn:
+            records = await conn.fetch(SELECT_PROFILES_DISPLAY, ids)
+        return {row["id"]: row for row in _rows(records)}
+
+    async def fetch_day_settings(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not user_ids:
+            return {}
+        async with self.transaction() as conn:
+            records = await conn.fetch(SELECT_PROFILES_DAY_SETTINGS, user_ids)
+        return {row["id"]: row for row in _rows(records)}
+
+
+class PostgresHabitsRepo(PostgresRepo, HabitsRepo):
+
+    async def list_habits(self, active_only: bool = True) -> List[Dict[str, Any]]:
+        async with self.transaction() as conn:
+            return _rows(await conn.fetch(SELECT_HABITS, self.user_id, active_only))
+
+    async def get_habit(self, habit_id: str) -> Optional[Dict[str, Any]]:
+        async with self.transaction() as conn:
+            return _row(await conn.fetchrow(SELECT_HABIT, habit_id))
+
+    async def create_habit(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        data = {**data, "user_id": self.user_id}
+        async with self.transaction() as conn:
+            return _row(await conn.fetchrow(_insert_sql("habits", list(data)), _record_json(data)))
+
+    async def update_habit(self, habit_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        query = _update_sql("habits", list(data), "id = $2::uuid and user_id = $3::uuid")
+        async with self.transaction() as conn:
+            return _row(await conn.fetchrow(query, _record_json(data), habit_id, self.user_id))
+
+    async def delete_habit(self, habit_id: str) -> bool:
+        async with self.transaction() as conn:
+            status = await conn.execute(
+                "delete from public.habits where id = $1::uuid and user_id = $2::uuid",
+                habit_id, self.user_id,
+            )
+        return status != "DELETE 0"
+
+    async def list_logs(
+        self,
+        habit_id: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        descending: bool = False,
+    ) -> List[Dict[str, Any]]:
+        async with self.transaction() as conn:
+            rows = _rows(await conn.fetch(SELECT_LOGS, self.user_id, habit_id, start_date, end_date))
+        if descending:
+            rows.reverse()
+        return rows
+
+    async def list_logs_page(self, after: Optional[DayKey], limit: int) -> List[Dict[str, Any]]:
+        day, row_id = after or (None, None)
+        async with self.transaction() as conn:
+            return _rows(await conn.fetch(SELECT_LOGS_PAGE, self.user_id, day, row_id, limit))
+
+    async def list_habit_logs_page(
+        self,
+        habit_id: str,
+        limit: int,
+        oldest: Optional[date] = None,
+        newest: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        async with self.transaction() as conn:
+            return _rows(await conn.fetch(
+                SELECT_HABIT_LOGS_PAGE, habit_id, self.user_id, oldest or date.min, newest or date.max, limit,
+            ))
+
+    async def list_logs_json(
+        self,
+        habit_id: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> AsyncIterator[bytes]:
+        async with self.transaction() as conn:
+            body = await conn.fetchval(SELECT_LOGS_JSON, self.user_id, habit_id, start_date, end_date)
+        return as_chunks(body.encode())
+
+    async def log_habit(self, habit_id: str, value: int, at: datetime) -> Dict[str, Any]:
+        async with self.transaction() as conn:
+            record = await conn.fetchrow(
+                "select * from public.log_habit(p_habit_id => $1::uuid, p_value => $2, p_at => $3)",
+                habit_id, value, at,
+            )
+        if not record:
+            raise Exception("Habit log insert returned empty payload")
+        return _row(record)
+
+    async def delete_log(self, habit_id: str, log_date: date) -> bool:
+        async with self.transaction() as conn:
+            status = await conn.execute(
+                "delete from public.habit_logs where habit_id = $1::uuid and user_id = $2::uuid and log_date = $3",
+                habit_id, self.user_id, log_date,
+            )
+        return status != "DELETE 0"
+
+    async def upsert_logs(self, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        async with self.transaction() as conn:
+            await conn.execute(UPSERT_IMPORTED_LOGS, self.user_id, json.dumps(rows, default=str))
+        return len(rows)
+
+    async def refresh_habit_stats(self, habit_ids: List[str]) -> None:
+        if habit_ids:
+            async with self.transaction() as conn:
+                await conn.execute("select public.refresh_habit_stats($1::uuid[])", habit_ids)
+
+
+class PostgresHivesRepo(PostgresRepo, HivesRepo):
+
+    async def list_memberships(self) -> List[Dict[str, Any]]:
+        async with self.transaction() as conn:
+            return _rows(await conn.fetch(SELECT_MEMBERSHIPS, self.user_id))
+
+    @single_flight()
+    async def get_membership(self, hive_id: str) -> Optional[Dict[str, Any]]:
+        async with self.transaction() as conn:
+            return _row(await conn.fetchrow(SELECT_MEMBERSHIP, hive_id, self.user_id))
+
+    async def list_hives(self, hive_ids: List[str]) -> List[Dict[str, Any]]:
+        if not hive_ids:
+            return []
+        async with self.transaction() as conn:
+            return _rows(await conn.fetch(SELECT_HIVES, hive_ids))
+
+    @single_flight(hive_scoped=True)
+    async def get_hive(self, hive_id: str) -> Optional[Dict[str, Any]]:
+        async with self.transaction() as conn:
+            return _row(await conn.fetchrow(SELECT_HIVE, hive_id))
+
+    @single_flight(hive_scoped=True)
+    async def list_members(self, hive_ids: List[str]) -> List[Dict[str, Any]]:
+        if not hive_ids:
+            return []
+        async with self.transaction() as conn:
+            return _rows(await conn.fetch(SELECT_MEMBERS, hive_ids))
+
+    async def count_members(self, hive_id: str) -> int:
+        async with self.transaction() as conn:
+            return await conn.fetchval(COUNT_MEMBERS, hive_id)
+
+    @single_flight(hive_scoped=True)
+    async def list_member_days(
+        self,
+        hive_ids: List[str],
+        start_date: date,
+        end_date: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        if not hive_ids:
+            return []
+        async with self.transaction() as conn:
+            return _rows(await conn.fetch(SELECT_MEMBER_DAYS, hive_ids, start_date, end_date))
+
+    async def list_my_days_page(self, after: Optional[DayKey], limit: int) -> List[Dict[str, Any]]:
+        day, row_id = after or (None, None)
+        async with self.transaction() as conn:
+            return _rows(await conn.fetch(SELECT_MY_DAYS_PAGE, self.user_id, day, row_id, limit))
+
+    @single_flight(hive_scoped=True)
+    async def list_hive_days(self, hive_id: str, start_date: date) -> List[Dict[str, Any]]:
+        async with self.transaction() as conn:
+            return _rows(await conn.fetch(SELECT_HIVE_DAYS, hive_id, start_date))
+
+    async def list_member_stats(self, hive_ids: List[str]) -> List[Dict[str, Any]]:
+        if not hive_ids:
+            return []
+        async with self.transaction() as conn:
+            return _rows(await conn.fetch(SELECT_MEMBER_STATS, hive_ids))
+
+    async def create_hive(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        data = {**data, "owner_id": self.user_id}
+        async with self.transaction() as conn:
+            return _row(await conn.fetchrow(_insert_sql("hives", list(data)), _record_json(data)))
+
+    async def add_member(self, hive_id: str, role: str = "member") -> None:
+        async with self.transaction() as conn:
+            await conn.execute(
+                "insert into public.hive_members (hive_id, user_id, role) values ($1::uuid, $2::uuid, $3)",
+                hive_id, self.user_id, role,
+            )
+
+    async def update_hive(self, hive_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        query = _update_sql("hives", list(data), "id = $2::uuid")
+        async with self.transaction() as conn:
+            return _row(await conn.fetchrow(query, _record_json(data), hive_id))
+
+    async def delete_hive(self, hive_id: str) -> None:
+        async with self.transaction() as conn:
+            await conn.execute("delete from public.hives where id = $1::uuid", hive_id)
+
+    async def create_hive_from_habit(self, habit_id: str, name: Optional[str], backfill_days: int) -> str:
+        async with self.transaction() as conn:
+            hive_id = await conn.fetchval(
+                "select public.create_hive_from_habit(p_habit_id => $1::uuid, p_name => $2, p_backfill_days => $3)",
+                habit_id, name, backfill_days,
+            )
+        return str(hive_id)
+
+    async def create_invite(self, hive_id: str, ttl_minutes: int, max_uses: int) -> Dict[str, Any]:
+        async with self.transaction() as conn:
+            invite_row = _row(await conn.fetchrow(
+                "select * from public.create_hive_invite(p_hive_id => $1::uuid, p_ttl_minutes => $2, p_max_uses => $3)",
+                hive_id, ttl_minutes, max_uses,
+            ))
+            # Also update the hive's default invite code for quick sharing
+            await conn.execute(
+                "update public.hives set invite_code = $2, updated_at = now() where id = $1::uuid",
+                hive_id, invite_row["code"],
+            )
+        return invite_row
+
+    async def join_with_code(self, code: str) -> str:
+        async with self.transaction() as conn:
+            hive_id = await conn.fetchval("select public.join_hive_with_code($1)", code)
+        return str(hive_id)
+
+    async def leave_hive(self, hive_id: str) -> None:
+        async with self.transaction() as conn:
+            await conn.execute(
+                "update public.hive_members set is_active = false, left_at = now() "
+                "where hive_id = $1::uuid and user_id = $2::uuid",
+                hive_id, self.user_id,
+            )
+
+    async def log_today(self, hive_id: str, value: int) -> Dict[str, Any]:
+        async with self.transaction() as conn:
+            return _row(await conn.fetchrow(
+                "select * from public.log_hive_today(p_hive_id => $1::uuid, p_value => $2)",
+                hive_id, value,
+            ))
+
+    async def advance_day(self, hive_id: str, day: date) -> Dict[str, Any]:
+        async with self.transaction() as conn:
+            return _row(await conn.fetchrow(
+                "select * from public.advance_hive_day(p_hive_id => $1::uuid, p_day => $2)",
+                hive_id, day,
+            ))
+
+
+class PostgresActivityRepo(PostgresRepo, ActivityRepo):
+
+    @single_flight(hive_scoped=True)
+    async def list_events(
+        self,
+        hive_ids: List[str],
+        limit: int,
+        with_actor: bool = True,
+        before: Optional[Cursor] = None,
+        after: Optional[Cursor] = None,
+    ) -> List[Dict[str, Any]]:
+        if not hive_ids:
+            return []
+        args: List[Any] = [hive_ids, limit]
+        page = "before" if before else "after" if after else "latest"
+        if before or after:
+            args.extend(before or after)
+        async with self.transaction() as conn:
+            events = _rows(await conn.fetch(SELECT_EVENTS[(with_actor, page)], *args))
+        if after:
+            events.reverse()
+        return events
+
+    async def list_timeline(
+        self,
+        limit: int,
+        before: Optional[Cursor] = None,
+        after: Optional[Cursor] = None,
+    ) -> List[Dict[str, Any]]:
+        args: List[Any] = [self.user_id, limit]
+        page = "before" if before else "after" if after else "latest"
+        if before or after:
+            args.extend(before or after)
+        async with self.transaction() as conn:
+            rows = _rows(await conn.fetch(SELECT_TIMELINE[page], *args))
+        if after:
+            rows.reverse()
+        return rows
+
+    async def create_event(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        async with self.transaction() as conn:
+            return _row(await conn.fetchrow(
+                "insert into public.activity_events (actor_id, hive_id, habit_id, type, data) "
+                "values ($1::uuid, $2::uuid, $3::uuid, $4, $5) returning *",
+                self.user_id, data.get("hive_id"), data.get("habit_id"), data["type"], data.get("data") or {},
+            ))
+
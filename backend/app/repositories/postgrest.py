@@ -0,0 +1,508 @@
+"""
+PostgREST Repositories
+Supabase-backed implementations; the caller's access token is forwarded so
+row level security applies, except for reads that explicitly scope to the
+caller's user_id and use the service role to tolerate expired tokens.
+"""
+
+from typing import Dict, Any, List, Optional, Iterable, AsyncIterator
+from datetime import datetime, date
+from supabase import Client
+from app.core.supabase import get_user_supabase_client, get_supabase_admin
+from app.core.passthrough import open_rows
+from app.repositories.base import (
+    ProfilesRepo, HabitsRepo, HivesRepo, ActivityRepo, Cursor, DayKey, HABIT_LOG_COLUMNS, as_date,
+)
+
+
+def _check(response: Any, message: str) -> Any:
+    if getattr(response, "error", None):
+        raise Exception(response.error.get("message", message))
+    return response.data
+
+
+def _after_day(query: Any, day_column: str, id_column: str, after: Optional[DayKey]) -> Any:
+    """Keyset filter for rows strictly after (day, id)."""
+    if after is None:
+        return query
+    day, row_id = after[0].isoformat(), after[1]
+    return query.or_(f"{day_column}.gt.{day},and({day_column}.eq.{day},{id_column}.gt.{row_id})")
+
+
+def _first(data: Any) -> Optional[Dict[str, Any]]:
+    if isinstance(data, list):
+        return data[0] if data else None
+    return data or None
+
+
+class PostgrestRepo:
+    """Lazily created user-scoped and service-role clients"""
+
+    _client: Optional[Client] = None
+    _admin: Optional[Client] = None
+
+    @property
+    def client(self) -> Client:
+        if self._client is None:
+            self._client = get_user_supabase_client(self.current_user)
+        return self._client
+
+    @property
+    def admin(self) -> Client:
+        if self._admin is None:
+            self._admin = get_supabase_admin()
+        return self._admin
+
+
+class PostgrestProfilesRepo(PostgrestRepo, ProfilesRepo):
+
+    async def fetch_display(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        ids = list({str(uid) for uid in user_ids})
+        if not ids:
+            return {}
+        response = (
+            self.client
+            .table("profiles")
+            .select("id, display_name, avatar_url")
+            .in_("id", ids)
+            .execute()
+        )
+        return {row["id"]: row for row in (response.data or [])}
+
+    async def fetch_day_settings(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not user_ids:
+            return {}
+        response = (
+            self.client
+            .table("profiles")
+            .select("id, timezone, day_start_hour")
+            .in_("id", user_ids)
+            .execute()
+        )
+        return {row["id"]: row for row in (response.data or [])}
+
+
+class PostgrestHabitsRepo(PostgrestRepo, HabitsRepo):
+
+    async def list_habits(self, active_only: bool = True) -> List[Dict[str, Any]]:
+        query = self.admin.table("habits").select("*").eq("user_id", self.user_id)
+        if active_only:
+            query = query.eq("is_active", True)
+        response = query.order("created_at", desc=True).execute()
+        return _check(response, "Unable to fetch habits") or []
+
+    async def get_habit(self, habit_id: str) -> Optional[Dict[str, Any]]:
+        response = (
+            self.admin
+            .table("habits")
+            .select("*")
+            .eq("id", habit_id)
+            .limit(1)
+            .execute()
+        )
+        return _first(_check(response, "Unable to fetch habit"))
+
+    async def create_habit(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        response = self.client.table("habits").insert({**data, "user_id": self.user_id}).execute()
+        return _check(response, "Unable to create habit")[0]
+
+    async def update_habit(self, habit_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        response = (
+            self.client
+            .table("habits")
+            .update(data)
+            .eq("id", habit_id)
+            .eq("user_id", self.user_id)
+            .execute()
+        )
+        return _first(_check(response, "Unable to update habit"))
+
+    async def delete_habit(self, habit_id: str) -> bool:
+        response = (
+            self.client
+            .table("habits")
+            .delete()
+            .eq("id", habit_id)
+            .eq("user_id", self.user_id)
+            .execute()
+        )
+        return bool(_check(response, "Failed to delete habit"))
+
+    async def list_logs(
+        self,
+        habit_id: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        descending: bool = False,
+    ) -> List[Dict[str, Any]]:
+        query = self.admin.table("habit_logs").select("*").eq("user_id", self.user_id)
+        if habit_id:
+            query = query.eq("habit_id", habit_id)
+        if start_date:
+            query = query.gte("log_date", start_date.isoformat())
+        if end_date:
+            query = query.lte("log_date", end_date.isoformat())
+        response = query.order("log_date", desc=descending).execute()
+        return _check(response, "Unable to fetch logs") or []
+
+    async def list_logs_page(self, after: Optional[DayKey], limit: int) -> List[Dict[str, Any]]:
+        query = self.admin.table("habit_logs").select("*").eq("user_id", self.user_id)
+        response = (
+            _after_day(query, "log_date", "habit_id", after)
+            .order("log_date")
+            .order("habit_id")
+            .limit(limit)
+            .execute()
+        )
+        return _check(response, "Unable to fetch logs") or []
+
+    async def list_habit_logs_page(
+        self,
+        habit_id: str,
+        limit: int,
+        oldest: Optional[date] = None,
+        newest: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        query = self.admin.table("habit_logs").select("*").eq("user_id", self.user_id).eq("habit_id", habit_id)
+        if oldest:
+            query = query.gte("log_date", oldest.isoformat())
+        if newest:
+            query = query.lte("log_date", newest.isoformat())
+        response = query.order("log_date", desc=True).limit(limit).execute()
+        return _check(response, "Unable to fetch logs") or []
+
+    async def list_logs_json(
+        self,
+        habit_id: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> AsyncIterator[bytes]:
+        params = [("select", ",".join(HABIT_LOG_COLUMNS)), ("user_id", f"eq.{self.user_id}")]
+        if habit_id:
+            params.append(("habit_id", f"eq.{habit_id}"))
+        if start_date:
+            params.append(("log_date", f"gte.{start_date.isoformat()}"))
+        if end_date:
+            params.append(("log_date", f"lte.{end_date.isoformat()}"))
+        params.append(("order", "log_date.asc"))
+        return aiter(await open_rows("habit_logs", params))
+
+    async def log_habit(self, habit_id: str, value: int, at: datetime) -> Dict[str, Any]:
+        response = self.client.rpc("log_habit", {
+            "p_habit_id": habit_id,
+            "p_value": value,
+            "p_at": at.isoformat(),
+        }).execute()
+        record = _first(_check(response, "Unable to log habit"))
+        if not record:
+            raise Exception("Habit log insert returned empty payload")
+        return record
+
+    async def delete_log(self, habit_id: str, log_date: date) -> bool:
+        response = (
+            self.client
+            .table("habit_logs")
+            .delete()
+            .eq("habit_id", habit_id)
+            .eq("user_id", self.user_id)
+            .eq("log_date", log_date.isoformat())
+            .execute()
+        )
+        return bool(response.data)
+
+    async def upsert_logs(self, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        payload = [
+            {
+                "habit_id": row["habit_id"],
+                "user_id": self.user_id,
+                "log_date": as_date(row["log_date"]).isoformat(),
+                "value": row["value"],
+                "source": "import",
+            }
+            for row in rows
+        ]
+        response = (
+            self.client
+            .table("habit_logs")
+            .upsert(payload, on_conflict="habit_id,log_date", returning="minimal")
+            .execute()
+        )
+        _check(response, "Unable to import logs")
+        return len(rows)
+
+    async def refresh_habit_stats(self, habit_ids: List[str]) -> None:
+        if habit_ids:
+            response = self.client.rpc("refresh_habit_stats", {"p_habit_ids": habit_ids}).execute()
+            _check(response, "Unable to refresh habit stats")
+
+
+class PostgrestHivesRepo(PostgrestRepo, HivesRepo):
+
+    async def list_memberships(self) -> List[Dict[str, Any]]:
+        response = (
+            self.client
+            .table("hive_members")
+            .select("hive_id,user_id,role")
+            .eq("user_id", self.user_id)
+            .eq("is_active", True)
+            .execute()
+        )
+        return response.data or []
+
+    async def get_membership(self, hive_id: str) -> Optional[Dict[str, Any]]:
+        response = (
+            self.client
+            .table("hive_members")
+            .select("hive_id,user_id,role")
+            .eq("hive_id", hive_id)
+            .eq("user_id", self.user_id)
+            .eq("is_active", True)
+            .limit(1)
+            .execute()
+        )
+        return _first(response.data)
+
+    async def list_hives(self, hive_ids: List[str]) -> List[Dict[str, Any]]:
+        if not hive_ids:
+            return []
+        response = (
+            self.client
+            .table("hives")
+            .select("*")
+            .in_("id", hive_ids)
+            .eq("is_active", True)
+            .order("updated_at", desc=True)
+            .execute()
+        )
+        return response.data or []
+
+    async def get_hive(self, hive_id: str) -> Optional[Dict[str, Any]]:
+        response = self.client.table("hives").select("*").eq("id", hive_id).limit(1).execute()
+        return _first(response.data)
+
+    async def list_members(self, hive_ids: List[str]) -> List[Dict[str, Any]]:
+        if not hive_ids:
+            return []
+        response = (
+            self.client
+            .table("hive_members")
+            .select("*")
+            .in_("hive_id", hive_ids)
+            .eq("is_active", True)
+            .execute()
+        )
+        return response.data or []
+
+    async def count_members(self, hive_id: str) -> int:
+        response = (
+            self.client
+            .table("hive_members")
+            .select("user_id", count='exact')
+            .eq("hive_id", hive_id)
+            .eq("is_active", True)
+            .execute()
+        )
+        return getattr(response, "count", None) or 0
+
+    async def list_member_days(
+        self,
+        hive_ids: List[str],
+        start_date: date,
+        end_date: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        if not hive_ids:
+            return []
+        query = (
+            self.client
+            .table("hive_member_days")
+            .select("hive_id,user_id,day_date,value,done")
+            .in_("hive_id", hive_ids)
+        )
+        if end_date == start_date:
+            query = query.eq("day_date", start_date.isoformat())
+        else:
+            query = query.gte("day_date", start_date.isoformat())
+            if end_date:
+                query = query.lte("day_date", end_date.isoformat())
+        return query.execute().data or []
+
+    async def list_my_days_page(self, after: Optional[DayKey], limit: int) -> List[Dict[str, Any]]:
+        query = (
+            self.client
+            .table("hive_member_days")
+            .select("hive_id,user_id,day_date,value,done,created_at")
+            .eq("user_id", self.user_id)
+        )
+        response = (
+            _after_day(query, "day_date", "hive_id", after)
+            .order("day_date")
+            .order("hive_id")
+            .limit(limit)
+            .execute()
+        )
+        return response.data or []
+
+    async def list_hive_days(self, hive_id: str, start_date: date) -> List[Dict[str, Any]]:
+        response = (
+            self.client
+            .table("hive_days")
+            .select("day_date, complete_count, required_count, advanced")
+            .eq("hive_id", hive_id)
+            .gte("day_date", start_date.isoformat())
+            .order("day_date", desc=True)
+            .execute()
+        )
+        return response.data or []
+
+    async def list_member_stats(self, hive_ids: List[str]) -> List[Dict[str, Any]]:
+        if not hive_ids:
+            return []
+        response = (
+            self.client
+            .table("hive_member_stats")
+            .select("hive_id, user_id, completed_total, recent_mask, recent_anchor, last_completed_on")
+            .in_("hive_id", hive_ids)
+            .execute()
+        )
+        return response.data or []
+
+    async def create_hive(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        response = self.client.table("hives").insert({**data, "owner_id": self.user_id}).execute()
+        return response.data[0]
+
+    async def add_member(self, hive_id: str, role: str = "member") -> None:
+        self.client.table("hive_members").insert({
+            "hive_id": hive_id,
+            "user_id": self.user_id,
+            "role": role,
+        }).execute()
+
+    async def update_hive(self, hive_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        response = self.client.table("hives").update(data).eq("id", hive_id).execute()
+        return _first(response.data)
+
+    async def delete_hive(self, hive_id: str) -> None:
+        self.client.table("hives").delete().eq("id", hive_id).execute()
+
+    async def create_hive_from_habit(self, habit_id: str, name: Optional[str], backfill_days: int) -> str:
+        response = self.client.rpc("create_hive_from_habit", {
+            "p_habit_id": habit_id,
+            "p_name": name,
+            "p_backfill_days": backfill_days,
+        }).execute()
+        return response.data
+
+    async def create_invite(self, hive_id: str, ttl_minutes: int, max_uses: int) -> Dict[str, Any]:
+        response = self.client.rpc("create_hive_invite", {
+            "p_hive_id": hive_id,
+            "p_ttl_minutes": ttl_minutes,
+            "p_max_uses": max_uses,
+        }).execute()
+        invite_row = _first(response.data)
+
+        # Also update the hive's default invite code for quick sharing
+        self.client.table("hives").update({
+            "invite_code": invite_row["code"],
+            "updated_at": datetime.utcnow().isoformat(),
+        }).eq("id", hive_id).execute()
+        return invite_row
+
+    async def join_with_code(self, code: str) -> str:
+        response = self.client.rpc("join_hive_with_code", {"p_code": code}).execute()
+        return response.data
+
+    async def leave_hive(self, hive_id: str) -> None:
+        self.client.table("hive_members").update({
+            "is_active": False,
+            "left_at": datetime.utcnow().isoformat(),
+        }).eq("hive_id", hive_id).eq("user_id", self.user_id).execute()
+
+    async def log_today(self, hive_id: str, value: int) -> Dict[str, Any]:
+        response = self.client.rpc("log_hive_today", {
+            "p_hive_id": hive_id,
+            "p_value": value,
+        }).execute()
+        return _first(response.data)
+
+    async def advance_day(self, hive_id: str, day: date) -> Dict[str, Any]:
+        response = self.client.rpc("advance_hive_day", {
+            "p_hive_id": hive_id,
+            "p_day": day.isoformat(),
+        }).execute()
+        return _first(response.data)
+
+
+class PostgrestActivityRepo(PostgrestRepo, ActivityRepo):
+
+    async def list_events(
+        self,
+        hive_ids: List[str],
+        limit: int,
+        with_actor: bool = True,
+        before: Optional[Cursor] = None,
+        after: Optional[Cursor] = None,
+    ) -> List[Dict[str, Any]]:
+        if not hive_ids:
+            return []
+        columns = "*, profiles!actor_id(display_name, avatar_url)" if with_actor else "*"
+        query = self.client.table("activity_events").select(columns)
+        if len(hive_ids) == 1:
+            query = query.eq("hive_id", hive_ids[0])
+        else:
+            query = query.in_("hive_id", hive_ids)
+        cursor, op = (before, "lt") if before else (after, "gt")
+        if cursor:
+            created_at, event_id = cursor[0].isoformat(), cursor[1]
+            query = query.or_(
+                f'created_at.{op}."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.{op}.{event_id})'
+            )
+        descending = after is None
+        response = (
+            query.order("created_at", desc=descending)
+            .order("id", desc=descending)
+            .limit(limit)
+            .execute()
+        )
+
+        events = response.data or []
+        if not descending:
+            events.reverse()
+        if with_actor:
+            for event in events:
+                profile = event.pop("profiles", None) or {}
+                event["actor_name"] = profile.get("display_name")
+                event["actor_avatar"] = profile.get("avatar_url")
+        return events
+
+    async def list_timeline(
+        self,
+        limit: int,
+        before: Optional[Cursor] = None,
+        after: Optional[Cursor] = None,
+    ) -> List[Dict[str, Any]]:
+        query = self.client.table("activity_timeline").select("*").eq("user_id", self.user_id)
+        cursor, op = (before, "lt") if before else (after, "gt")
+        if cursor:
+            created_at, event_id = cursor[0].isoformat(), cursor[1]
+            query = query.or_(
+                f'created_at.{op}."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.{op}.{event_id})'
+            )
+        descending = after is None
+        response = (
+            query.order("created_at", desc=descending)
+            .order("id", desc=descending)
+            .limit(limit)
+            .execute()
+        )
+        rows = response.data or []
+        if not descending:
+            rows.reverse()
+        return rows
+
+    async def create_event(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        response = self.client.table("activity_events").insert({**data, "actor_id": self.user_id}).execute()
+        return response.data[0]
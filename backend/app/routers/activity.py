@@ -1,117 +1,71 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query
-from app.models.schemas import ActivityEvent, YearOverviewResponse, HabitHeatmapSeries
-from app.core.auth import get_current_user
-from app.core.supabase import get_user_supabase_client
-from app.core.config import settings
-from typing import Dict, Any, List, Optional
+from app.models.schemas import ActivityEvent, YearOverviewResponse, HabitHeatmapSeries, CompactSeries
+from app.repositories import (
+    ActivityRepo, HabitsRepo, HivesRepo, ProfilesRepo,
+    get_activity_repo, get_habits_repo, get_hives_repo, get_profiles_repo, as_date,
+    encode_cursor, decode_cursor,
+)
+from app.core.heatmap import DenseSeries
+from app.core.responses import ModelResponse
+from app.models.rows import validate_rows
+from typing import Dict, Any, List, Literal, Optional
 from datetime import datetime, date, timedelta
 import uuid
 
 router = APIRouter()
 
-# In-memory storage for test mode
-test_activity = []
-
-# Import shared test data (if needed)
-def get_test_profiles():
-    from app.routers.profiles import test_profiles
-    return test_profiles
-
-def get_test_habits():
-    from app.routers.habits import test_habits
-    return test_habits
-
-def get_test_logs():
-    from app.routers.habits import test_logs
-    return test_logs
-
-def get_test_hive_members():
-    from app.routers.hives import test_hive_members
-    return test_hive_members
-
-def get_test_hives():
-    from app.routers.hives import test_hives
-    return test_hives
-
 @router.get("/feed", response_model=List[ActivityEvent])
 async def get_activity_feed(
-    current_user: Dict[str, Any] = Depends(get_current_user),
+    repo: ActivityRepo = Depends(get_activity_repo),
+    hives: HivesRepo = Depends(get_hives_repo),
+    profiles: ProfilesRepo = Depends(get_profiles_repo),
     hive_id: Optional[str] = Query(None, description="Filter by hive"),
-    limit: int = Query(50, le=100, description="Number of events to return")
+    limit: int = Query(50, ge=1, le=100, description="Number of events to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page, for older events"),
+    since: Optional[str] = Query(None, description="X-Since-Cursor of an earlier response, for newer events"),
 ):
-    """Get activity feed for user's hives"""
-    user_id = current_user["id"]
-    
-    if settings.TEST_MODE:
-        # Get user's hive IDs
-        test_hive_members = get_test_hive_members()
-        user_hive_ids = [m["hive_id"] for m in test_hive_members.values() 
-                        if m["user_id"] == user_id]
-        
-        # Filter activity
-        filtered_activity = []
-        for event in test_activity:
-            if hive_id:
-                # Filter by specific hive
-                if event["hive_id"] == hive_id:
-                    filtered_activity.append(event)
-            else:
-                # Show activity from all user's hives
-                if event["hive_id"] in user_hive_ids:
-                    filtered_activity.append(event)
-        
-        # Sort by created_at descending
-        filtered_activity.sort(key=lambda x: x["created_at"], reverse=True)
-        
-        # Limit results
-        filtered_activity = filtered_activity[:limit]
-        
-        # Add actor info if available
-        result = []
-        test_profiles = get_test_profiles()
-        for event in filtered_activity:
-            event_with_actor = event.copy()
-            if event["actor_id"] in test_profiles:
-                profile = test_profiles[event["actor_id"]]
-                event_with_actor["actor_name"] = profile["display_name"]
-                event_with_actor["actor_avatar"] = profile["avatar_url"]
-            result.append(ActivityEvent(**event_with_actor))
-        
-        return result
-    
+    """
+    Get activity feed for user's hives, newest first.
+
+    Pages are keyed on (created_at, id). X-Next-Cursor is set when older events
+    may remain; X-Since-Cursor marks the newest event seen. A `since` response
+    holds the oldest `limit` newer events, so repeat it until it comes back short.
+    """
     try:
-        supabase = get_user_supabase_client(current_user)
-        
-        # Get user's hive IDs
-        member_response = supabase.table("hive_members").select("hive_id").eq("user_id", user_id).execute()
-        user_hive_ids = [m["hive_id"] for m in member_response.data]
-        
-        if not user_hive_ids:
-            return []
-        
-        # Build query
-        query = supabase.table("activity_events").select("*, profiles!actor_id(display_name, avatar_url)")
-        
+        if cursor and since:
+            raise HTTPException(status_code=400, detail="Use either cursor or since, not both")
+        try:
+            before = decode_cursor(cursor) if cursor else None
+            after = decode_cursor(since) if since else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
         if hive_id:
-            query = query.eq("hive_id", hive_id)
+            # Single hive: range read on idx_activity_hive, members only
+            is_member = await hives.get_membership(hive_id)
+            events = await repo.list_events(
+                [hive_id], limit, with_actor=False, before=before, after=after
+            ) if is_member else []
+            actors = await profiles.list_display(event["actor_id"] for event in events)
+            for event in events:
+                actor = actors.get(str(event["actor_id"]), {})
+                event["actor_name"] = actor.get("display_name")
+                event["actor_avatar"] = actor.get("avatar_url")
         else:
-            query = query.in_("hive_id", user_hive_ids)
-        
-        query = query.order("created_at", desc=True).limit(limit)
-        
-        response = query.execute()
-        
-        # Format response
-        result = []
-        for event in response.data:
-            event_data = {
-                **event,
-                "actor_name": event.get("profiles", {}).get("display_name"),
-                "actor_avatar": event.get("profiles", {}).get("avatar_url")
-            }
-            result.append(ActivityEvent(**event_data))
-        
-        return result
+            # All hives: the caller's fanned-out timeline
+            events = await repo.list_timeline(limit, before=before, after=after)
+
+        headers: Dict[str, str] = {}
+        if events or since:
+            headers["X-Since-Cursor"] = encode_cursor(events[0]) if events else since
+        if not after and len(events) == limit:
+            headers["X-Next-Cursor"] = encode_cursor(events[-1])
+        # Event types and the free-form data column come from several SQL
+        # functions and direct inserts, so rows are validated (in one call),
+        # not constructed
+        return ModelResponse(validate_rows(ActivityEvent, events), headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -121,11 +75,11 @@ async def get_activity_feed(
 
 @router.get("/year-overview", response_model=YearOverviewResponse)
 async def get_year_overview(
-    current_user: Dict[str, Any] = Depends(get_current_user),
-    year: Optional[int] = Query(None, ge=2000, le=3000, description="Calendar year to summarise")
+    repo: HabitsRepo = Depends(get_habits_repo),
+    year: Optional[int] = Query(None, ge=2000, le=3000, description="Calendar year to summarise"),
+    format: Literal["map", "compact"] = Query("map", description="compact returns base64 day series instead of date-keyed maps"),
 ):
     """Return per-day completion counts for the selected year."""
-    user_id = current_user["id"]
 
     today = date.today()
     target_year = year or today.year
@@ -148,13 +102,7 @@ async def get_year_overview(
             if habit is None:
                 continue
 
-            raw_date = entry.get("log_date")
-            if isinstance(raw_date, str):
-                log_date = date.fromisoformat(raw_date)
-            elif isinstance(raw_date, datetime):
-                log_date = raw_date.date()
-            else:
-                log_date = raw_date
+            log_date = as_date(entry.get("log_date"))
 
             if log_date is None or log_date < start_date or log_date > end_date:
                 continue
@@ -195,42 +143,57 @@ async def get_year_overview(
             habits=series,
         )
 
-    if settings.TEST_MODE:
-        test_habits = list(get_test_habits().values())
-        test_logs = list(get_test_logs().values())
+    def build_compact_response(habits: List[Dict[str, Any]], logs: List[Dict[str, Any]]) -> YearOverviewResponse:
+        days = (end_date - start_date).days + 1
+        habit_map = {str(h["id"]): h for h in habits if h.get("is_active", True)}
+        totals = DenseSeries(start_date, days)
+        per_habit = {hid: DenseSeries(start_date, days) for hid in habit_map}
 
-        filtered_logs = []
-        for log in test_logs:
-            if log.get("user_id") != user_id:
+        for entry in logs:
+            hid = str(entry.get("habit_id"))
+            habit = habit_map.get(hid)
+            log_date = as_date(entry.get("log_date"))
+            if habit is None or log_date is None:
                 continue
-            filtered_logs.append(log)
+            target = int(habit.get("target_per_day") or 1)
+            value = int(entry.get("value", 0) or 0)
+            normalized = max(0, min(value, target if target > 0 else value))
+            if normalized:
+                totals.add(log_date, normalized)
+                per_habit[hid].add(log_date, normalized)
 
-        return build_response(test_habits, filtered_logs)
+        series = [
+            HabitHeatmapSeries(
+                habit_id=uuid.UUID(hid),
+                name=habit.get("name", ""),
+                emoji=habit.get("emoji"),
+                color_hex=habit.get("color_hex", "#FF9F1C"),
+                compact=CompactSeries(**per_habit[hid].encode(bits=habit.get("type") == "checkbox")),
+            )
+            for hid, habit in habit_map.items()
+        ]
+        series.sort(key=lambda item: item.name.lower())
 
-    try:
-        supabase = get_user_supabase_client(current_user)
-
-        habits_response = (
-            supabase
-            .table("habits")
-            .select("id, name, emoji, color_hex, target_per_day, type, is_active")
-            .eq("user_id", user_id)
-            .execute()
-        )
-        habit_rows = habits_response.data or []
-
-        logs_response = (
-            supabase
-            .table("habit_logs")
-            .select("habit_id, log_date, value")
-            .eq("user_id", user_id)
-            .gte("log_date", start_date.isoformat())
-            .lte("log_date", end_date.isoformat())
-            .execute()
+        return YearOverviewResponse(
+            start_date=start_date,
+            end_date=end_date,
+            format="compact",
+            totals_compact=CompactSeries(**totals.encode()),
+            max_total=totals.max(),
+            habits=series,
         )
-        log_rows = logs_response.data or []
 
-        return build_response(habit_rows, log_rows)
+    try:
+        habit_rows = await repo.list_habits(active_only=False)
+        log_rows = await repo.list_logs(start_date=start_date, end_date=end_date)
+
+        if format == "compact":
+            # The date-keyed maps are replaced by the series, not sent empty
+            return ModelResponse(
+                build_compact_response(habit_rows, log_rows),
+                exclude={"totals": True, "habits": {"__all__": {"counts"}}},
+            )
+        return ModelResponse(build_response(habit_rows, log_rows))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -243,56 +206,24 @@ async def create_activity_event(
     hive_id: Optional[str] = None,
     habit_id: Optional[str] = None,
     data: dict = {},
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    repo: ActivityRepo = Depends(get_activity_repo),
+    profiles: ProfilesRepo = Depends(get_profiles_repo)
 ):
     """Create a new activity event"""
-    user_id = current_user["id"]
-    
-    if settings.TEST_MODE:
-        event_id = str(uuid.uuid4())
-        new_event = {
-            "id": event_id,
-            "actor_id": user_id,
-            "hive_id": hive_id,
-            "habit_id": habit_id,
-            "type": event_type,
-            "data": data,
-            "created_at": datetime.utcnow()
-        }
-        test_activity.append(new_event)
-        
-        # Add actor info
-        test_profiles = get_test_profiles()
-        if user_id in test_profiles:
-            profile = test_profiles[user_id]
-            new_event["actor_name"] = profile["display_name"]
-            new_event["actor_avatar"] = profile["avatar_url"]
-        
-        return ActivityEvent(**new_event)
-    
     try:
-        supabase = get_user_supabase_client(current_user)
-        
-        event_data = {
-            "actor_id": user_id,
+        event = await repo.create_event({
             "hive_id": hive_id,
             "habit_id": habit_id,
             "type": event_type,
             "data": data
-        }
-        
-        response = supabase.table("activity_events").insert(event_data).execute()
-        
+        })
+
         # Get actor info
-        profile_response = supabase.table("profiles").select("display_name, avatar_url").eq("id", user_id).single().execute()
-        
-        result = {
-            **response.data[0],
-            "actor_name": profile_response.data.get("display_name"),
-            "actor_avatar": profile_response.data.get("avatar_url")
-        }
-        
-        return ActivityEvent(**result)
+        profile = (await profiles.list_display([repo.user_id])).get(repo.user_id, {})
+        event["actor_name"] = profile.get("display_name")
+        event["actor_avatar"] = profile.get("avatar_url")
+
+        return ActivityEvent(**event)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -301,52 +232,44 @@ async def create_activity_event(
 
 @router.get("/milestones", response_model=List[dict])
 async def get_milestones(
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    habits: HabitsRepo = Depends(get_habits_repo),
+    hives: HivesRepo = Depends(get_hives_repo)
 ):
     """Get user's milestone achievements"""
-    user_id = current_user["id"]
-    
     milestones = []
-    
-    if settings.TEST_MODE:
-        # Calculate milestones from test data
-        test_habits = get_test_habits()
-        test_logs = get_test_logs()
-        user_habits = [h for h in test_habits.values() 
-                      if h["user_id"] == user_id and h["is_active"]]
-        
-        for habit in user_habits:
-            habit_logs = [l for l in test_logs.values() 
-                         if l["habit_id"] == habit["id"]]
-            
-            if len(habit_logs) >= 7:
+
+    try:
+        # Habit milestones come from the completion count kept on each habit
+        for habit in await habits.list_habits():
+            total = habit.get("total_completions") or 0
+
+            if total >= 7:
                 milestones.append({
                     "type": "week_streak",
                     "habit_name": habit["name"],
                     "achieved_at": datetime.utcnow()
                 })
-            
-            if len(habit_logs) >= 30:
+
+            if total >= 30:
                 milestones.append({
                     "type": "month_streak",
                     "habit_name": habit["name"],
                     "achieved_at": datetime.utcnow()
                 })
-        
+
         # Check hive milestones
-        test_hive_members = get_test_hive_members()
-        test_hives = get_test_hives()
-        user_hive_ids = [m["hive_id"] for m in test_hive_members.values() 
-                        if m["user_id"] == user_id]
-        
-        for hive_id in user_hive_ids:
-            if hive_id in test_hives:
-                hive = test_hives[hive_id]
-                if hive.get("current_streak", 0) >= 7:
-                    milestones.append({
-                        "type": "hive_week_streak",
-                        "hive_name": hive["name"],
-                        "achieved_at": datetime.utcnow()
-                    })
-    
-    return milestones
+        hive_ids = [str(m["hive_id"]) for m in await hives.list_memberships()]
+        for hive in await hives.list_hives(hive_ids):
+            if (hive.get("current_streak") or 0) >= 7:
+                milestones.append({
+                    "type": "hive_week_streak",
+                    "hive_name": hive["name"],
+                    "achieved_at": datetime.utcnow()
+                })
+
+        return milestones
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch milestones: {str(e)}"
+        )
@@ -9,6 +9,7 @@ from app.models.schemas import (
 from app.core.config import settings
 from app.core.auth import create_test_token, get_current_user
 from app.core.supabase import get_supabase_client, get_supabase_admin
+from app.core.profile_cache import invalidate_profile
 import uuid
 from typing import Dict, Any
 
@@ -156,60 +157,47 @@ async def get_me(current_user: Dict[str, Any] = Depends(get_current_user)):
 async def delete_me(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Permanently delete the authenticated user's account and related data."""
     user_id = current_user["id"]
+    invalidate_profile(user_id)
 
     if settings.TEST_MODE:
         # Best-effort cleanup of in-memory stores used during local development.
         try:
-            from app.routers.profiles import test_profiles
-            test_profiles.pop(user_id, None)
-
-            from app.routers.habits import test_habits, test_logs
-            for key, habit in list(test_habits.items()):
-                if habit.get("user_id") == user_id:
-                    test_habits.pop(key, None)
-            for key, log in list(test_logs.items()):
-                if log.get("user_id") == user_id:
-                    test_logs.pop(key, None)
-
-            from app.routers.hives import (
-                test_hives,
-                test_hive_members,
-                test_hive_member_days,
-                test_hive_invites,
-            )
+            from app.repositories import memory
+
+            memory.profiles.pop(user_id, None)
+            for habit in memory.habits.where(user_id=user_id):
+                memory.habit_logs.delete_where(habit_id=habit["id"])
+            memory.habits.delete_where(user_id=user_id)
+            memory.habit_logs.delete_where(user_id=user_id)
 
-            owned_hive_ids = {
-                hive_id for hive_id, hive in test_hives.items()
-                if hive.get("owner_id") == user_id
-            }
+            owned_hive_ids = {hive["id"] for hive in memory.hives.where(owner_id=user_id)}
 
             # Remove hives the user owns.
-            for hive_id in list(owned_hive_ids):
-                test_hives.pop(hive_id, None)
+            for hive_id in owned_hive_ids:
+                memory.hives.pop(hive_id, None)
 
             # Remove user memberships and collect associated hive IDs for cleanup.
-            member_hive_ids = set()
-            for key, member in list(test_hive_members.items()):
-                if member.get("user_id") == user_id or member.get("hive_id") in owned_hive_ids:
-                    member_hive_ids.add(member.get("hive_id"))
-                    test_hive_members.pop(key, None)
+            member_hive_ids = {member["hive_id"] for member in memory.hive_members.where(user_id=user_id)}
+            memory.hive_members.delete_where(user_id=user_id)
 
             hive_ids_to_clean = owned_hive_ids.union(member_hive_ids)
 
-            for key, day in list(test_hive_member_days.items()):
-                if day.get("user_id") == user_id or day.get("hive_id") in hive_ids_to_clean:
-                    test_hive_member_days.pop(key, None)
-
-            for key, invite in list(test_hive_invites.items()):
-                if invite.get("created_by") == user_id or invite.get("hive_id") in hive_ids_to_clean:
-                    test_hive_invites.pop(key, None)
-
-            from app.routers.activity import test_activity
-
-            test_activity[:] = [
-                event for event in test_activity
-                if event.get("actor_id") != user_id and event.get("hive_id") not in hive_ids_to_clean
-            ]
+            for hive_id in owned_hive_ids:
+                memory.hive_members.delete_where(hive_id=hive_id)
+            memory.hive_member_days.delete_where(user_id=user_id)
+            memory.hive_member_stats.delete_where(user_id=user_id)
+            memory.activity_events.delete_where(actor_id=user_id)
+            memory.activity_timeline.delete_where(user_id=user_id)
+            memory.activity_timeline.delete_where(actor_id=user_id)
+            for key, invite in list(memory.hive_invites.items()):
+                if invite.get("created_by") == user_id:
+                    memory.hive_invites.pop(key, None)
+            for hive_id in hive_ids_to_clean:
+                memory.hive_member_days.delete_where(hive_id=hive_id)
+                memory.hive_member_stats.delete_where(hive_id=hive_id)
+                memory.hive_invites.delete_where(hive_id=hive_id)
+                memory.activity_events.delete_where(hive_id=hive_id)
+                memory.activity_timeline.delete_where(hive_id=hive_id)
         except Exception:
             # Test mode cleanup is best-effort; ignore failures to avoid masking deletion.
             pass
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Query
 from typing import List, Dict, Any
 from pydantic import BaseModel, Field
 from app.core.auth import get_current_user
 from app.core.supabase import get_user_supabase_client
+from app.core.config import settings
+from app.core.contact_match import phone_hash_filter
+from app.core.contact_sync import ChunkTooLarge, parse_chunk, is_bucket, bucket_of
 
 router = APIRouter()
 
@@ -11,7 +14,30 @@ class ContactHash(BaseModel):
     display_name: str | None = None
 
 class UploadContactsRequest(BaseModel):
-    contacts: List[ContactHash]
+    contacts: List[ContactHash] = Field(..., max_length=settings.CONTACT_UPLOAD_MAX_CONTACTS)
+
+class SyncContactsRequest(BaseModel):
+    buckets: Dict[str, str] = Field(..., max_length=256, description="bucket -> sha256 of its sorted hashes")
+
+class SyncContactsResponse(BaseModel):
+    stale_buckets: List[str]
+    cleared_buckets: List[str]
+
+class SyncChunkResponse(BaseModel):
+    buckets: List[str]
+    contacts: int
+    written: int
+
+class MatchContactsRequest(BaseModel):
+    hashes: List[str] = Field(..., max_length=settings.CONTACT_MATCH_MAX_BATCH, description="sha256(pepper || e164) hex digests")
+
+class ContactMatch(BaseModel):
+    contact_hash: str
+    user_id: str
+
+class MatchContactsResponse(BaseModel):
+    matches: List[ContactMatch]
+    checked: int
 
 @router.post("/upload")
 async def upload_contacts(
@@ -42,3 +68,116 @@ async def upload_contacts(
             detail=f"Failed to upload contacts: {str(e)}"
         )
 
+
+@router.post("/sync", response_model=SyncContactsResponse)
+async def sync_contacts(
+    payload: SyncContactsRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Compare the app's bucket digests with the stored contacts. Buckets the app
+    no longer has are cleared here; stale_buckets must be uploaded with
+    PUT /sync/chunk.
+    """
+    client_digests = {bucket.lower(): digest.lower() for bucket, digest in payload.buckets.items()}
+    if not all(is_bucket(bucket) for bucket in client_digests):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid bucket")
+    try:
+        supabase = get_user_supabase_client(current_user)
+        response = supabase.rpc("contact_bucket_digests", {}).execute()
+        server_digests = {row["bucket"]: row["digest"] for row in response.data or []}
+
+        stale = sorted(b for b, digest in client_digests.items() if server_digests.get(b) != digest)
+        cleared = sorted(b for b in server_digests if b not in client_digests)
+        if cleared:
+            supabase.rpc(
+                "replace_contact_buckets",
+                {"p_buckets": cleared, "p_hashes": [], "p_names": []},
+            ).execute()
+        return SyncContactsResponse(stale_buckets=stale, cleared_buckets=cleared)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to sync contacts: {str(e)}"
+        )
+
+@router.put("/sync/chunk", response_model=SyncChunkResponse)
+async def upload_contact_chunk(
+    request: Request,
+    buckets: str = Query(..., description="Comma separated buckets this chunk replaces"),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Replace whole buckets with an NDJSON body of
+    {"contact_hash", "display_name"} lines; a listed bucket with no lines is
+    cleared.
+    """
+    bucket_list = sorted({b.strip().lower() for b in buckets.split(",") if b.strip()})
+    if not bucket_list or not all(is_bucket(bucket) for bucket in bucket_list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid buckets")
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.CONTACT_UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Chunk larger than {settings.CONTACT_UPLOAD_MAX_BYTES} bytes"
+        )
+    try:
+        contacts = await parse_chunk(
+            request.stream(),
+            max_bytes=settings.CONTACT_UPLOAD_MAX_BYTES,
+            max_contacts=settings.CONTACT_UPLOAD_MAX_CONTACTS,
+        )
+    except ChunkTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    allowed = set(bucket_list)
+    if any(bucket_of(contact_hash) not in allowed for contact_hash in contacts):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Contact outside the listed buckets")
+
+    try:
+        supabase = get_user_supabase_client(current_user)
+        response = supabase.rpc(
+            "replace_contact_buckets",
+            {
+                "p_buckets": bucket_list,
+                "p_hashes": list(contacts),
+                "p_names": list(contacts.values()),
+            },
+        ).execute()
+        return SyncChunkResponse(buckets=bucket_list, contacts=len(contacts), written=response.data or 0)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to upload contacts: {str(e)}"
+        )
+
+@router.post("/match", response_model=MatchContactsResponse)
+async def match_contacts(
+    payload: MatchContactsRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Registered users among a batch of contact hashes."""
+    digests = list(dict.fromkeys(h.strip().lower() for h in payload.hashes))
+    digests = [h for h in digests if len(h) == 64 and all(c in "0123456789abcdef" for c in h)]
+    try:
+        candidates = await phone_hash_filter.candidates(digests)
+        if not candidates:
+            return MatchContactsResponse(matches=[], checked=len(digests))
+
+        supabase = get_user_supabase_client(current_user)
+        response = supabase.rpc("match_contact_hashes", {"p_hashes": candidates}).execute()
+        # match_contact_hashes already leaves out the caller's own phone
+        matches = [
+            ContactMatch(contact_hash=row["phone_hash"], user_id=str(row["user_id"]))
+            for row in response.data or []
+            if str(row["user_id"]) != current_user["id"]
+        ]
+        return MatchContactsResponse(matches=matches, checked=len(digests))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to match contacts: {str(e)}"
+        )
@@ -0,0 +1,135 @@
+"""
+Export Router
+Streams the caller's full history as NDJSON or CSV.
+
+Logs and member days are read in keyset pages of EXPORT_CHUNK_SIZE rows and
+each page is encoded and written before the next is read, so memory stays
+flat however long the history is.
+"""
+
+import csv
+import io
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Literal, Optional, Tuple
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.repositories import DayKey, HabitsRepo, HivesRepo, as_date, get_habits_repo, get_hives_repo
+
+router = APIRouter()
+
+EXPORT_CHUNK_SIZE = 1000
+
+# Exported tables and their columns, in output order
+TABLES: Dict[str, Tuple[str, ...]] = {
+    "habits": (
+        "id", "name", "emoji", "color_hex", "type", "target_per_day", "schedule_daily",
+        "schedule_weekmask", "reminder_enabled", "reminder_time", "is_active", "created_at", "updated_at",
+    ),
+    "habit_logs": ("habit_id", "log_date", "value", "source", "created_at"),
+    "hive_memberships": ("hive_id", "hive_name", "role"),
+    "hive_member_days": ("hive_id", "day_date", "value", "created_at"),
+}
+
+Page = Callable[[Optional[DayKey], int], Awaitable[List[Dict[str, Any]]]]
+
+
+async def _keyset(page: Page, day_column: str, id_column: str) -> AsyncIterator[List[Dict[str, Any]]]:
+    after: Optional[DayKey] = None
+    while True:
+        rows = await page(after, EXPORT_CHUNK_SIZE)
+        if rows:
+            yield rows
+        if len(rows) < EXPORT_CHUNK_SIZE:
+            return
+        last = rows[-1]
+        after = (as_date(last[day_column]), str(last[id_column]))
+
+
+async def _table_chunks(table: str, habits: HabitsRepo, hives: HivesRepo) -> AsyncIterator[List[Dict[str, Any]]]:
+    if table == "habits":
+        yield await habits.list_habits(active_only=False)
+    elif table == "habit_logs":
+        async for rows in _keyset(habits.list_logs_page, "log_date", "habit_id"):
+            yield rows
+    elif table == "hive_memberships":
+        memberships = await hives.list_memberships()
+        names = {
+            str(hive["id"]): hive.get("name")
+            for hive in await hives.list_hives([m["hive_id"] for m in memberships])
+        }
+        yield [dict(m, hive_name=names.get(str(m["hive_id"]))) for m in memberships]
+    elif table == "hive_member_days":
+        async for rows in _keyset(hives.list_my_days_page, "day_date", "hive_id"):
+            yield rows
+
+
+def _cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _csv_lines(rows: Iterable[Iterable[Any]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def _stream(
+    tables: List[str],
+    output: str,
+    habits: HabitsRepo,
+    hives: HivesRepo,
+) -> AsyncIterator[bytes]:
+    for table in tables:
+        columns = TABLES[table]
+        if output == "csv":
+            yield _csv_lines([columns])
+        async for rows in _table_chunks(table, habits, hives):
+            if output == "csv":
+                yield _csv_lines([_cell(row.get(column)) for column in columns] for row in rows)
+            else:
+                yield b"".join(
+                    orjson.dumps(
+                        {"table": table, **{column: row.get(column) for column in columns}},
+                        default=str,
+                        option=orjson.OPT_APPEND_NEWLINE,
+                    )
+                    for row in rows
+                )
+
+
+@router.get("/")
+async def export_data(
+    habits: HabitsRepo = Depends(get_habits_repo),
+    hives: HivesRepo = Depends(get_hives_repo),
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="ndjson (one object per line, tagged with its table) or csv"),
+    tables: Optional[str] = Query(None, description="Comma separated subset of tables; csv takes exactly one"),
+):
+    """Stream the caller's habits, logs, hive memberships and hive days."""
+    selected = [t.strip() for t in tables.split(",") if t.strip()] if tables else list(TABLES)
+    unknown = [t for t in selected if t not in TABLES]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown tables: {', '.join(unknown)} (expected {', '.join(TABLES)})"
+        )
+    if format == "csv" and len(selected) != 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="CSV exports one table at a time; pass tables=<name>"
+        )
+
+    if format == "csv":
+        media_type, filename = "text/csv", f"habithive-{selected[0]}.csv"
+    else:
+        media_type, filename = "application/x-ndjson", "habithive-export.ndjson"
+    return StreamingResponse(
+        _stream(selected, format, habits, hives),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
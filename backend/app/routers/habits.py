@@ -1,14 +1,17 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from app.models.schemas import (
     Habit, HabitCreate, HabitUpdate, HabitWithLogs,
     HabitLog, HabitLogCreate, LogHabitRequest,
     HabitStreakSummary, HabitPerformance, InsightsResponse,
     HabitPerformanceDetail, InsightsRangeStats, InsightsDashboardResponse,
-    HabitType,
+    HabitType, HabitImportResult,
 )
-from app.core.auth import get_current_user
-from app.core.supabase import get_user_supabase_client, get_supabase_admin
 from app.core.config import settings
+from app.core.log_import import ImportTooLarge, read_csv
+from app.core.responses import ModelResponse
+from app.models.rows import construct_row, construct_rows
+from app.repositories import HabitsRepo, ProfilesRepo, get_habits_repo, get_profiles_repo, as_date
 from typing import Dict, Any, List, Optional
 from datetime import datetime, date, timedelta, time as datetime_time, timezone
 import uuid
@@ -16,9 +19,12 @@ import uuid
 
 router = APIRouter()
 
-# In-memory storage for test mode
-test_habits = {}
-test_logs = {}
+# Default page size of GET /{habit_id}/logs when paging, and the most a client may ask for
+LOG_PAGE_SIZE = 100
+LOG_PAGE_MAX = 500
+# Widest start_date..end_date span returned in one unpaged response: a year
+# plus slack for month lengths and the client's timezone
+LOG_RANGE_MAX_DAYS = 400
 
 def calculate_streak(
     logs: List[dict],
@@ -64,113 +70,57 @@ def calculate_streak(
     
     return streak
 
+def _serialize_reminder(data: Dict[str, Any]) -> Dict[str, Any]:
+    reminder_time = data.get("reminder_time")
+    if isinstance(reminder_time, datetime_time):
+        data["reminder_time"] = reminder_time.strftime("%H:%M:%S")
+    return data
+
+async def _owned_habit(repo: HabitsRepo, habit_id: str) -> Dict[str, Any]:
+    habit = await repo.get_habit(habit_id)
+    if not habit:
+        raise HTTPException(status_code=404, detail="Habit not found")
+    if str(habit["user_id"]) != repo.user_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return habit
+
 @router.get("/", response_model=List[HabitWithLogs])
 async def get_habits(
-    current_user: Dict[str, Any] = Depends(get_current_user),
+    repo: HabitsRepo = Depends(get_habits_repo),
     include_logs: bool = Query(False, description="Include recent logs"),
     days: int = Query(30, description="Number of days of logs to include")
 ):
     """Get all habits for current user"""
-    user_id = current_user["id"]
-    
-    if settings.TEST_MODE:
-        # Return test habits
-        user_habits = [h for h in test_habits.values() if h["user_id"] == user_id]
-        
-        result = []
-        for habit in user_habits:
-            habit_with_logs = HabitWithLogs(**habit)
-            
-            if include_logs:
-                # Get logs for this habit
-                habit_logs = [l for l in test_logs.values() 
-                             if l["habit_id"] == habit["id"]]
-                habit_with_logs.recent_logs = [HabitLog(**l) for l in habit_logs[-days:]]
-                habit_with_logs.current_streak = calculate_streak(
-                    habit_logs,
-                    target=habit.get("target_per_day", 1) or 1,
-                )
-                
-                # Calculate completion rate
-                total_days = days
-                completed_days = len(set(l["log_date"] for l in habit_logs))
-                habit_with_logs.completion_rate = (completed_days / total_days) * 100 if total_days > 0 else 0
-            
-            result.append(habit_with_logs)
-        
-        return result
-    
     try:
-        print(f"Getting habits for user: {user_id}")
-        supabase = get_supabase_admin()
-
-        # Get habits for the authenticated user using the service role to avoid
-        # issues with expired caller tokens while still scoping to the caller's
-        # user_id.
-        response = (
-            supabase
-            .table("habits")
-            .select("*")
-            .eq("user_id", user_id)
-            .eq("is_active", True)
-            .order("created_at", desc=True)
-            .execute()
-        )
+        habits = await repo.list_habits()
+        print(f"Found {len(habits)} habits for user {repo.user_id}")
 
-        if getattr(response, "error", None):
-            raise Exception(response.error.get("message", "Unable to fetch habits"))
+        logs_by_habit: Dict[str, List[Dict[str, Any]]] = {}
+        if include_logs and habits:
+            # One range read for every habit instead of a query per habit
+            start_date = date.today() - timedelta(days=days)
+            for log in await repo.list_logs(start_date=start_date, descending=True):
+                logs_by_habit.setdefault(str(log["habit_id"]), []).append(log)
 
-        habits = response.data or []
-        print(f"Found {len(habits)} habits for user {user_id}")
-        
         result = []
         for habit in habits:
-            print(f"Processing habit: {habit['id']} - {habit['name']}")
-            habit_with_logs = HabitWithLogs(**habit)
+            habit_with_logs = construct_row(HabitWithLogs, habit)
 
             if include_logs:
-                # Get recent logs
-                start_date = (date.today() - timedelta(days=days)).isoformat()
-                print(f"Looking for logs since: {start_date}")
-                logs_response = (
-                    supabase
-                    .table("habit_logs")
-                    .select("*")
-                    .eq("habit_id", habit["id"])
-                    .eq("user_id", user_id)
-                    .gte("log_date", start_date)
-                    .order("log_date", desc=True)
-                    .execute()
-                )
-
-                if getattr(logs_response, "error", None):
-                    print(f"Error fetching logs: {logs_response.error}")
-                    raise Exception(logs_response.error.get("message", "Unable to fetch logs"))
-
-                logs = logs_response.data or []
-                print(f"Found {len(logs)} logs for habit {habit['id']}: {logs}")
-
-                # Convert to HabitLog objects and log the conversion
-                habit_logs = []
-                for l in logs:
-                    habit_log = HabitLog(**l)
-                    print(f"Converted log: {l} -> HabitLog(log_date={habit_log.log_date})")
-                    habit_logs.append(habit_log)
-
-                habit_with_logs.recent_logs = habit_logs
+                logs = logs_by_habit.get(str(habit["id"]), [])
+                habit_with_logs.recent_logs = construct_rows(HabitLog, logs)
                 habit_with_logs.current_streak = calculate_streak(
                     logs,
                     target=habit.get("target_per_day", 1) or 1,
                 )
 
                 # Calculate completion rate
-                completed_days = len(set(l["log_date"] for l in logs))
+                completed_days = len(set(as_date(l["log_date"]) for l in logs))
                 habit_with_logs.completion_rate = (completed_days / days) * 100 if days > 0 else 0
-                print(f"Habit {habit['id']} final logs count: {len(habit_with_logs.recent_logs or [])}")
 
             result.append(habit_with_logs)
-        
-        return result
+
+        return ModelResponse(result)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -180,128 +130,162 @@ async def get_habits(
 @router.post("/", response_model=Habit)
 async def create_habit(
     habit: HabitCreate,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    repo: HabitsRepo = Depends(get_habits_repo)
 ):
     """Create a new habit"""
-    user_id = current_user["id"]
-    
-    if settings.TEST_MODE:
-        # Create test habit
-        habit_id = str(uuid.uuid4())
-        now = datetime.utcnow()
-        new_habit = {
-            "id": habit_id,
-            "user_id": user_id,
-            **habit.dict(),
-            "is_active": True,
-            "created_at": now.isoformat(),
-            "updated_at": now.isoformat()
-        }
-        test_habits[habit_id] = new_habit
-        # Return with proper datetime objects for Pydantic to serialize
-        return Habit(
-            id=habit_id,
-            user_id=user_id,
-            **habit.dict(),
-            is_active=True,
-            created_at=now,
-            updated_at=now
+    try:
+        created = await repo.create_habit(_serialize_reminder(habit.dict()))
+        return Habit(**created)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create habit: {str(e)}"
         )
-    
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ERRORS = 20
+
+@router.post("/import", response_model=HabitImportResult)
+async def import_habit_logs(
+    request: Request,
+    repo: HabitsRepo = Depends(get_habits_repo),
+    habit_id: Optional[str] = Query(None, description="Import every row into this habit instead of a habit/habit_id column"),
+):
+    """
+    Import habit history from a CSV body with a header row: log_date (or date),
+    optional value (default 1, capped at the habit's target) and habit_id or
+    habit (name) unless `habit_id` is given. Rows are written in bulk batches
+    and streaks are recomputed once per habit at the end; invalid rows are
+    skipped and reported.
+    """
     try:
-        supabase = get_user_supabase_client(current_user)
-        habit_data = {
-            "user_id": user_id,
-            **habit.dict()
-        }
-        reminder_time = habit_data.get("reminder_time")
-        if isinstance(reminder_time, datetime_time):
-            habit_data["reminder_time"] = reminder_time.strftime("%H:%M:%S")
+        habits = await repo.list_habits(active_only=False)
+        by_id = {str(h["id"]): h for h in habits}
+        by_name = {str(h.get("name", "")).strip().lower(): h for h in habits}
+        if habit_id and habit_id not in by_id:
+            raise HTTPException(status_code=404, detail="Habit not found")
+
+        result = HabitImportResult()
+        touched: set = set()
+        batch: Dict[tuple, Dict[str, Any]] = {}
+
+        def reject(line_no: int, reason: str) -> None:
+            result.skipped += 1
+            if len(result.errors) < IMPORT_MAX_ERRORS:
+                result.errors.append(f"line {line_no}: {reason}")
+
+        async def flush() -> None:
+            if batch:
+                result.imported += await repo.upsert_logs(list(batch.values()))
+                batch.clear()
+
+        async for line_no, row in read_csv(request.stream(), settings.HABIT_IMPORT_MAX_BYTES):
+            if habit_id:
+                habit = by_id[habit_id]
+            elif row.get("habit_id"):
+                habit = by_id.get(row["habit_id"].strip())
+            else:
+                habit = by_name.get((row.get("habit") or "").strip().lower())
+            if habit is None:
+                reject(line_no, "unknown habit")
+                continue
+            try:
+                log_date = _parse_log_date((row.get("log_date") or "").strip())
+                raw_value = (row.get("value") or "").strip()
+                value = int(float(raw_value)) if raw_value else 1
+            except ValueError:
+                reject(line_no, "invalid date or value")
+                continue
+            if log_date is None or value < 0:
+                reject(line_no, "missing date or negative value")
+                continue
 
-        response = supabase.table("habits").insert(habit_data).execute()
-        return Habit(**response.data[0])
+            hid = str(habit["id"])
+            touched.add(hid)
+            # Later rows for the same day win, as they would one by one
+            batch[(hid, log_date)] = {
+                "habit_id": hid,
+                "log_date": log_date,
+                "value": min(value, habit.get("target_per_day") or 1),
+            }
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await flush()
+
+        await flush()
+        await repo.refresh_habit_stats(sorted(touched))
+        result.habits = len(touched)
+        return result
+    except HTTPException:
+        raise
+    except ImportTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to create habit: {str(e)}"
+            detail=f"Failed to import logs: {str(e)}"
         )
 
 @router.get("/{habit_id}", response_model=HabitWithLogs)
 async def get_habit(
     habit_id: str,
-    current_user: Dict[str, Any] = Depends(get_current_user),
-    include_logs: bool = Query(True)
+    repo: HabitsRepo = Depends(get_habits_repo),
+    include_logs: bool = Query(True),
+    days: Optional[int] = Query(None, ge=1, le=366, description="Days of history in recent_logs (default 30 with before)"),
+    before: Optional[date] = Query(None, description="X-Next-Cursor of the previous response, for older logs"),
+    profiles: ProfilesRepo = Depends(get_profiles_repo),
 ):
-    """Get a specific habit"""
-    user_id = current_user["id"]
-    
-    if settings.TEST_MODE:
-        if habit_id not in test_habits:
-            raise HTTPException(status_code=404, detail="Habit not found")
-        
-        habit = test_habits[habit_id]
-        if habit["user_id"] != user_id:
-            raise HTTPException(status_code=403, detail="Not authorized")
-        
-        habit_with_logs = HabitWithLogs(**habit)
-        
-        if include_logs:
-            habit_logs = [l for l in test_logs.values() if l["habit_id"] == habit_id]
-            habit_with_logs.recent_logs = [HabitLog(**l) for l in habit_logs]
-            habit_with_logs.current_streak = calculate_streak(habit_logs)
-        
-        return habit_with_logs
-    
+    """
+    Get a specific habit with its logs, newest first.
+
+    Without days or before, recent_logs holds the full history, as existing
+    clients expect. With either, it covers the `days` days up to today, or up
+    to the day before `before`, and X-Next-Cursor is set when older logs
+    exist. current_streak comes from the stored streak columns and
+    completion_rate from the last 30 days, whichever window is requested.
+    """
     try:
-        supabase = get_supabase_admin()
-        response = (
-            supabase
-            .table("habits")
-            .select("*")
-            .eq("id", habit_id)
-            .eq("user_id", user_id)
-            .single()
-            .execute()
-        )
-
-        if getattr(response, "error", None):
-            raise Exception(response.error.get("message", "Unable to fetch habit"))
-        
-        if not response.data:
-            raise HTTPException(status_code=404, detail="Habit not found")
-        
-        habit_with_logs = HabitWithLogs(**response.data)
-        
-        if include_logs:
-            logs_response = (
-                supabase
-                .table("habit_logs")
-                .select("*")
-                .eq("habit_id", habit_id)
-                .eq("user_id", user_id)
-                .order("log_date", desc=True)
-                .execute()
-            )
+        habit = await _owned_habit(repo, habit_id)
+        habit_with_logs = construct_row(HabitWithLogs, habit)
+        headers: Dict[str, str] = {}
 
-            if getattr(logs_response, "error", None):
-                raise Exception(logs_response.error.get("message", "Unable to fetch logs"))
-            
-            logs = logs_response.data or []
-            print(f"🔍 GET habit {habit_id} logs: {logs}")
-            habit_with_logs.recent_logs = [HabitLog(**l) for l in logs]
-            habit_with_logs.current_streak = calculate_streak(
-                logs,
-                target=habit_with_logs.target_per_day,
-            )
+        # The stored streak ends on the last logged day; it is broken once a
+        # whole day of the user's (SQL user_local_date) has passed without a log
+        today = await profiles.user_local_date()
+        last_logged = as_date(habit.get("last_completed_date"))
+        if last_logged is None or last_logged < today - timedelta(days=1):
+            habit_with_logs.current_streak = 0
 
-            # Calculate completion rate (last 30 days)
-            from datetime import date, timedelta
-            thirty_days_ago = date.today() - timedelta(days=30)
-            recent_logs = [l for l in logs if date.fromisoformat(l["log_date"]) >= thirty_days_ago]
-            unique_days = len(set(l["log_date"] for l in recent_logs))
-            habit_with_logs.completion_rate = (unique_days / 30) * 100 if unique_days > 0 else 0
+        if include_logs:
+            month_start = today - timedelta(days=29)
+            if days is None and before is None:
+                logs = await repo.list_logs(habit_id=habit_id, descending=True)
+                month_logs = logs
+            else:
+                days = days or 30
+                newest = before - timedelta(days=1) if before else today
+                oldest = newest - timedelta(days=days - 1)
+                logs = await repo.list_habit_logs_page(habit_id, days, oldest=oldest, newest=newest)
+                if await repo.list_habit_logs_page(habit_id, 1, newest=oldest - timedelta(days=1)):
+                    headers["X-Next-Cursor"] = oldest.isoformat()
+
+                # Completion rate over the last 30 days, reusing the window when it covers them
+                if before is None and days >= 30:
+                    month_logs = logs
+                else:
+                    month_logs = await repo.list_habit_logs_page(habit_id, 30, oldest=month_start, newest=today)
+            habit_with_logs.recent_logs = construct_rows(HabitLog, logs)
+
+            unique_days = len({
+                as_date(l["log_date"]) for l in month_logs
+                if month_start <= as_date(l["log_date"]) <= today
+            })
+            habit_with_logs.completion_rate = (unique_days / 30) * 100
 
-        return habit_with_logs
+        return ModelResponse(habit_with_logs, headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -312,38 +296,20 @@ async def get_habit(
 async def update_habit(
     habit_id: str,
     update: HabitUpdate,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    repo: HabitsRepo = Depends(get_habits_repo)
 ):
     """Update a habit"""
-    user_id = current_user["id"]
-    
-    if settings.TEST_MODE:
-        if habit_id not in test_habits:
-            raise HTTPException(status_code=404, detail="Habit not found")
-        
-        habit = test_habits[habit_id]
-        if habit["user_id"] != user_id:
-            raise HTTPException(status_code=403, detail="Not authorized")
-        
-        update_data = update.dict(exclude_unset=True)
-        habit.update(update_data)
-        habit["updated_at"] = datetime.utcnow()
-        
-        return Habit(**habit)
-    
     try:
-        supabase = get_user_supabase_client(current_user)
-        update_data = update.dict(exclude_unset=True)
-        if "reminder_time" in update_data and isinstance(update_data["reminder_time"], datetime_time):
-            update_data["reminder_time"] = update_data["reminder_time"].strftime("%H:%M:%S")
+        update_data = _serialize_reminder(update.dict(exclude_unset=True))
         update_data["updated_at"] = datetime.utcnow().isoformat()
-        
-        response = supabase.table("habits").update(update_data).eq("id", habit_id).eq("user_id", user_id).execute()
-        
-        if not response.data:
+
+        updated = await repo.update_habit(habit_id, update_data)
+        if not updated:
             raise HTTPException(status_code=404, detail="Habit not found")
-        
-        return Habit(**response.data[0])
+
+        return Habit(**updated)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -353,49 +319,15 @@ async def update_habit(
 @router.delete("/{habit_id}")
 async def delete_habit(
     habit_id: str,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    repo: HabitsRepo = Depends(get_habits_repo)
 ):
     """Delete (archive) a habit"""
-    user_id = current_user["id"]
-    
-    if settings.TEST_MODE:
-        if habit_id not in test_habits:
-            raise HTTPException(status_code=404, detail="Habit not found")
-        
-        habit = test_habits[habit_id]
-        if habit["user_id"] != user_id:
-            raise HTTPException(status_code=403, detail="Not authorized")
-        
-        # Hard delete in test mode
-        del test_habits[habit_id]
-        to_remove = [log_id for log_id, log in test_logs.items() if log["habit_id"] == habit_id]
-        for log_id in to_remove:
-            test_logs.pop(log_id, None)
-        
-        return {"success": True, "message": "Habit deleted"}
-    
     try:
-        supabase = get_user_supabase_client(current_user)
-        
-        exists = (
-            supabase
-            .table("habits")
-            .select("id")
-            .eq("id", habit_id)
-            .eq("user_id", user_id)
-            .single()
-            .execute()
-        )
-
-        if getattr(exists, "data", None) is None:
-            raise HTTPException(status_code=404, detail="Habit not found")
-
-        response = supabase.table("habits").delete().eq("id", habit_id).eq("user_id", user_id).execute()
-
-        if getattr(response, "error", None):
-            raise HTTPException(status_code=500, detail=response.error.get("message", "Failed to delete habit"))
-
+        await _owned_habit(repo, habit_id)
+        await repo.delete_habit(habit_id)
         return {"success": True, "message": "Habit deleted"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -406,69 +338,13 @@ async def delete_habit(
 async def log_habit(
     habit_id: str,
     log_data: HabitLogCreate,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    repo: HabitsRepo = Depends(get_habits_repo)
 ):
     """Log a habit for today"""
-    user_id = current_user["id"]
-    
-    if settings.TEST_MODE:
-        if habit_id not in test_habits:
-            raise HTTPException(status_code=404, detail="Habit not found")
-        
-        habit = test_habits[habit_id]
-        if habit["user_id"] != user_id:
-            raise HTTPException(status_code=403, detail="Not authorized")
-        
-        # Cap value at target
-        value = min(log_data.value, habit["target_per_day"])
-        
-        log_id = str(uuid.uuid4())
-        log_date = date.today()
-        
-        # Check for existing log
-        existing = [l for l in test_logs.values() 
-                   if l["habit_id"] == habit_id and l["log_date"] == log_date]
-        
-        if existing:
-            # Update existing
-            existing[0]["value"] = value
-            existing[0]["created_at"] = datetime.utcnow()
-            return HabitLog(**existing[0])
-        
-        new_log = {
-            "id": log_id,
-            "habit_id": habit_id,
-            "user_id": user_id,
-            "log_date": log_date,
-            "value": value,
-            "source": "api",
-            "created_at": datetime.utcnow()
-        }
-        test_logs[log_id] = new_log
-        return HabitLog(**new_log)
-    
     try:
-        supabase = get_user_supabase_client(current_user)
-
-        habit_response = (
-            supabase
-            .table("habits")
-            .select("user_id,target_per_day")
-            .eq("id", habit_id)
-            .single()
-            .execute()
-        )
-
-        habit_row = habit_response.data or {}
-
-        if not habit_row:
-            raise HTTPException(status_code=404, detail="Habit not found")
-
-        habit_owner = habit_row.get("user_id")
-        if str(habit_owner) != str(user_id):
-            raise HTTPException(status_code=403, detail="Not authorized")
+        habit = await _owned_habit(repo, habit_id)
 
-        target = habit_row.get("target_per_day") or 1
+        target = habit.get("target_per_day") or 1
         capped_value = min(log_data.value, target)
 
         # Determine the timestamp to use when resolving the user's local day
@@ -486,25 +362,10 @@ async def log_habit(
         if not client_ts:
             client_ts = datetime.utcnow().replace(tzinfo=timezone.utc)
 
-        rpc_payload = {
-            "p_habit_id": habit_id,
-            "p_value": capped_value,
-            "p_at": client_ts.isoformat(),
-        }
-
-        response = supabase.rpc("log_habit", rpc_payload).execute()
-
-        if getattr(response, "error", None):
-            raise Exception(response.error.get("message", "Unable to log habit"))
-
-        record = response.data
-        if isinstance(record, list):
-            record = record[0] if record else None
-
-        if not record:
-            raise HTTPException(status_code=500, detail="Habit log insert returned empty payload")
-
+        record = await repo.log_habit(habit_id, capped_value, client_ts)
         return HabitLog(**record)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -515,48 +376,14 @@ async def log_habit(
 @router.delete("/{habit_id}/log")
 async def delete_habit_log(
     habit_id: str,
-    current_user: Dict[str, Any] = Depends(get_current_user),
+    repo: HabitsRepo = Depends(get_habits_repo),
+    profiles: ProfilesRepo = Depends(get_profiles_repo),
     log_date: Optional[date] = Query(None, description="Date of the log to delete (defaults to today)")
 ):
     """Delete a habit log for a specific day (defaults to today)."""
-    user_id = current_user["id"]
-    if settings.TEST_MODE:
-        # Find matching logs and remove
-        to_delete = [key for key, log in test_logs.items()
-                     if log["habit_id"] == habit_id
-                     and log["user_id"] == user_id
-                     and log["log_date"] == (log_date or date.today())]
-
-        if not to_delete:
-            return {"success": False, "message": "No log found"}
-
-        for key in to_delete:
-            test_logs.pop(key, None)
-
-        return {"success": True, "message": "Log removed"}
-
     try:
-        supabase = get_user_supabase_client(current_user)
-
-        target = log_date
-        if target is None:
-            user_id_str = str(user_id)
-            date_response = supabase.rpc("user_local_date", {"p_user": user_id_str}).execute()
-            if getattr(date_response, "error", None):
-                raise Exception(date_response.error.get("message", "Unable to resolve user day"))
-            target = date.fromisoformat(date_response.data)
-
-        response = (
-            supabase
-            .table("habit_logs")
-            .delete()
-            .eq("habit_id", habit_id)
-            .eq("user_id", user_id)
-            .eq("log_date", target.isoformat())
-            .execute()
-        )
-
-        deleted = bool(response.data)
+        target = log_date or await profiles.user_local_date()
+        deleted = await repo.delete_log(habit_id, target)
         return {"success": deleted, "message": "Log removed" if deleted else "No log found"}
     except Exception as e:
         raise HTTPException(
@@ -564,56 +391,66 @@ async def delete_habit_log(
             detail=f"Failed to delete habit log: {str(e)}"
         )
 
+def _parse_log_date(value: Optional[str]) -> Optional[date]:
+    """Accept plain dates or ISO datetimes from clients."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).date()
+    except ValueError:
+        return date.fromisoformat(value[:10])
+
 @router.get("/{habit_id}/logs", response_model=List[HabitLog])
 async def get_habit_logs(
     habit_id: str,
-    current_user: Dict[str, Any] = Depends(get_current_user),
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None
+    repo: HabitsRepo = Depends(get_habits_repo),
+    start_date: Optional[date] = Query(None, description="Oldest log_date to include"),
+    end_date: Optional[date] = Query(None, description="Newest log_date to include"),
+    before: Optional[date] = Query(None, description="X-Next-Cursor of the previous page, for older logs"),
+    limit: Optional[int] = Query(None, ge=1, le=LOG_PAGE_MAX, description=f"Page size (default {LOG_PAGE_SIZE} with before)"),
+    profiles: ProfilesRepo = Depends(get_profiles_repo),
 ):
-    """Get logs for a habit"""
-    user_id = current_user["id"]
-    
-    if settings.TEST_MODE:
-        if habit_id not in test_habits:
-            raise HTTPException(status_code=404, detail="Habit not found")
-        
-        habit = test_habits[habit_id]
-        if habit["user_id"] != user_id:
-            raise HTTPException(status_code=403, detail="Not authorized")
-        
-        logs = [l for l in test_logs.values() if l["habit_id"] == habit_id]
-        
-        if start_date:
-            logs = [l for l in logs if l["log_date"] >= start_date]
-        if end_date:
-            logs = [l for l in logs if l["log_date"] <= end_date]
-        
-        return [HabitLog(**l) for l in logs]
-    
+    """
+    Get logs for a habit.
+
+    Without limit or before, every log in the range is returned oldest first,
+    as existing clients expect, streamed as the backend's JSON; the range must then start within
+    LOG_RANGE_MAX_DAYS of its end (the user's today when open), so at most
+    about a year of rows is read at once. With limit or before, one page is
+    returned newest first, keyed on log_date (unique per habit); X-Next-Cursor
+    is set when older logs in the range remain.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must not be after end_date"
+        )
+    paged = limit is not None or before is not None
+    if not paged:
+        newest = end_date or await profiles.user_local_date()
+        if start_date is None or (newest - start_date).days >= LOG_RANGE_MAX_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Without limit, start_date must be within {LOG_RANGE_MAX_DAYS} days of end_date; pass limit to page through longer ranges"
+            )
     try:
-        supabase = get_user_supabase_client(current_user)
-
-        query = supabase.table("habit_logs").select("*").eq("habit_id", habit_id).eq("user_id", user_id)
-
-        if start_date:
-            # Parse ISO datetime string to date-only format for database comparison
-            try:
-                parsed_date = datetime.fromisoformat(start_date.replace('Z', '+00:00')).date()
-                query = query.gte("log_date", parsed_date.isoformat())
-            except ValueError:
-                # If parsing fails, assume it's already in the right format
-                query = query.gte("log_date", start_date)
-
-        if end_date:
-            try:
-                parsed_date = datetime.fromisoformat(end_date.replace('Z', '+00:00')).date()
-                query = query.lte("log_date", parsed_date.isoformat())
-            except ValueError:
-                query = query.lte("log_date", end_date)
-        
-        response = query.execute()
-        return [HabitLog(**l) for l in response.data]
+        if not paged:
+            # Streamed as the storage backend's own JSON, without parsing rows
+            body = await repo.list_logs_json(habit_id=habit_id, start_date=start_date, end_date=end_date)
+            return StreamingResponse(body, media_type="application/json")
+
+        limit = limit or LOG_PAGE_SIZE
+        newest = end_date
+        if before and (newest is None or before <= newest):
+            newest = before - timedelta(days=1)
+
+        # One extra row tells whether another page follows
+        logs = await repo.list_habit_logs_page(habit_id, limit + 1, oldest=start_date, newest=newest)
+        headers: Dict[str, str] = {}
+        if len(logs) > limit:
+            logs = logs[:limit]
+            headers["X-Next-Cursor"] = as_date(logs[-1]["log_date"]).isoformat()
+        return ModelResponse(construct_rows(HabitLog, logs), headers=headers)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -623,123 +460,23 @@ async def get_habit_logs(
 
 @router.get("/insights/dashboard", response_model=InsightsDashboardResponse)
 async def get_insights_dashboard(
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    repo: HabitsRepo = Depends(get_habits_repo)
 ):
     """Return aggregated insights for week/month/year views."""
-    user_id = current_user["id"]
-
-    if settings.TEST_MODE:
-        # Reuse existing in-memory data for deterministic tests
-        from collections import defaultdict
-
-        user_habits = [h for h in test_habits.values() if h["user_id"] == user_id and h.get("is_active", True)]
-        user_logs = [l for l in test_logs.values() if l["user_id"] == user_id]
-
-        today = date.today()
-        ranges = {"week": 7, "month": 30, "year": 365}
-        logs_by_habit = defaultdict(list)
-        for log in user_logs:
-            logs_by_habit[log["habit_id"]].append(log)
-
-        def compute_window(days: int) -> InsightsRangeStats:
-            start = today - timedelta(days=days - 1)
-            total_possible = len(user_habits) * days
-            total_contrib = 0.0
-            best_streak = 0
-            performance: List[HabitPerformanceDetail] = []
-
-            for habit in user_habits:
-                hid = habit["id"]
-                target = habit.get("target_per_day", 1) or 1
-                logs = logs_by_habit.get(hid, [])
-                contributions = 0.0
-                for log in logs:
-                    log_date = log["log_date"]
-                    if isinstance(log_date, str):
-                        log_date = date.fromisoformat(log_date)
-                    if log_date < start or log_date > today:
-                        continue
-                    value = log.get("value", 0) or 0
-                    contributions += min(value / target, 1.0)
-
-                streak = calculate_streak(logs, target_date=today, target=target)
-                best_streak = max(best_streak, streak)
-                total_contrib += contributions
-
-                performance.append(
-                    HabitPerformanceDetail(
-                        habit_id=uuid.UUID(hid),
-                        name=habit.get("name", ""),
-                        emoji=habit.get("emoji"),
-                        color_hex=habit.get("color_hex", "#FF9F1C"),
-                        type=HabitType(habit.get("type", "checkbox")),
-                        target_per_day=target,
-                        completion_rate=(contributions / days) * 100 if days else 0.0,
-                        streak=streak,
-                    )
-                )
-
-            performance.sort(key=lambda item: (-item.completion_rate, item.name.lower()))
-            avg = (total_contrib / total_possible) * 100 if total_possible else 0.0
-            return InsightsRangeStats(
-                average_completion=avg,
-                current_streak=best_streak,
-                habit_performance=performance,
-            )
-
-        ranges_payload = {key: compute_window(days) for key, days in ranges.items()}
-
-        year_overview: Dict[str, int] = {}
-        year_cutoff = today - timedelta(days=365)
-        for log in user_logs:
-            log_date = log["log_date"]
-            if isinstance(log_date, str):
-                log_date = date.fromisoformat(log_date)
-            if log_date >= year_cutoff:
-                key = log_date.isoformat()
-                year_overview[key] = year_overview.get(key, 0) + 1
-
-        return InsightsDashboardResponse(ranges=ranges_payload, year_overview=year_overview)
-
     try:
-        supabase = get_user_supabase_client(current_user)
-
-        habits_response = (
-            supabase
-            .table("habits")
-            .select("*")
-            .eq("user_id", user_id)
-            .eq("is_active", True)
-            .execute()
-        )
-        habits = habits_response.data or []
+        habits = await repo.list_habits()
 
         today = date.today()
-        year_window_start = (today - timedelta(days=365)).isoformat()
-
-        logs_response = (
-            supabase
-            .table("habit_logs")
-            .select("habit_id, log_date, value")
-            .eq("user_id", user_id)
-            .gte("log_date", year_window_start)
-            .order("log_date", desc=True)
-            .execute()
-        )
+        logs = await repo.list_logs(start_date=today - timedelta(days=365), descending=True)
 
-        logs = logs_response.data or []
-
-        habit_map = {habit["id"]: habit for habit in habits}
+        habit_map = {str(habit["id"]): habit for habit in habits}
 
         logs_by_habit: Dict[str, List[Dict[str, Any]]] = {}
         for log in logs:
-            hid = log["habit_id"]
+            hid = str(log["habit_id"])
             if hid not in habit_map:
                 continue
-            log_date = log["log_date"]
-            if isinstance(log_date, str):
-                log_date = date.fromisoformat(log_date)
-            log["log_date"] = log_date
+            log["log_date"] = as_date(log["log_date"])
             logs_by_habit.setdefault(hid, []).append(log)
 
         def compute_range(days: int) -> InsightsRangeStats:
@@ -796,8 +533,8 @@ async def get_insights_dashboard(
         year_overview: Dict[str, int] = {}
         year_cutoff = today - timedelta(days=365)
         for entry in logs:
-            log_date = entry["log_date"]
-            if isinstance(log_date, date) and log_date >= year_cutoff:
+            log_date = as_date(entry["log_date"])
+            if log_date >= year_cutoff:
                 key = log_date.isoformat()
                 year_overview[key] = year_overview.get(key, 0) + 1
 
@@ -810,33 +547,31 @@ async def get_insights_dashboard(
 
 @router.get("/insights/summary", response_model=InsightsResponse)
 async def get_insights(
-    current_user: Dict[str, Any] = Depends(get_current_user),
+    repo: HabitsRepo = Depends(get_habits_repo),
     days: int = Query(30, description="Number of days to analyze")
 ):
     """Get insights and statistics"""
-    user_id = current_user["id"]
 
     def build_response(habits: List[Dict[str, Any]], logs: List[Dict[str, Any]]) -> InsightsResponse:
         today = date.today()
         window_start = today - timedelta(days=days - 1)
         year_start = today - timedelta(days=365)
 
-        habit_map = {habit["id"]: habit for habit in habits if habit.get("is_active", True)}
+        habit_map = {str(habit["id"]): habit for habit in habits if habit.get("is_active", True)}
         active_habits = len(habit_map)
 
         logs_by_date: Dict[date, List[Dict[str, Any]]] = {}
         logs_by_habit: Dict[str, List[Dict[str, Any]]] = {hid: [] for hid in habit_map.keys()}
 
         for log in logs:
-            log_date = log["log_date"]
-            if isinstance(log_date, str):
-                log_date = date.fromisoformat(log_date)
+            log_date = as_date(log["log_date"])
+            hid = str(log["habit_id"])
 
-            if log["habit_id"] not in habit_map:
+            if hid not in habit_map:
                 continue
 
             logs_by_date.setdefault(log_date, []).append(log)
-            logs_by_habit.setdefault(log["habit_id"], []).append({
+            logs_by_habit.setdefault(hid, []).append({
                 "log_date": log_date,
                 "value": log.get("value", 1)
             })
@@ -851,7 +586,7 @@ async def get_insights(
         total_possible = active_habits * days
         completed_in_window = sum(
             1 for log in logs
-            if log["habit_id"] in habit_map and isinstance(log["log_date"], str) and date.fromisoformat(log["log_date"]) >= window_start
+            if str(log["habit_id"]) in habit_map and as_date(log["log_date"]) >= window_start
         )
         overall_completion = (completed_in_window / total_possible * 100) if total_possible > 0 else 0
 
@@ -907,17 +642,11 @@ async def get_insights(
             best_performing=best_perf
         )
 
-    if settings.TEST_MODE:
-        user_habits = [h for h in test_habits.values() if h["user_id"] == user_id and h.get("is_active", True)]
-        user_logs = [l for l in test_logs.values() if l["user_id"] == user_id]
-        return build_response(user_habits, user_logs)
-
     try:
-        supabase = get_user_supabase_client(current_user)
-        habits_response = supabase.table("habits").select("*").eq("user_id", user_id).eq("is_active", True).execute()
-        logs_response = supabase.table("habit_logs").select("habit_id, log_date, value").eq("user_id", user_id).execute()
+        habits = await repo.list_habits()
+        logs = await repo.list_logs()
 
-        return build_response(habits_response.data or [], logs_response.data or [])
+        return build_response(habits, logs)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
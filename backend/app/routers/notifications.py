@@ -4,12 +4,17 @@ Handles push notification sending and management
 """
 
 from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, List
 from pydantic import BaseModel
 from datetime import datetime
 from app.core.auth import get_current_user, verify_service_key
 from app.core.supabase import get_supabase_admin
 from app.core.onesignal import onesignal_client
+from app.core.passthrough import open_rows
+from app.core.profile_cache import SERVICE_VIEWER, profile_day_cache
+from app.core.user_day import local_date
+from app.repositories import ProfilesRepo, get_profiles_repo
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,6 +22,12 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+NOTIFICATION_LOG_COLUMNS = (
+    "id", "user_id", "habit_id", "notification_type", "sent_at", "sent_date",
+    "onesignal_id", "status", "error_message", "metadata",
+)
+
+
 class NotificationResult(BaseModel):
     """Result of sending notifications"""
     total_habits: int
@@ -25,6 +36,15 @@ class NotificationResult(BaseModel):
     errors: List[str] = []
 
 
+async def _fetch_day_settings(supabase, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Timezone settings for reminder recipients, read with the service role."""
+    response = supabase.table("profiles")\
+        .select("id, timezone, day_start_hour")\
+        .in_("id", user_ids)\
+        .execute()
+    return {row["id"]: row for row in (response.data or [])}
+
+
 @router.post("/send-reminders", response_model=NotificationResult)
 async def send_reminders(
     _: bool = Depends(verify_service_key)
@@ -48,6 +68,12 @@ async def send_reminders(
 
         logger.info(f"Found {total_habits} habits needing reminders")
 
+        day_settings = await profile_day_cache.get_many(
+            SERVICE_VIEWER,
+            (habit["user_id"] for habit in habits),
+            lambda user_ids: _fetch_day_settings(supabase, user_ids),
+        )
+
         for habit in habits:
             try:
                 habit_id = habit["habit_id"]
@@ -88,11 +114,7 @@ async def send_reminders(
                     )
 
                 # Calculate sent_date in user's timezone
-                sent_date_query = supabase.rpc(
-                    "user_current_date",
-                    {"p_user_id": user_id}
-                ).execute()
-                sent_date = sent_date_query.data if sent_date_query.data else datetime.utcnow().date().isoformat()
+                sent_date = local_date(day_settings.get(str(user_id))).isoformat()
 
                 # Log the notification
                 log_entry = {
@@ -169,7 +191,8 @@ async def send_reminders(
 
 @router.post("/test")
 async def send_test_notification(
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    profiles: ProfilesRepo = Depends(get_profiles_repo)
 ):
     """
     Send a test notification to the current user.
@@ -205,11 +228,7 @@ async def send_test_notification(
         )
 
         # Log the test notification
-        sent_date_query = supabase.rpc(
-            "user_current_date",
-            {"p_user_id": user_id}
-        ).execute()
-        sent_date = sent_date_query.data if sent_date_query.data else datetime.utcnow().date().isoformat()
+        sent_date = (await profiles.user_local_date()).isoformat()
 
         log_entry = {
             "user_id": user_id,
@@ -256,24 +275,26 @@ async def get_notification_logs(
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
-    Get notification logs for the current user
+    Get notification logs for the current user, passing PostgREST's JSON through
     """
     user_id = current_user["id"]
 
     try:
-        supabase = get_supabase_admin()
-
-        response = supabase.table("notification_logs")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .order("sent_at", desc=True)\
-            .limit(limit)\
-            .execute()
-
-        return {
-            "logs": response.data or [],
-            "count": len(response.data or [])
-        }
+        rows = await open_rows("notification_logs", [
+            ("select", ",".join(NOTIFICATION_LOG_COLUMNS)),
+            ("user_id", f"eq.{user_id}"),
+            ("order", "sent_at.desc"),
+            ("limit", str(limit)),
+        ])
+
+        async def body():
+            # PostgREST's array is forwarded untouched inside the envelope
+            yield f'{{"count":{rows.row_count},"logs":'.encode()
+            async for chunk in rows:
+                yield chunk
+            yield b"}"
+
+        return StreamingResponse(body(), media_type="application/json")
 
     except Exception as e:
         logger.error(f"Error fetching notification logs: {str(e)}", exc_info=True)
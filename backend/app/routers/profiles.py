@@ -3,15 +3,14 @@ from app.models.schemas import Profile, ProfileUpdate
 from app.core.auth import get_current_user
 from app.core.supabase import get_user_supabase_client
 from app.core.config import settings
+from app.core.profile_cache import invalidate_profile
+from app.core.contact_match import sync_phone_hash
 from typing import Dict, Any
 from datetime import datetime
 import uuid
 
 router = APIRouter()
 
-# In-memory storage for test mode
-test_profiles = {}
-
 @router.get("/me", response_model=Profile)
 async def get_my_profile(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Get current user's profile"""
@@ -47,6 +46,8 @@ async def get_my_profile(current_user: Dict[str, Any] = Depends(get_current_user
             print(f"Profile insert response: {insert_response}")
 
             if insert_response.data and len(insert_response.data) > 0:
+                if profile_data["phone"]:
+                    await sync_phone_hash(user_id, profile_data["phone"])
                 return Profile(**insert_response.data[0])
             else:
                 raise Exception("Failed to create profile - no data returned")
@@ -86,12 +87,16 @@ async def update_my_profile(
                 update_data["phone"] = None
 
         response = supabase.table("profiles").update(update_data).eq("id", user_id).execute()
+        invalidate_profile(user_id)
         
         if not response.data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Profile not found"
             )
+
+        if "phone" in update_data:
+            await sync_phone_hash(user_id, update_data["phone"])
         
         return Profile(**response.data[0])
     except Exception as e:
@@ -0,0 +1,199 @@
+-- ========= Per-user activity timeline (fan-out on write) =========
+-- Every hive event is copied into the timeline of each active member when it
+-- is written, with the actor's display name and avatar denormalized in. The
+-- feed then reads one user's newest rows from the primary key instead of
+-- scanning activity_events across all of the user's hives and joining
+-- profiles.
+--
+-- Timelines are capped at timeline_max_events() rows per user; older rows are
+-- trimmed by a pg_cron job, so a timeline may briefly exceed the cap.
+
+create table if not exists public.activity_timeline (
+  user_id uuid not null references auth.users(id) on delete cascade,
+  created_at timestamptz not null,
+  id uuid not null references public.activity_events(id) on delete cascade,
+  actor_id uuid not null,
+  hive_id uuid not null references public.hives(id) on delete cascade,
+  habit_id uuid,
+  type public.activity_type not null,
+  data jsonb not null default '{}'::jsonb,
+  actor_name text,
+  actor_avatar text,
+  primary key (user_id, created_at, id)
+);
+
+create index if not exists idx_activity_timeline_user_hive on public.activity_timeline(user_id, hive_id);
+create index if not exists idx_activity_timeline_actor on public.activity_timeline(actor_id);
+
+alter table public.activity_timeline enable row level security;
+
+do $$ begin
+  drop policy if exists "read own timeline" on public.activity_timeline;
+exception when others then null;
+end $$;
+
+create policy "read own timeline" on public.activity_timeline
+  for select using (user_id = auth.uid());
+
+create or replace function public.timeline_max_events()
+returns int
+language sql immutable
+as $$ select 500 $$;
+
+-- Fan a new hive event out to every active member.
+create or replace function public.activity_events_fan_out()
+returns trigger
+language plpgsql security definer
+set search_path = public
+as $$
+begin
+  if new.hive_id is null then
+    return new;
+  end if;
+
+  insert into public.activity_timeline(
+    user_id, created_at, id, actor_id, hive_id, habit_id, type, data, actor_name, actor_avatar
+  )
+  select m.user_id, new.created_at, new.id, new.actor_id, new.hive_id, new.habit_id,
+         new.type, new.data, p.display_name, p.avatar_url
+  from public.hive_members m
+  left join public.profiles p on p.id = new.actor_id
+  where m.hive_id = new.hive_id and m.is_active = true
+  on conflict do nothing;
+
+  return new;
+end $$;
+
+drop trigger if exists activity_events_fan_out on public.activity_events;
+create trigger activity_events_fan_out
+  after insert on public.activity_events
+  for each row execute function public.activity_events_fan_out();
+
+-- Copy a hive's recent events into users' timelines (all active members when
+-- p_user is null, all of p_user's active hives when p_hive_id is null).
+-- Also the backfill tool: select public.backfill_activity_timeline();
+create or replace function public.backfill_activity_timeline(
+  p_user uuid default null,
+  p_hive_id uuid default null,
+  p_per_user int default public.timeline_max_events()
+)
+returns int
+language plpgsql security definer
+set search_path = public
+as $$
+declare
+  v_count int;
+begin
+  insert into public.activity_timeline(
+    user_id, created_at, id, actor_id, hive_id, habit_id, type, data, actor_name, actor_avatar
+  )
+  select r.user_id, r.created_at, r.id, r.actor_id, r.hive_id, r.habit_id,
+         r.type, r.data, p.display_name, p.avatar_url
+  from (
+    select m.user_id, e.*,
+           row_number() over (partition by m.user_id order by e.created_at desc, e.id desc) as rn
+    from public.hive_members m
+    join public.activity_events e on e.hive_id = m.hive_id
+    where m.is_active = true
+      and (p_user is null or m.user_id = p_user)
+      and (p_hive_id is null or m.hive_id = p_hive_id)
+  ) r
+  left join public.profiles p on p.id = r.actor_id
+  where r.rn <= p_per_user
+  on conflict do nothing;
+
+  get diagnostics v_count = row_count;
+  return v_count;
+end $$;
+
+revoke all on function public.backfill_activity_timeline(uuid, uuid, int) from public;
+
+-- Joining a hive brings its history in; leaving removes it.
+create or replace function public.hive_members_sync_timeline()
+returns trigger
+language plpgsql security definer
+set search_path = public
+as $$
+begin
+  if new.is_active and (tg_op = 'INSERT' or not old.is_active) then
+    perform public.backfill_activity_timeline(new.user_id, new.hive_id);
+  elsif tg_op = 'UPDATE' and old.is_active and not new.is_active then
+    delete from public.activity_timeline
+    where user_id = new.user_id and hive_id = new.hive_id;
+  end if;
+  return new;
+end $$;
+
+drop trigger if exists hive_members_sync_timeline on public.hive_members;
+create trigger hive_members_sync_timeline
+  after insert or update of is_active on public.hive_members
+  for each row execute function public.hive_members_sync_timeline();
+
+-- Keep denormalized actor data current; display changes are rare.
+create or replace function public.profiles_sync_timeline()
+returns trigger
+language plpgsql security definer
+set search_path = public
+as $$
+begin
+  update public.activity_timeline
+  set actor_name = new.display_name, actor_avatar = new.avatar_url
+  where actor_id = new.id;
+  return new;
+end $$;
+
+drop trigger if exists profiles_sync_timeline on public.profiles;
+create trigger profiles_sync_timeline
+  after update of display_name, avatar_url on public.profiles
+  for each row
+  when ((old.display_name, old.avatar_url) is distinct from (new.display_name, new.avatar_url))
+  execute function public.profiles_sync_timeline();
+
+-- Drop rows beyond the per-user cap.
+create or replace function public.trim_activity_timeline(
+  p_max int default public.timeline_max_events()
+)
+returns int
+language plpgsql security definer
+set search_path = public
+as $$
+declare
+  v_count int;
+begin
+  delete from public.activity_timeline t
+  using (
+    select user_id, created_at, id
+    from (
+      select user_id, created_at, id,
+             row_number() over (partition by user_id order by created_at desc, id desc) as rn
+      from public.activity_timeline
+      where user_id in (
+        select user_id from public.activity_timeline
+        group by user_id having count(*) > p_max
+      )
+    ) ranked
+    where rn > p_max
+  ) old_rows
+  where t.user_id = old_rows.user_id
+    and t.created_at = old_rows.created_at
+    and t.id = old_rows.id;
+
+  get diagnostics v_count = row_count;
+  return v_count;
+end $$;
+
+revoke all on function public.trim_activity_timeline(int) from public;
+
+select public.backfill_activity_timeline();
+
+create extension if not exists pg_cron;
+
+select cron.unschedule('activity-timeline-trim-job') where exists (
+  select 1 from cron.job where jobname = 'activity-timeline-trim-job'
+);
+
+select cron.schedule(
+  'activity-timeline-trim-job',
+  '17 * * * *',
+  $$ select public.trim_activity_timeline(); $$
+);
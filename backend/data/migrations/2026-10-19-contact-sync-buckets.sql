@@ -0,0 +1,62 @@
+-- ========= Differential contact sync =========
+-- contact_hashes are grouped into 256 buckets by the first two hex characters
+-- of the hash. A bucket's digest is sha256 of its sorted hashes joined with
+-- newlines, so the app can compare digests and upload only the buckets whose
+-- contents changed.
+
+create or replace function public.contact_bucket_digests()
+returns table(bucket text, digest text, contact_count int)
+language sql stable security definer
+set search_path = public, extensions
+as $$
+  select
+    left(contact_hash, 2),
+    encode(digest(string_agg(contact_hash, E'\n' order by contact_hash collate "C"), 'sha256'), 'hex'),
+    count(*)::int
+  from public.contact_hashes
+  where user_id = auth.uid()
+  group by 1;
+$$;
+
+revoke all on function public.contact_bucket_digests() from public, anon;
+grant execute on function public.contact_bucket_digests() to authenticated;
+
+-- Replace the caller's contacts in p_buckets with the given rows; a bucket
+-- listed without rows is cleared. Returns the number of rows written.
+create or replace function public.replace_contact_buckets(
+  p_buckets text[],
+  p_hashes text[],
+  p_names text[]
+)
+returns int
+language plpgsql security definer
+set search_path = public
+as $$
+declare
+  v_count int;
+begin
+  if exists (
+    select 1 from unnest(p_hashes) as h(contact_hash)
+    where not (left(h.contact_hash, 2) = any(p_buckets))
+  ) then
+    raise exception 'Contact outside the listed buckets';
+  end if;
+
+  delete from public.contact_hashes c
+  where c.user_id = auth.uid()
+    and left(c.contact_hash, 2) = any(p_buckets)
+    and not (c.contact_hash = any(p_hashes));
+
+  insert into public.contact_hashes(user_id, contact_hash, display_name)
+  select auth.uid(), h.contact_hash, h.display_name
+  from unnest(p_hashes, p_names) as h(contact_hash, display_name)
+  on conflict (user_id, contact_hash)
+  do update set display_name = excluded.display_name
+  where contact_hashes.display_name is distinct from excluded.display_name;
+
+  get diagnostics v_count = row_count;
+  return v_count;
+end $$;
+
+revoke all on function public.replace_contact_buckets(text[], text[], text[]) from public, anon;
+grant execute on function public.replace_contact_buckets(text[], text[], text[]) to authenticated;
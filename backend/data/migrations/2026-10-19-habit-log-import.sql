@@ -0,0 +1,43 @@
+-- ========= Bulk habit history import =========
+-- Imported logs are written with bulk upserts (source 'import') and the habit
+-- stat columns log_habit keeps current are recomputed once per habit at the
+-- end of the import.
+
+alter table public.habit_logs drop constraint if exists habit_logs_source_check;
+alter table public.habit_logs add constraint habit_logs_source_check
+  check (source in ('manual', 'api', 'widget', 'watch', 'import'));
+
+-- Recompute streaks, completion totals and last completion for the caller's
+-- habits in p_habit_ids; returns the number of habits updated.
+create or replace function public.refresh_habit_stats(p_habit_ids uuid[])
+returns int
+language plpgsql security definer
+set search_path = public
+as $$
+declare
+  v_count int;
+begin
+  update public.habits h
+  set
+    current_streak = s.current_streak,
+    longest_streak = s.longest_streak,
+    total_completions = c.total,
+    last_completed_date = c.last_date,
+    updated_at = now()
+  from unnest(p_habit_ids) as ids(id)
+  cross join lateral public.calculate_habit_streak(ids.id) s
+  cross join lateral (
+    select
+      count(*) filter (where l.value > 0) as total,
+      max(l.log_date) filter (where l.value > 0) as last_date
+    from public.habit_logs l
+    where l.habit_id = ids.id
+  ) c
+  where h.id = ids.id and h.user_id = auth.uid();
+
+  get diagnostics v_count = row_count;
+  return v_count;
+end $$;
+
+revoke all on function public.refresh_habit_stats(uuid[]) from public, anon;
+grant execute on function public.refresh_habit_stats(uuid[]) to authenticated;
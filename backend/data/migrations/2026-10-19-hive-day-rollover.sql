@@ -0,0 +1,290 @@
+-- ========= Roll hive days over at each timezone's day boundary =========
+-- Hive streaks used to move only when a client called advance_hive_day for a
+-- single hive. roll_over_hive_days closes every finished day of every active
+-- hive, one hive per transaction, from the day after its last rollover through the owner's local
+-- yesterday, so days skipped by a missed cron run or a late deploy are still
+-- checked one by one, in order. Closing a day (close_hive_day):
+--   * recounts hive_days.complete_count for the day (refresh_hive_day)
+--   * applies the hive's rule: 'all_must_complete' needs every required
+--     member, 'threshold' needs at least `threshold` members (all when unset)
+--   * extends current_streak only when the previous scheduled day advanced
+--     too, starts a new streak of 1 after a gap, and resets current_streak
+--     when a scheduled day was missed; unscheduled weekdays leave it alone
+-- advance_hive_day applies the same rule, but first closes the finished days
+-- the rollover has not reached yet, and never resets the streak for a day
+-- that is still in progress.
+-- The owner's profile (timezone, day_start_hour) defines the hive's day, the
+-- same rule as public.user_local_date.
+
+alter table public.hives
+  add column if not exists last_rolled_over_on date;
+
+create index if not exists hives_active_rollover_idx
+  on public.hives(last_rolled_over_on) where is_active = true;
+
+-- schedule_weekmask bit 0 = Monday ... bit 6 = Sunday
+create or replace function public.hive_day_scheduled(p_hive public.hives, p_day date)
+returns boolean
+language sql immutable
+as $$
+  select p_hive.schedule_daily
+    or (p_hive.schedule_weekmask & (1 << (extract(isodow from p_day)::int - 1))) > 0
+$$;
+
+-- Whether a day's counts meet the hive's rule
+create or replace function public.hive_day_met(p_hive public.hives, p_day public.hive_days)
+returns boolean
+language sql immutable
+as $$
+  select p_day.required_count > 0 and case
+    when p_hive.rule = 'threshold' then p_day.complete_count >= coalesce(p_hive.threshold, p_day.required_count)
+    else p_day.complete_count >= p_day.required_count
+  end
+$$;
+
+-- Latest scheduled day before p_day; the streak continues only from there
+create or replace function public.previous_scheduled_day(p_hive public.hives, p_day date)
+returns date
+language sql immutable
+as $$
+  select coalesce(
+    (select max(d)::date
+     from generate_series(p_day - 7, p_day - 1, interval '1 day') d
+     where public.hive_day_scheduled(p_hive, d::date)),
+    p_day - 1
+  )
+$$;
+
+-- Evaluate one hive day and update the streak. Returns null for an
+-- unscheduled day, otherwise whether the day advanced. With p_final the day
+-- is over, so a scheduled day that did not advance resets current_streak.
+create or replace function public.close_hive_day(
+  p_hive_id uuid,
+  p_day date,
+  p_final boolean
+)
+returns boolean
+language plpgsql security definer
+set search_path = public
+as $$
+declare
+  v_hive public.hives;
+  v_day public.hive_days;
+  v_streak int;
+begin
+  select * into v_hive from public.hives where id = p_hive_id for update;
+  if not found then
+    return null;
+  end if;
+
+  v_day := public.refresh_hive_day(p_hive_id, p_day);
+  if not public.hive_day_scheduled(v_hive, p_day) then
+    return null;
+  end if;
+
+  if public.hive_day_met(v_hive, v_day) then
+    update public.hive_days hd
+    set advanced = true
+    where hd.hive_id = p_hive_id and hd.day_date = p_day;
+
+    -- Already counted for this day
+    if v_hive.last_advanced_on is null or v_hive.last_advanced_on < p_day then
+      v_streak := case
+        when v_hive.last_advanced_on = public.previous_scheduled_day(v_hive, p_day)
+          then v_hive.current_streak + 1
+        else 1
+      end;
+      update public.hives
+      set
+        current_streak = v_streak,
+        longest_streak = greatest(longest_streak, v_streak),
+        last_advanced_on = p_day,
+        updated_at = now()
+      where id = p_hive_id;
+    end if;
+    return true;
+  end if;
+
+  if p_final and (v_hive.last_advanced_on is null or v_hive.last_advanced_on < p_day) then
+    update public.hives
+    set current_streak = 0, updated_at = now()
+    where id = p_hive_id and current_streak <> 0;
+  end if;
+  return false;
+end $$;
+
+revoke all on function public.close_hive_day(uuid, date, boolean) from public, anon, authenticated;
+
+-- Close every finished day of one hive since its last rollover, up to
+-- p_through, in order (at most a year back).
+create or replace function public.roll_over_hive(
+  p_hive_id uuid,
+  p_through date,
+  out evaluated int,
+  out advanced int,
+  out broken int
+)
+language plpgsql security definer
+set search_path = public
+as $$
+declare
+  v_hive public.hives;
+  v_day date;
+  v_outcome boolean;
+begin
+  evaluated := 0;
+  advanced := 0;
+  broken := 0;
+
+  select * into v_hive from public.hives where id = p_hive_id for update;
+  if not found then
+    return;
+  end if;
+
+  for v_day in
+    select d::date
+    from generate_series(
+      greatest(
+        coalesce(v_hive.last_rolled_over_on + 1, public.user_local_date(v_hive.owner_id, v_hive.created_at)),
+        p_through - 365
+      ),
+      p_through,
+      interval '1 day'
+    ) d
+  loop
+    v_outcome := public.close_hive_day(p_hive_id, v_day, true);
+    evaluated := evaluated + 1;
+    if v_outcome then
+      advanced := advanced + 1;
+    elsif not v_outcome then
+      broken := broken + 1;
+    end if;
+  end loop;
+
+  update public.hives h
+  set last_rolled_over_on = p_through
+  where h.id = p_hive_id
+    and (h.last_rolled_over_on is null or h.last_rolled_over_on < p_through);
+end $$;
+
+revoke all on function public.roll_over_hive(uuid, date) from public, anon, authenticated;
+
+-- Roll over every active hive whose owner-local yesterday has not been
+-- closed yet, committing after each hive. A procedure rather than a function
+-- so the work is not one transaction: each hive's row lock (taken by
+-- roll_over_hive) is released as soon as that hive is done, instead of every
+-- due hive staying locked against advance_hive_day and the log triggers until
+-- the whole backlog is through. Transaction control rules out security
+-- definer and a SET clause, so names are schema-qualified and only the cron
+-- owner may call it. Totals are hive days: evaluated, advanced and broken
+-- (scheduled but missed).
+drop function if exists public.roll_over_hive_days(timestamptz);
+
+create or replace procedure public.roll_over_hive_days(
+  p_now timestamptz default now(),
+  inout evaluated int default 0,
+  inout advanced int default 0,
+  inout broken int default 0
+)
+language plpgsql
+as $$
+declare
+  v_due record;
+  v_result record;
+begin
+  evaluated := 0;
+  advanced := 0;
+  broken := 0;
+
+  -- The due list is read once up front; hives that fall due while it runs
+  -- are picked up by the next run.
+  for v_due in
+    select d.hive_id, d.yesterday
+    from (
+      select h.id as hive_id, h.last_rolled_over_on, public.user_local_date(h.owner_id, p_now) - 1 as yesterday
+      from public.hives h
+      where h.is_active = true
+    ) d
+    where d.last_rolled_over_on is null or d.last_rolled_over_on < d.yesterday
+  loop
+    v_result := public.roll_over_hive(v_due.hive_id, v_due.yesterday);
+    evaluated := evaluated + v_result.evaluated;
+    advanced := advanced + v_result.advanced;
+    broken := broken + v_result.broken;
+    commit;
+  end loop;
+end $$;
+
+revoke all on procedure public.roll_over_hive_days(timestamptz, int, int, int) from public;
+
+-- Manual advance for a member: the same rule as the rollover. Finished days
+-- the rollover has not reached are closed first, so the streak continues
+-- from them rather than seeing a gap; p_day itself is never final here.
+create or replace function public.advance_hive_day(
+  p_hive_id uuid,
+  p_day date default current_date
+)
+returns table(
+  advanced boolean,
+  complete_count int,
+  required_count int
+)
+language plpgsql security definer
+set search_path = public
+as $$
+declare
+  v_user_id uuid;
+  v_owner_id uuid;
+  v_through date;
+  v_advanced boolean;
+  v_day public.hive_days;
+begin
+  v_user_id := auth.uid();
+
+  if v_user_id is null then
+    raise exception 'Authentication required';
+  end if;
+
+  -- Check if user is member
+  if not public.hive_member_active(p_hive_id, v_user_id) then
+    raise exception 'Not a member of this hive';
+  end if;
+
+  select h.owner_id into v_owner_id from public.hives h where h.id = p_hive_id;
+
+  -- Never close the owner's current day, even if p_day runs ahead of it
+  v_through := least(p_day, public.user_local_date(v_owner_id)) - 1;
+  perform public.roll_over_hive(p_hive_id, v_through);
+
+  v_advanced := coalesce(public.close_hive_day(p_hive_id, p_day, false), false);
+
+  select * into v_day from public.hive_days hd where hd.hive_id = p_hive_id and hd.day_date = p_day;
+
+  return query
+  select v_advanced, v_day.complete_count, v_day.required_count;
+end $$;
+
+grant execute on function public.advance_hive_day(uuid, date) to authenticated;
+
+-- Hives already streaking are considered rolled over up to their last advance,
+-- so the first run does not reset streaks for days before this migration.
+update public.hives
+set last_rolled_over_on = last_advanced_on
+where last_rolled_over_on is null and last_advanced_on is not null;
+
+-- Day boundaries fall on the hour (or half/quarter hour) in every timezone;
+-- each run only touches hives whose day ended since their last rollover.
+create extension if not exists pg_cron;
+
+select cron.unschedule('hive-day-rollover-job') where exists (
+  select 1 from cron.job where jobname = 'hive-day-rollover-job'
+);
+
+select cron.schedule(
+  'hive-day-rollover-job',
+  '*/15 * * * *',
+  $$ call public.roll_over_hive_days(); $$
+);
+
+-- To run a rollover by hand:
+-- CALL public.roll_over_hive_days();  (outside an explicit transaction)
@@ -0,0 +1,97 @@
+-- ========= Keep hive_days counts current on every member-day write =========
+-- hive_days(complete_count, required_count) becomes the source for the hive
+-- heatmap and rolling averages, so the API reads one row per day from the
+-- (hive_id, day_date) primary key instead of scanning hive_member_days.
+--
+-- complete_count = active members whose value reached the hive's target_per_day
+-- required_count = active members when the day's row was first written; later
+--                  refreshes keep it, so membership changes never rewrite
+--                  past days
+--
+-- Behaviour change: a member counts as complete once their value reaches
+-- target_per_day, the test the hive detail screen and heatmap already used.
+-- The previous advance_hive_day counted hive_member_days.done (value > 0), so
+-- counter hives with target_per_day > 1 now advance only when every member
+-- reaches the target; hives with a target of 1 are unaffected. Existing
+-- current_streak, longest_streak and last_advanced_on values are deliberately
+-- kept as recorded under the old rule; nothing is recomputed retroactively.
+
+-- Recount one hive day and upsert its aggregate row; `advanced` and the
+-- required_count of an existing row are preserved.
+create or replace function public.refresh_hive_day(
+  p_hive_id uuid,
+  p_day date
+)
+returns public.hive_days
+language plpgsql security definer
+set search_path = public
+as $$
+declare
+  rec public.hive_days;
+begin
+  insert into public.hive_days(hive_id, day_date, complete_count, required_count)
+  select
+    h.id,
+    p_day,
+    count(hmd.user_id) filter (where hmd.value >= h.target_per_day),
+    count(hm.user_id)
+  from public.hives h
+  left join public.hive_members hm
+    on hm.hive_id = h.id and hm.is_active = true
+  left join public.hive_member_days hmd
+    on hmd.hive_id = h.id and hmd.user_id = hm.user_id and hmd.day_date = p_day
+  where h.id = p_hive_id
+  group by h.id
+  on conflict (hive_id, day_date)
+  do update set complete_count = excluded.complete_count
+  returning * into rec;
+
+  return rec;
+end $$;
+
+revoke all on function public.refresh_hive_day(uuid, date) from public;
+
+-- Member-day writes (log_hive_today, create_hive_from_habit backfill, imports)
+-- refresh the aggregate for the touched day. An update that moves a row to
+-- another hive or day refreshes the day it left as well, so the trigger also
+-- fires on key-only updates.
+create or replace function public.hive_member_days_refresh_hive_day()
+returns trigger
+language plpgsql security definer
+set search_path = public
+as $$
+begin
+  if tg_op = 'DELETE' then
+    perform public.refresh_hive_day(old.hive_id, old.day_date);
+    return old;
+  end if;
+
+  perform public.refresh_hive_day(new.hive_id, new.day_date);
+  if tg_op = 'UPDATE' and (old.hive_id, old.day_date) is distinct from (new.hive_id, new.day_date) then
+    perform public.refresh_hive_day(old.hive_id, old.day_date);
+  end if;
+  return new;
+end $$;
+
+drop trigger if exists hive_member_days_refresh_hive_day on public.hive_member_days;
+create trigger hive_member_days_refresh_hive_day
+  after insert or update of value, day_date, hive_id, user_id or delete on public.hive_member_days
+  for each row execute function public.hive_member_days_refresh_hive_day();
+
+-- advance_hive_day reads the refreshed aggregate through close_hive_day
+-- (2026-10-19-hive-day-rollover.sql), which shares its rule with the rollover.
+
+-- Backfill aggregates for days that only exist as member rows.
+insert into public.hive_days(hive_id, day_date, complete_count, required_count)
+select
+  hmd.hive_id,
+  hmd.day_date,
+  count(*) filter (where hm.user_id is not null and hmd.value >= h.target_per_day),
+  (select count(*) from public.hive_members m where m.hive_id = hmd.hive_id and m.is_active = true)
+from public.hive_member_days hmd
+join public.hives h on h.id = hmd.hive_id
+left join public.hive_members hm
+  on hm.hive_id = hmd.hive_id and hm.user_id = hmd.user_id and hm.is_active = true
+group by hmd.hive_id, hmd.day_date
+on conflict (hive_id, day_date)
+do update set complete_count = excluded.complete_count;
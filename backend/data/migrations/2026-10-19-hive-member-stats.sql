@@ -0,0 +1,235 @@
+-- ========= Persisted hive leaderboard stats =========
+-- One row per (hive, member), maintained on every hive_member_days write:
+--   completed_total  all-time days the member reached the hive's target
+--   recent_mask      bitmap of completed days ending at recent_anchor
+--                    (bit n = recent_anchor - n days, 63 days deep)
+-- Leaderboards for today / 7d / 30d / all time are computed from these rows
+-- (popcount of the mask), so reads cost one row per membership.
+--
+-- Rows are read by the (hive_id, user_id) primary key and ranked in the API:
+-- a rank sums a user's counts across all of their hives and most windows are
+-- popcounts of recent_mask, neither of which an index on completed_total can
+-- order. Rosters are capped at hives.max_members, so no ranking index is kept.
+--
+-- Days are the member's local day (user_local_date), the same day the
+-- leaderboard counts "today" from; log_hive_today used the server's
+-- current_date.
+
+create table if not exists public.hive_member_stats (
+  hive_id uuid not null references public.hives(id) on delete cascade,
+  user_id uuid not null references auth.users(id) on delete cascade,
+  completed_total int not null default 0,
+  recent_mask bigint not null default 0,
+  recent_anchor date,
+  last_completed_on date,
+  updated_at timestamptz not null default now(),
+  primary key (hive_id, user_id)
+);
+
+alter table public.hive_member_stats enable row level security;
+
+do $$ begin
+  drop policy if exists "members read hive stats" on public.hive_member_stats;
+exception when others then null;
+end $$;
+
+create policy "members read hive stats" on public.hive_member_stats
+  for select using (public.hive_member_active(hive_id, auth.uid()));
+
+-- Fold one member-day change into the member's stats row.
+create or replace function public.apply_hive_member_day(
+  p_hive_id uuid,
+  p_user_id uuid,
+  p_day date,
+  p_was_done boolean,
+  p_is_done boolean
+)
+returns void
+language plpgsql security definer
+set search_path = public
+as $$
+declare
+  v_stats public.hive_member_stats;
+  v_anchor date;
+  v_mask bigint;
+  v_shift int;
+  v_offset int;
+begin
+  insert into public.hive_member_stats(hive_id, user_id)
+  values (p_hive_id, p_user_id)
+  on conflict (hive_id, user_id) do nothing;
+
+  select * into v_stats
+  from public.hive_member_stats
+  where hive_id = p_hive_id and user_id = p_user_id
+  for update;
+
+  v_anchor := coalesce(v_stats.recent_anchor, p_day);
+  v_mask := v_stats.recent_mask;
+
+  if p_day > v_anchor then
+    v_shift := p_day - v_anchor;
+    v_mask := case
+      when v_shift >= 63 then 0
+      else (v_mask << v_shift) & 9223372036854775807
+    end;
+    v_anchor := p_day;
+  end if;
+
+  v_offset := v_anchor - p_day;
+  if v_offset < 63 then
+    if p_is_done then
+      v_mask := v_mask | (1::bigint << v_offset);
+    else
+      v_mask := v_mask & ~(1::bigint << v_offset);
+    end if;
+  end if;
+
+  update public.hive_member_stats
+  set
+    completed_total = completed_total + p_is_done::int - p_was_done::int,
+    recent_mask = v_mask,
+    recent_anchor = v_anchor,
+    last_completed_on = case
+      when p_is_done then greatest(last_completed_on, p_day)
+      else last_completed_on
+    end,
+    updated_at = now()
+  where hive_id = p_hive_id and user_id = p_user_id;
+end $$;
+
+revoke all on function public.apply_hive_member_day(uuid, uuid, date, boolean, boolean) from public;
+
+create or replace function public.hive_member_days_apply_stats()
+returns trigger
+language plpgsql security definer
+set search_path = public
+as $$
+declare
+  v_target int;
+  v_row public.hive_member_days;
+  v_was_done boolean := false;
+  v_is_done boolean := false;
+begin
+  if tg_op = 'DELETE' then
+    v_row := old;
+  else
+    v_row := new;
+  end if;
+
+  select target_per_day into v_target from public.hives where id = v_row.hive_id;
+  v_target := coalesce(v_target, 1);
+
+  if tg_op <> 'INSERT' then
+    v_was_done := coalesce(old.value, 0) >= v_target;
+  end if;
+  if tg_op <> 'DELETE' then
+    v_is_done := coalesce(new.value, 0) >= v_target;
+  end if;
+
+  perform public.apply_hive_member_day(
+    v_row.hive_id, v_row.user_id, v_row.day_date, v_was_done, v_is_done
+  );
+  return v_row;
+end $$;
+
+drop trigger if exists hive_member_days_apply_stats on public.hive_member_days;
+create trigger hive_member_days_apply_stats
+  after insert or update of value or delete on public.hive_member_days
+  for each row execute function public.hive_member_days_apply_stats();
+
+-- Log the caller's hive day on their local day, not the server's.
+create or replace function public.log_hive_today(
+  p_hive_id uuid,
+  p_value numeric
+)
+returns table(
+  hive_id uuid,
+  user_id uuid,
+  day_date date,
+  value numeric,
+  done boolean
+)
+language plpgsql security definer
+set search_path = public
+as $$
+declare
+  v_user_id uuid;
+  v_today date;
+begin
+  v_user_id := auth.uid();
+
+  if v_user_id is null then
+    raise exception 'Authentication required';
+  end if;
+
+  -- Check if user is member
+  if not public.hive_member_active(p_hive_id, v_user_id) then
+    raise exception 'Not a member of this hive';
+  end if;
+
+  v_today := public.user_local_date(v_user_id);
+
+  -- Insert or update day record (done is generated from value)
+  insert into public.hive_member_days(hive_id, user_id, day_date, value, created_at)
+  values (p_hive_id, v_user_id, v_today, p_value, now())
+  on conflict on constraint hive_member_days_pkey
+  do update set value = excluded.value;
+
+  -- Return the record
+  return query
+  select hmd.hive_id, hmd.user_id, hmd.day_date, hmd.value::numeric, hmd.done
+  from public.hive_member_days hmd
+  where hmd.hive_id = p_hive_id
+    and hmd.user_id = v_user_id
+    and hmd.day_date = v_today;
+end $$;
+
+grant execute on function public.log_hive_today(uuid, numeric) to authenticated;
+
+-- Recompute stats from hive_member_days (all hives when p_hive_id is null);
+-- use after bulk loads or a target_per_day change.
+create or replace function public.rebuild_hive_member_stats(p_hive_id uuid default null)
+returns int
+language plpgsql security definer
+set search_path = public
+as $$
+declare
+  v_count int;
+begin
+  insert into public.hive_member_stats(
+    hive_id, user_id, completed_total, recent_mask, recent_anchor, last_completed_on
+  )
+  select
+    d.hive_id,
+    d.user_id,
+    count(*) filter (where d.value >= h.target_per_day),
+    coalesce(sum(1::bigint << (a.anchor - d.day_date))
+      filter (where d.value >= h.target_per_day and a.anchor - d.day_date < 63), 0),
+    a.anchor,
+    max(d.day_date) filter (where d.value >= h.target_per_day)
+  from public.hive_member_days d
+  join public.hives h on h.id = d.hive_id
+  join (
+    select hive_id, user_id, max(day_date) as anchor
+    from public.hive_member_days
+    where p_hive_id is null or hive_id = p_hive_id
+    group by hive_id, user_id
+  ) a on a.hive_id = d.hive_id and a.user_id = d.user_id
+  where p_hive_id is null or d.hive_id = p_hive_id
+  group by d.hive_id, d.user_id, a.anchor
+  on conflict (hive_id, user_id)
+  do update set
+    completed_total = excluded.completed_total,
+    recent_mask = excluded.recent_mask,
+    recent_anchor = excluded.recent_anchor,
+    last_completed_on = excluded.last_completed_on,
+    updated_at = now();
+
+  get diagnostics v_count = row_count;
+  return v_count;
+end $$;
+
+revoke all on function public.rebuild_hive_member_stats(uuid) from public;
+
+select public.rebuild_hive_member_stats();
@@ -0,0 +1,81 @@
+-- ========= Hashed phone index for contact matching =========
+-- One row per profile with a phone, keyed by the same sha256(pepper || e164)
+-- hash the app uploads into contact_hashes. The pepper stays in the API
+-- (CONTACT_HASH_PEPPER): it computes the hash and writes the row through
+-- set_profile_phone_hash whenever a profile's phone changes, so matching a
+-- contact batch is a primary key join instead of a profiles scan.
+
+create extension if not exists pgcrypto;
+
+create table if not exists public.profile_phone_hashes (
+  phone_hash text primary key,
+  user_id uuid not null unique references auth.users(id) on delete cascade,
+  updated_at timestamptz not null default now()
+);
+
+-- No policies: only the service role and security definer functions read it
+alter table public.profile_phone_hashes enable row level security;
+
+-- Replace a user's hash (null removes it). A hash still held by another user
+-- belongs to a phone that has since moved, so it is reassigned.
+create or replace function public.set_profile_phone_hash(p_user_id uuid, p_phone_hash text)
+returns void
+language plpgsql security definer
+set search_path = public
+as $$
+begin
+  delete from public.profile_phone_hashes
+  where user_id = p_user_id and phone_hash is distinct from p_phone_hash;
+
+  if p_phone_hash is not null then
+    insert into public.profile_phone_hashes(phone_hash, user_id)
+    values (p_phone_hash, p_user_id)
+    on conflict (phone_hash)
+    do update set user_id = excluded.user_id, updated_at = now();
+  end if;
+end $$;
+
+revoke all on function public.set_profile_phone_hash(uuid, text) from public, anon, authenticated;
+
+-- Contacts in p_hashes that belong to other registered users; one indexed
+-- join over the batch.
+create or replace function public.match_contact_hashes(p_hashes text[])
+returns table(phone_hash text, user_id uuid)
+language sql stable security definer
+set search_path = public
+as $$
+  select h.phone_hash, h.user_id
+  from unnest(p_hashes) as c(phone_hash)
+  join public.profile_phone_hashes h on h.phone_hash = c.phone_hash
+  where h.user_id <> auth.uid();
+$$;
+
+revoke all on function public.match_contact_hashes(text[]) from public, anon;
+grant execute on function public.match_contact_hashes(text[]) to authenticated;
+
+-- Rebuild the index from profiles.phone; the pepper is passed in by the
+-- backfill and never stored. The API runs it at startup while the index is
+-- empty (contact_match.backfill_phone_hashes), which covers profiles created
+-- before this migration. After rotating CONTACT_HASH_PEPPER run it by hand:
+--   select public.rebuild_profile_phone_hashes('<new pepper>');
+create or replace function public.rebuild_profile_phone_hashes(p_pepper text)
+returns int
+language plpgsql security definer
+set search_path = public, extensions
+as $$
+declare
+  v_count int;
+begin
+  delete from public.profile_phone_hashes;
+
+  insert into public.profile_phone_hashes(phone_hash, user_id)
+  select encode(digest(p_pepper || btrim(p.phone), 'sha256'), 'hex'), p.id
+  from public.profiles p
+  where nullif(btrim(p.phone), '') is not null
+  on conflict (phone_hash) do nothing;
+
+  get diagnostics v_count = row_count;
+  return v_count;
+end $$;
+
+revoke all on function public.rebuild_profile_phone_hashes(text) from public, anon, authenticated;
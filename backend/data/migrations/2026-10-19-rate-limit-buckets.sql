@@ -0,0 +1,69 @@
+-- ========= Shared rate limit buckets =========
+-- Token buckets for RATE_LIMIT_BACKEND=shared, so every API worker draws from
+-- the same per-user budget. The table is unlogged: losing it in a crash only
+-- refills every bucket.
+
+create unlogged table if not exists public.rate_limit_buckets (
+  key text primary key,
+  tokens double precision not null,
+  updated_at timestamptz not null default clock_timestamp()
+);
+
+-- No policies: only the service role and security definer functions use it
+alter table public.rate_limit_buckets enable row level security;
+
+-- Refill p_key's bucket for the time since its last use, then take p_cost
+-- tokens. Returns 0 when taken, otherwise the seconds until enough tokens will
+-- have refilled (nothing is taken). The upsert locks the row, so concurrent
+-- requests for one key are serialised.
+create or replace function public.take_rate_limit_tokens(
+  p_key text,
+  p_cost double precision,
+  p_rate double precision,
+  p_burst double precision
+)
+returns double precision
+language plpgsql security definer
+set search_path = public
+as $$
+declare
+  v_tokens double precision;
+begin
+  insert into public.rate_limit_buckets as b (key, tokens, updated_at)
+  values (p_key, p_burst, clock_timestamp())
+  on conflict (key) do update set
+    tokens = least(
+      p_burst,
+      b.tokens + extract(epoch from clock_timestamp() - b.updated_at) * p_rate
+    ),
+    updated_at = clock_timestamp()
+  returning tokens into v_tokens;
+
+  if v_tokens < p_cost then
+    return (p_cost - v_tokens) / p_rate;
+  end if;
+
+  update public.rate_limit_buckets set tokens = v_tokens - p_cost where key = p_key;
+  return 0;
+end $$;
+
+revoke all on function public.take_rate_limit_tokens(text, double precision, double precision, double precision)
+  from public, anon, authenticated;
+
+-- Buckets idle for p_idle are full again and can be dropped; schedule with
+-- pg_cron, e.g. select cron.schedule('prune-rate-limits', '*/15 * * * *',
+-- 'select public.prune_rate_limit_buckets()');
+create or replace function public.prune_rate_limit_buckets(p_idle interval default interval '1 hour')
+returns int
+language plpgsql security definer
+set search_path = public
+as $$
+declare
+  v_count int;
+begin
+  delete from public.rate_limit_buckets where updated_at < clock_timestamp() - p_idle;
+  get diagnostics v_count = row_count;
+  return v_count;
+end $$;
+
+revoke all on function public.prune_rate_limit_buckets(interval) from public, anon, authenticated;
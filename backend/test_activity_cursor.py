@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Checks for the activity feed cursors (encode_cursor / decode_cursor in
+app/repositories/base.py, GET /api/activity/feed).
+Run: cd backend && python -m pytest test_activity_cursor.py
+"""
+
+import base64
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.auth import create_test_token
+from app.core.config import settings
+from app.repositories import decode_cursor, encode_cursor
+
+AT = datetime(2026, 10, 19, 12, 30, tzinfo=timezone.utc)
+
+
+def _raw(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+def test_round_trip():
+    row_id = str(uuid.uuid4())
+    assert decode_cursor(encode_cursor({"created_at": AT.isoformat(), "id": row_id})) == (AT, row_id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    _raw("no separator"),
+    _raw("yesterday|" + str(uuid.uuid4())),
+    # An id that would reshape a PostgREST or_() filter
+    _raw(f"{AT.isoformat()}|x),id.neq.0,and(id.gt.0"),
+    _raw(f"{AT.isoformat()}|42"),
+])
+def test_tampered_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_feed_answers_400_for_a_tampered_cursor(monkeypatch):
+    monkeypatch.setattr(settings, "TEST_MODE", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", False)
+    from app.main import app
+    headers = {"Authorization": f"Bearer {create_test_token(str(uuid.uuid4()), '+15550001111')}"}
+    cursor = _raw(f"{AT.isoformat()}|x),id.neq.0")
+    response = TestClient(app).get(f"/api/activity/feed?cursor={cursor}", headers=headers)
+    assert response.status_code == 400
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Checks for the adaptive concurrency limit (app/core/admission.py).
+Run: cd backend && python -m pytest test_admission.py
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.admission import AdaptiveLimiter, AdmissionMiddleware, Priority, route_priority
+from app.core.config import settings
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _limiter(limit: float = 10, clock: Clock = None) -> AdaptiveLimiter:
+    return AdaptiveLimiter(
+        initial_limit=limit, min_limit=2, max_limit=20,
+        target_latency=0.1, backoff=0.5, clock=clock or Clock(),
+    )
+
+
+def test_fast_answers_grow_the_limit_additively():
+    limiter = _limiter()
+    for _ in range(6):
+        assert limiter.try_acquire(Priority.NORMAL)
+    # In use (6 in flight >= limit / 2): each fast answer adds 1 / limit
+    limiter.release(0.01)
+    assert limiter.limit == pytest.approx(10.1)
+    for _ in range(5):
+        limiter.release(0.01)
+    # Releases with under half the limit in flight leave it alone
+    assert limiter.limit == pytest.approx(10.1)
+    assert limiter.in_flight == 0
+
+
+def test_idle_limit_does_not_grow():
+    limiter = _limiter()
+    for _ in range(50):
+        limiter.try_acquire(Priority.NORMAL)
+        limiter.release(0.01)
+    assert limiter.limit == 10
+
+
+def test_limit_stops_at_max():
+    limiter = _limiter(limit=19.9)
+    for _ in range(15):
+        limiter.try_acquire(Priority.HIGH)
+    for _ in range(15):
+        limiter.release(0.01)
+    assert limiter.limit == 20
+
+
+def test_slow_answers_shrink_the_limit_once_per_target_latency():
+    clock = Clock()
+    limiter = _limiter(clock=clock)
+    for _ in range(4):
+        limiter.try_acquire(Priority.NORMAL)
+
+    limiter.release(0.5)
+    assert limiter.limit == 5
+    # A burst of slow answers within one target latency counts once
+    limiter.release(0.5)
+    assert limiter.limit == 5
+
+    clock.now += 0.1
+    limiter.release(0.5)
+    assert limiter.limit == 2.5
+    clock.now += 0.1
+    limiter.release(0.5)
+    assert limiter.limit == 2
+
+
+def test_low_priority_is_shed_before_high():
+    limiter = _limiter()
+    admitted = {priority: 0 for priority in Priority}
+    for priority in (Priority.LOW, Priority.NORMAL, Priority.HIGH):
+        while limiter.try_acquire(priority):
+            admitted[priority] += 1
+    # LOW fills half the limit, NORMAL up to 90%, HIGH the rest
+    assert admitted == {Priority.LOW: 5, Priority.NORMAL: 4, Priority.HIGH: 1}
+    assert limiter.in_flight == 10
+
+    # At 5 in flight LOW is refused while HIGH still gets in
+    limiter = _limiter()
+    for _ in range(5):
+        limiter.try_acquire(Priority.NORMAL)
+    assert not limiter.try_acquire(Priority.LOW)
+    assert limiter.try_acquire(Priority.HIGH)
+    assert limiter.shed == 1
+
+
+def test_route_priorities():
+    assert route_priority("POST", "/api/habits/abc/log") == Priority.HIGH
+    assert route_priority("POST", "/api/hives/abc/log") == Priority.HIGH
+    assert route_priority("GET", "/api/habits/insights/dashboard") == Priority.LOW
+    assert route_priority("GET", "/api/hives/leaderboard") == Priority.LOW
+    assert route_priority("GET", "/api/habits/") == Priority.NORMAL
+
+
+def test_middleware_answers_503_for_shed_requests(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+    limiter = _limiter(limit=2)
+    app = FastAPI()
+
+    @app.get("/api/habits/insights/dashboard")
+    async def insights():
+        return {}
+
+    @app.post("/api/habits/{habit_id}/log")
+    async def log(habit_id: str):
+        return {}
+
+    @app.get("/health")
+    async def health():
+        return {}
+
+    app.add_middleware(AdmissionMiddleware, limiter=limiter)
+    client = TestClient(app)
+
+    # One slot is held, so LOW (share 1 of 2) is full but HIGH fits
+    limiter.in_flight = 1
+    response = client.get("/api/habits/insights/dashboard")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert client.post("/api/habits/abc/log").status_code == 200
+    assert client.get("/health").status_code == 200
+    assert limiter.in_flight == 1
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Checks for contact matching (app/core/contact_match.py, POST /api/contacts/match).
+Run: cd backend && python -m pytest test_contact_match.py
+
+With DATABASE_URL set (a Supabase database with the migrations applied),
+match_contact_hashes is also checked to leave out the caller's own phone.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import contact_match
+from app.core.auth import create_test_token
+from app.core.config import settings
+from app.core.contact_match import BloomFilter, PhoneHashFilter, phone_hash
+from app.routers import contacts
+
+
+def _digest(n: int) -> str:
+    return hashlib.sha256(f"+1555{n:07d}".encode()).hexdigest()
+
+
+def test_bloom_has_no_false_negatives():
+    members = [_digest(n) for n in range(20000)]
+    bloom = BloomFilter(len(members), 0.01)
+    for digest in members:
+        bloom.add(digest)
+    assert all(digest in bloom for digest in members)
+
+    outsiders = [_digest(n) for n in range(20000, 40000)]
+    false_positives = sum(digest in bloom for digest in outsiders)
+    assert false_positives < len(outsiders) * 0.02
+
+
+def test_phone_hash_matches_app_hashing(monkeypatch):
+    monkeypatch.setattr(settings, "CONTACT_HASH_PEPPER", "pepper")
+    assert phone_hash(" +15550001111 ") == hashlib.sha256(b"pepper+15550001111").hexdigest()
+    assert phone_hash("") is None
+    assert phone_hash(None) is None
+
+
+def test_filter_loads_off_the_event_loop(monkeypatch):
+    loaded_on = []
+    indexed = [_digest(n) for n in range(100)]
+
+    def load():
+        loaded_on.append(threading.current_thread())
+        return indexed
+
+    monkeypatch.setattr(contact_match, "load_phone_hashes", load)
+    phone_filter = PhoneHashFilter(refresh_seconds=300, error_rate=0.01)
+
+    async def match():
+        candidates = await phone_filter.candidates(indexed[:10] + [_digest(500)])
+        return candidates, threading.current_thread()
+
+    candidates, loop_thread = asyncio.run(match())
+    assert set(indexed[:10]) <= set(candidates)
+    assert loaded_on and loaded_on[0] is not loop_thread
+
+
+def test_hashes_added_during_a_rebuild_are_kept(monkeypatch):
+    phone_filter = PhoneHashFilter(refresh_seconds=300, error_rate=0.01)
+    late = _digest(7)
+
+    def load():
+        # Registered after the table was read
+        phone_filter.add(late)
+        return [_digest(1)]
+
+    monkeypatch.setattr(contact_match, "load_phone_hashes", load)
+    assert asyncio.run(phone_filter.candidates([late, _digest(1)])) == [late, _digest(1)]
+
+
+class _Admin:
+    """Records set_profile_phone_hash calls and the thread they ran on."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    def rpc(self, name, params):
+        admin = self
+
+        class Query:
+            def execute(self):
+                admin.calls.append((name, params, threading.current_thread()))
+                if admin.fail:
+                    raise RuntimeError("PostgREST unavailable")
+
+        return Query()
+
+
+def test_sync_phone_hash_runs_off_the_event_loop(monkeypatch):
+    admin = _Admin()
+    monkeypatch.setattr(contact_match, "get_supabase_admin", lambda: admin)
+    monkeypatch.setattr(contact_match, "phone_hash_filter", PhoneHashFilter(refresh_seconds=300, error_rate=0.01))
+
+    async def sync():
+        return await contact_match.sync_phone_hash("u1", "+15550001111"), threading.current_thread()
+
+    synced, loop_thread = asyncio.run(sync())
+    [(name, params, thread)] = admin.calls
+    assert synced and name == "set_profile_phone_hash"
+    assert params == {"p_user_id": "u1", "p_phone_hash": phone_hash("+15550001111")}
+    assert thread is not loop_thread
+
+
+def test_sync_phone_hash_failure_is_logged(monkeypatch, caplog):
+    monkeypatch.setattr(contact_match, "get_supabase_admin", lambda: _Admin(fail=True))
+    assert asyncio.run(contact_match.sync_phone_hash("u1", "+15550001111")) is False
+    assert "u1" in caplog.text
+
+
+@pytest.fixture
+def match_client(monkeypatch):
+    monkeypatch.setattr(settings, "TEST_MODE", True)
+    app = FastAPI()
+    app.include_router(contacts.router, prefix="/api/contacts")
+    return TestClient(app)
+
+
+def test_match_excludes_the_caller(match_client, monkeypatch):
+    caller, friend = str(uuid.uuid4()), str(uuid.uuid4())
+    caller_hash, friend_hash = _digest(1), _digest(2)
+
+    async def candidates(digests):
+        return list(digests)
+
+    class FakeClient:
+        def rpc(self, name, params):
+            assert name == "match_contact_hashes"
+            rows = [
+                {"phone_hash": caller_hash, "user_id": caller},
+                {"phone_hash": friend_hash, "user_id": friend},
+            ]
+            data = [row for row in rows if row["phone_hash"] in params["p_hashes"]]
+            return type("Query", (), {"execute": lambda self: type("Response", (), {"data": data})()})()
+
+    monkeypatch.setattr(contacts.phone_hash_filter, "candidates", candidates)
+    monkeypatch.setattr(contacts, "get_user_supabase_client", lambda user: FakeClient())
+
+    response = match_client.post(
+        "/api/contacts/match",
+        json={"hashes": [caller_hash, friend_hash.upper(), "not-a-hash"]},
+        headers={"Authorization": f"Bearer {create_test_token(caller, '+15550001111')}"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "matches": [{"contact_hash": friend_hash, "user_id": friend}],
+        "checked": 2,
+    }
+
+
+async def _sql_match(dsn: str):
+    import asyncpg
+
+    conn = await asyncpg.connect(dsn)
+    tx = conn.transaction()
+    await tx.start()
+    try:
+        caller, friend = await conn.fetch("select id from auth.users limit 2")
+        caller_hash, friend_hash = _digest(9000001), _digest(9000002)
+        for user_id, digest in ((caller["id"], caller_hash), (friend["id"], friend_hash)):
+            await conn.execute("select public.set_profile_phone_hash($1, $2)", user_id, digest)
+        await conn.execute("select set_config('request.jwt.claim.sub', $1, true)", str(caller["id"]))
+        rows = await conn.fetch(
+            "select * from public.match_contact_hashes($1::text[])", [caller_hash, friend_hash]
+        )
+        return [(row["phone_hash"], row["user_id"]) for row in rows], friend["id"], friend_hash
+    finally:
+        await tx.rollback()
+        await conn.close()
+
+
+@pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL not set")
+def test_sql_match_excludes_the_caller():
+    rows, friend, friend_hash = asyncio.run(_sql_match(os.environ["DATABASE_URL"]))
+    assert rows == [(friend_hash, friend)]
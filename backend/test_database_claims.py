@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Checks that the direct Postgres backend only trusts verified tokens
+(app/core/database.py request_claims, PostgresRepo).
+Run: cd backend && python -m pytest test_database_claims.py
+"""
+
+import time
+import uuid
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.database import request_claims
+from app.repositories.postgres import PostgresHabitsRepo
+
+SECRET = "test-supabase-jwt-secret-0123456789abcdef"
+
+
+@pytest.fixture(autouse=True)
+def supabase_secret(monkeypatch):
+    monkeypatch.setattr(settings, "TEST_MODE", False)
+    monkeypatch.setattr(settings, "SUPABASE_JWT_SECRET", SECRET)
+
+
+def _token(sub: str, key: str = SECRET, algorithm: str = "HS256", **claims) -> str:
+    payload = {"sub": sub, "aud": "authenticated", "role": "authenticated", "exp": int(time.time()) + 3600}
+    payload.update(claims)
+    return jwt.encode(payload, key, algorithm=algorithm)
+
+
+def _user(token: str, user_id: str) -> dict:
+    return {"id": user_id, "role": "authenticated", "access_token": token}
+
+
+def test_signed_token_gives_authenticated_claims():
+    user_id = str(uuid.uuid4())
+    claims = request_claims(_user(_token(user_id, phone="+15550001111"), user_id))
+    assert claims["sub"] == user_id
+    assert claims["role"] == "authenticated"
+    assert claims["phone"] == "+15550001111"
+
+
+def test_role_claim_cannot_escalate():
+    user_id = str(uuid.uuid4())
+    for role in ("service_role", "postgres"):
+        claims = request_claims(_user(_token(user_id, role=role), user_id))
+        assert claims["role"] == "authenticated"
+
+
+def test_forged_signature_is_rejected():
+    user_id = str(uuid.uuid4())
+    with pytest.raises(jwt.InvalidTokenError):
+        request_claims(_user(_token(user_id, key="not-the-project-secret-0123456789abcdef", role="service_role"), user_id))
+
+
+def test_unsigned_token_is_rejected():
+    user_id = str(uuid.uuid4())
+    unsigned = jwt.encode(
+        {"sub": user_id, "aud": "authenticated", "exp": int(time.time()) + 3600},
+        key=None,
+        algorithm="none",
+    )
+    with pytest.raises(jwt.InvalidTokenError):
+        request_claims(_user(unsigned, user_id))
+
+
+def test_wrong_audience_is_rejected():
+    user_id = str(uuid.uuid4())
+    with pytest.raises(jwt.InvalidTokenError):
+        request_claims(_user(_token(user_id, aud="anon"), user_id))
+
+
+def test_token_for_another_user_is_rejected():
+    with pytest.raises(jwt.InvalidTokenError):
+        request_claims(_user(_token(str(uuid.uuid4())), str(uuid.uuid4())))
+
+
+def test_repo_answers_401_for_forged_token():
+    user_id = str(uuid.uuid4())
+    with pytest.raises(HTTPException) as error:
+        PostgresHabitsRepo(_user(_token(user_id, key="forged-secret-0123456789abcdef-0123456789"), user_id))
+    assert error.value.status_code == 401
+
+    repo = PostgresHabitsRepo(_user(_token(user_id), user_id))
+    assert repo.claims["sub"] == user_id
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Checks for GET /api/habits/{id}/logs: the unpaged range cap and JSON
+passthrough, and keyset pages.
+Run: cd backend && python -m pytest test_habit_logs.py
+"""
+
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.auth import create_test_token
+from app.core.config import settings
+from app.repositories.base import HABIT_LOG_COLUMNS
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "TEST_MODE", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", False)
+    from app.main import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def habit(client):
+    headers = {"Authorization": f"Bearer {create_test_token(str(uuid.uuid4()), '+15550001111')}"}
+    habit = client.post("/api/habits/", headers=headers, json={"name": "Read", "type": "checkbox"}).json()
+    today = date.today()
+    for offset in range(5):
+        day = (today - timedelta(days=offset)).isoformat()
+        response = client.post(f"/api/habits/{habit['id']}/log", headers=headers, json={"log_date": day, "value": 1})
+        assert response.status_code < 300, response.text
+    return habit["id"], headers, today
+
+
+def test_unpaged_range_is_returned_oldest_first(client, habit):
+    habit_id, headers, today = habit
+    start = (today - timedelta(days=365)).isoformat()
+    response = client.get(f"/api/habits/{habit_id}/logs?start_date={start}", headers=headers)
+    assert response.status_code == 200
+    days = [log["log_date"] for log in response.json()]
+    assert days == sorted(days) and len(days) == 5
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "?end_date=2026-01-01",
+    "?start_date=2020-01-01",
+    "?start_date=2020-01-01&end_date=2026-01-01",
+])
+def test_unpaged_listing_needs_a_bounded_range(client, habit, query):
+    habit_id, headers, _ = habit
+    response = client.get(f"/api/habits/{habit_id}/logs{query}", headers=headers)
+    assert response.status_code == 400
+
+
+def test_pages_follow_the_cursor(client, habit):
+    habit_id, headers, today = habit
+    first = client.get(f"/api/habits/{habit_id}/logs?limit=3&start_date=2020-01-01", headers=headers)
+    assert [log["log_date"] for log in first.json()] == [(today - timedelta(days=n)).isoformat() for n in range(3)]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get(f"/api/habits/{habit_id}/logs?limit=3&before={cursor}", headers=headers)
+    assert [log["log_date"] for log in second.json()] == [(today - timedelta(days=n)).isoformat() for n in (3, 4)]
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_unpaged_json_matches_the_paged_rows(client, habit):
+    habit_id, headers, today = habit
+    start = (today - timedelta(days=10)).isoformat()
+    unpaged = client.get(f"/api/habits/{habit_id}/logs?start_date={start}", headers=headers)
+    paged = client.get(f"/api/habits/{habit_id}/logs?start_date={start}&limit=10", headers=headers)
+    assert unpaged.headers["content-type"] == "application/json"
+    assert set(unpaged.json()[0]) == set(HABIT_LOG_COLUMNS)
+    assert sorted(unpaged.json(), key=lambda log: log["log_date"], reverse=True) == paged.json()
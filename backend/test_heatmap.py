@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Checks for the compact heatmap encodings (app/core/heatmap.py) and the
+compact year overview (GET /api/activity/year-overview?format=compact).
+Run: cd backend && python -m pytest test_heatmap.py
+"""
+
+import base64
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.auth import create_test_token
+from app.core.config import settings
+from app.core.heatmap import DenseSeries
+
+START = date(2026, 1, 1)
+
+
+def _decode(encoded: dict, days: int) -> list:
+    """Client-side decoding of a CompactSeries."""
+    data = base64.b64decode(encoded["data"])
+    if encoded["encoding"] == "bits":
+        return [(data[i >> 3] >> (i & 7)) & 1 for i in range(days)]
+    if encoded["encoding"] == "u8":
+        return list(data)
+    return [int.from_bytes(data[i:i + 2], "little") for i in range(0, len(data), 2)]
+
+
+def _series(values: list) -> DenseSeries:
+    series = DenseSeries(START, len(values))
+    for offset, value in enumerate(values):
+        series.set(START + timedelta(days=offset), value)
+    return series
+
+
+@pytest.mark.parametrize("days", [1, 7, 8, 9, 365, 366])
+def test_bits_round_trip(days):
+    values = [(i * 7 + 3) % 5 == 0 for i in range(days)]
+    encoded = _series([int(v) for v in values]).encode(bits=True)
+    assert encoded["encoding"] == "bits"
+    assert len(base64.b64decode(encoded["data"])) == (days + 7) // 8
+    assert _decode(encoded, days) == [int(v) for v in values]
+
+
+def test_bits_fall_back_to_u8_for_counts():
+    encoded = _series([0, 1, 2]).encode(bits=True)
+    assert encoded["encoding"] == "u8"
+    assert _decode(encoded, 3) == [0, 1, 2]
+
+
+def test_u8_round_trip():
+    values = [i % 256 for i in range(366)]
+    encoded = _series(values).encode()
+    assert encoded["encoding"] == "u8"
+    assert _decode(encoded, len(values)) == values
+
+
+def test_u16_round_trip_and_cap():
+    values = [0, 255, 256, 1000, 65535, 65536, 1 << 20]
+    series = _series(values)
+    encoded = series.encode()
+    assert encoded["encoding"] == "u16"
+    assert _decode(encoded, len(values)) == [0, 255, 256, 1000, 65535, 65535, 65535]
+    assert series.max() == 1 << 20
+
+
+def test_add_accumulates_and_ignores_days_outside():
+    series = DenseSeries(START, 3)
+    series.add(START, 2)
+    series.add(START, 3)
+    series.add(START - timedelta(days=1), 9)
+    series.add(START + timedelta(days=3), 9)
+    assert list(series.values) == [5, 0, 0]
+
+
+def test_compact_year_overview_omits_the_maps(monkeypatch):
+    monkeypatch.setattr(settings, "TEST_MODE", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", False)
+    from app.main import app
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_test_token(str(uuid.uuid4()), '+15550001111')}"}
+    client.post("/api/habits/", headers=headers, json={"name": "Read", "type": "checkbox"})
+
+    body = client.get("/api/activity/year-overview?format=compact", headers=headers).json()
+    assert "totals" not in body
+    assert body["totals_compact"]["encoding"] in ("bits", "u8", "u16")
+    assert body["habits"] and all("counts" not in habit for habit in body["habits"])
+
+    body = client.get("/api/activity/year-overview", headers=headers).json()
+    assert body["totals"] == {} and body["totals_compact"] is None
+    assert all(habit["counts"] == {} for habit in body["habits"])
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Checks for the in-process hive event broker (app/core/hive_events.py).
+Run: cd backend && python -m pytest test_hive_events.py
+"""
+
+import asyncio
+
+from app.core.hive_events import HiveEventBroker
+
+
+async def _connected() -> bool:
+    return False
+
+
+async def _collect(stream, limit: int = 10):
+    frames = []
+    async for frame in stream:
+        frames.append(frame)
+        if len(frames) >= limit:
+            break
+    return frames
+
+
+def test_leaving_member_stops_receiving():
+    async def run():
+        broker = HiveEventBroker()
+        leaver = asyncio.ensure_future(_collect(broker.stream("h1", _connected, user_id="a")))
+        stayer = asyncio.ensure_future(_collect(broker.stream("h1", _connected, user_id="b"), limit=3))
+        await asyncio.sleep(0)
+        assert broker.subscriber_count("h1") == 2
+
+        broker.publish("h1", "member_left", {"user_id": "a"})
+        assert broker.close("h1", "a") == 1
+        broker.publish("h1", "member_status", {"user_id": "b"})
+
+        left = await asyncio.wait_for(leaver, 1)
+        stayed = await asyncio.wait_for(stayer, 1)
+        return left, stayed, broker.subscriber_count("h1")
+
+    left, stayed, remaining = asyncio.run(run())
+    # The leaver sees its own member_left, then the stream ends
+    assert [frame.split(b"\n")[0] for frame in left] == [b"event: ready", b"event: member_left"]
+    assert [frame.split(b"\n")[0] for frame in stayed] == [
+        b"event: ready", b"event: member_left", b"event: member_status",
+    ]
+    assert remaining == 0
+
+
+def test_deleted_hive_closes_every_stream():
+    async def run():
+        broker = HiveEventBroker()
+        streams = [
+            asyncio.ensure_future(_collect(broker.stream("h1", _connected, user_id=user)))
+            for user in ("a", "b")
+        ]
+        await asyncio.sleep(0)
+        assert broker.close("h1") == 2
+        return await asyncio.wait_for(asyncio.gather(*streams), 1)
+
+    for frames in asyncio.run(run()):
+        assert len(frames) == 1
+
+
+def test_membership_is_rechecked_on_heartbeats():
+    checks = []
+
+    async def still_member() -> bool:
+        checks.append(True)
+        return len(checks) < 2
+
+    async def run():
+        broker = HiveEventBroker()
+        stream = broker.stream(
+            "h1", _connected, heartbeat=0.01, user_id="a",
+            still_member=still_member, membership_check=0,
+        )
+        frames = await asyncio.wait_for(_collect(stream), 1)
+        return frames, broker.subscriber_count()
+
+    frames, remaining = asyncio.run(run())
+    assert frames == [frames[0], b": keepalive\n\n"]
+    assert len(checks) == 2
+    assert remaining == 0
+
+
+def test_slow_subscriber_is_dropped():
+    async def run():
+        broker = HiveEventBroker(queue_size=2)
+        queue = broker.subscribe("h1", "a")
+        delivered = [broker.publish("h1", "member_status", {"n": n}) for n in range(3)]
+        return delivered, broker.subscriber_count(), queue.get_nowait(), queue.get_nowait()
+
+    delivered, remaining, first, last = asyncio.run(run())
+    assert delivered == [1, 1, 0]
+    assert remaining == 0
+    assert first.startswith(b"event: member_status") and last is None
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Checks for the hive_member_stats bitmask and window counts (app/core/leaderboard.py).
+Run: cd backend && python -m pytest test_leaderboard.py
+"""
+
+from datetime import date, timedelta
+
+from app.core.leaderboard import RECENT_DAYS, apply_member_day, rank_members, window_count
+
+TODAY = date(2026, 10, 19)
+
+
+def _stats(*offsets: int) -> dict:
+    """Stats for completions `offset` days before TODAY, logged in date order."""
+    stats: dict = {}
+    for offset in sorted(offsets, reverse=True):
+        apply_member_day(stats, TODAY - timedelta(days=offset), False, True)
+    return stats
+
+
+def test_mask_bits_follow_the_anchor():
+    stats = _stats(0, 1, 3)
+    assert stats["recent_anchor"] == TODAY
+    assert stats["recent_mask"] == 0b1011
+    assert stats["completed_total"] == 3
+    assert stats["last_completed_on"] == TODAY
+
+
+def test_window_popcounts():
+    stats = _stats(0, 1, 3, 6, 7, 29, 30)
+    assert window_count(stats, TODAY, 1) == 1
+    assert window_count(stats, TODAY, 7) == 4
+    assert window_count(stats, TODAY, 30) == 6
+    assert window_count(stats, TODAY, None) == 7
+
+
+def test_window_ending_before_the_anchor():
+    stats = _stats(0, 2, 3)
+    yesterday = TODAY - timedelta(days=1)
+    assert window_count(stats, yesterday, 1) == 0
+    assert window_count(stats, yesterday, 3) == 2
+
+
+def test_stale_anchor_shrinks_the_window():
+    # Nothing logged for two days: today and yesterday count as zero
+    stats = _stats(2, 3, 9)
+    assert window_count(stats, TODAY, 1) == 0
+    assert window_count(stats, TODAY, 3) == 1
+    assert window_count(stats, TODAY, 7) == 2
+    assert window_count(stats, TODAY + timedelta(days=RECENT_DAYS), 7) == 0
+
+
+def test_undo_and_late_logs():
+    stats = _stats(0, 1)
+    apply_member_day(stats, TODAY - timedelta(days=1), True, False)
+    assert stats["recent_mask"] == 0b1
+    assert stats["completed_total"] == 1
+
+    # A late log for an earlier day sets its bit without moving the anchor
+    apply_member_day(stats, TODAY - timedelta(days=5), False, True)
+    assert stats["recent_anchor"] == TODAY
+    assert window_count(stats, TODAY, 7) == 2
+    assert stats["last_completed_on"] == TODAY
+
+
+def test_bits_older_than_the_mask_fall_off():
+    stats = _stats(0)
+    apply_member_day(stats, TODAY + timedelta(days=RECENT_DAYS - 1), False, True)
+    assert stats["recent_mask"] == 1 << (RECENT_DAYS - 1) | 1
+    apply_member_day(stats, TODAY + timedelta(days=RECENT_DAYS), False, True)
+    assert stats["recent_mask"] == 0b11
+    assert stats["recent_mask"] < 1 << RECENT_DAYS
+    assert stats["completed_total"] == 3
+
+    # Days beyond the mask only count toward the all-time total
+    apply_member_day(stats, TODAY, True, False)
+    assert stats["recent_mask"] == 0b11
+    assert stats["completed_total"] == 2
+
+
+def test_long_gap_clears_the_mask():
+    stats = _stats(0, 1)
+    later = TODAY + timedelta(days=RECENT_DAYS + 10)
+    apply_member_day(stats, later, False, True)
+    assert stats["recent_mask"] == 1
+    assert window_count(stats, later, 30) == 1
+    assert window_count(stats, later, None) == 3
+
+
+def test_rank_sums_across_hives():
+    stats = [
+        {"hive_id": "h1", "user_id": "a", **_stats(0, 1)},
+        {"hive_id": "h2", "user_id": "a", **_stats(0)},
+        {"hive_id": "h1", "user_id": "b", **_stats(0, 1, 2, 3)},
+        {"hive_id": "h1", "user_id": "gone", **_stats(0, 1, 2, 3, 4)},
+    ]
+    members = [
+        {"hive_id": "h1", "user_id": "a"},
+        {"hive_id": "h2", "user_id": "a"},
+        {"hive_id": "h1", "user_id": "b"},
+        {"hive_id": "h2", "user_id": "c"},
+    ]
+    ranked = rank_members(stats, members, TODAY, "7d")
+    assert ranked == [
+        {"user_id": "b", "completed": 4, "hives": 1},
+        {"user_id": "a", "completed": 3, "hives": 2},
+        {"user_id": "c", "completed": 0, "hives": 1},
+    ]
+    assert [entry["completed"] for entry in rank_members(stats, members, TODAY, "today")] == [2, 1, 0]
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Checks for CSV habit history imports (app/core/log_import.py, POST /api/habits/import).
+Run: cd backend && python -m pytest test_log_import.py
+"""
+
+import asyncio
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.auth import create_test_token
+from app.core.config import settings
+from app.core.log_import import ImportTooLarge, read_csv
+
+
+def _read(body: bytes, chunk_size: int = 1, max_bytes: int = 1 << 20):
+    async def stream():
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+
+    async def collect():
+        return [record async for record in read_csv(stream(), max_bytes)]
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1 << 16])
+def test_records_survive_any_chunking(chunk_size):
+    body = (
+        '﻿Date,Habit,Value,Note\r\n'
+        '2026-01-01,Read,2,"first line\r\nsecond, line"\r\n'
+        '\r\n'
+        '2026-01-02,Café,1,"say ""hi"""\n'
+        '2026-01-03,Read,,last'
+    ).encode()
+    assert _read(body, chunk_size) == [
+        (2, {"log_date": "2026-01-01", "habit": "Read", "value": "2", "note": "first line\r\nsecond, line"}),
+        (5, {"log_date": "2026-01-02", "habit": "Café", "value": "1", "note": 'say "hi"'}),
+        (6, {"log_date": "2026-01-03", "habit": "Read", "value": "", "note": "last"}),
+    ]
+
+
+def test_stray_quote_in_an_unquoted_field_keeps_every_row():
+    body = b'log_date,habit\n2026-01-01,5" ruler\n2026-01-02,Read\n'
+    assert [row["habit"] for _, row in _read(body, 4)] == ['5" ruler', "Read"]
+
+
+def test_limits_and_empty_bodies():
+    with pytest.raises(ImportTooLarge):
+        _read(b"log_date\n" + b"2026-01-01\n" * 10, chunk_size=8, max_bytes=50)
+    with pytest.raises(ValueError, match="empty"):
+        _read(b"")
+    with pytest.raises(ValueError, match="line 2"):
+        _read(b"log_date,habit\n2026-01-01,a\rb\n")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "TEST_MODE", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", False)
+    from app.main import app
+    return TestClient(app)
+
+
+def _auth() -> dict:
+    return {"Authorization": f"Bearer {create_test_token(str(uuid.uuid4()), '+15550001111')}"}
+
+
+def test_import_writes_rows_and_reports_skips(client):
+    headers = _auth()
+    habit = client.post("/api/habits/", headers=headers, json={"name": "Read", "type": "counter", "target_per_day": 3}).json()
+    body = (
+        "date,habit,count\n"
+        "2026-01-01,read,2\n"
+        "2026-01-02,Read,9\n"
+        "2026-01-02,Read,1\n"
+        "2026-01-03,Run,1\n"
+        "not-a-date,Read,1\n"
+        "2026-01-04,Read,abc\n"
+        ",Read,1\n"
+        "2026-01-05,Read,-1\n"
+        "2026-01-06,Read,\n"
+    )
+    response = client.post("/api/habits/import", headers=headers, content=body.encode())
+    assert response.status_code == 200
+    assert response.json() == {
+        "imported": 3,
+        "skipped": 5,
+        "habits": 1,
+        "errors": [
+            "line 5: unknown habit",
+            "line 6: invalid date or value",
+            "line 7: invalid date or value",
+            "line 8: missing date or negative value",
+            "line 9: missing date or negative value",
+        ],
+    }
+
+    logs = client.get(f"/api/habits/{habit['id']}/logs?start_date=2026-01-01&end_date=2026-12-31", headers=headers).json()
+    # Later rows for a day win; values are capped at the target, blank is 1
+    assert [(log["log_date"], log["value"]) for log in logs] == [
+        ("2026-01-01", 2), ("2026-01-02", 1), ("2026-01-06", 1),
+    ]
+
+
+def test_import_into_one_habit_and_errors(client):
+    headers = _auth()
+    habit = client.post("/api/habits/", headers=headers, json={"name": "Walk", "type": "checkbox"}).json()
+    response = client.post(
+        f"/api/habits/import?habit_id={habit['id']}", headers=headers,
+        content=b"log_date\r\n2026-02-01\r\n2026-02-02\r\n",
+    )
+    assert response.json()["imported"] == 2
+
+    assert client.post(f"/api/habits/import?habit_id={uuid.uuid4()}", headers=headers, content=b"log_date\n").status_code == 404
+    assert client.post("/api/habits/import", headers=headers, content=b"").status_code == 400
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Checks for the per-viewer TTL + LRU profile caches (app/core/profile_cache.py).
+Run: cd backend && python -m pytest test_profile_cache.py
+"""
+
+import asyncio
+
+from app.core.profile_cache import ProfileCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Loader:
+    """Profiles visible per viewer, recording each load."""
+
+    def __init__(self, visible):
+        self.visible = visible
+        self.calls = []
+
+    def as_viewer(self, viewer: str):
+        async def load(user_ids):
+            self.calls.append((viewer, sorted(user_ids)))
+            return {uid: {"id": uid, "display_name": uid.upper()} for uid in user_ids if uid in self.visible[viewer]}
+        return load
+
+
+def _get(cache: ProfileCache, viewer: str, user_ids, loader: Loader):
+    return asyncio.run(cache.get_many(viewer, user_ids, loader.as_viewer(viewer)))
+
+
+def test_misses_are_loaded_once_then_served_from_cache():
+    cache = ProfileCache(max_entries=10, ttl_seconds=60, clock=Clock())
+    loader = Loader({"me": {"a", "b"}})
+    assert set(_get(cache, "me", ["a", "b"], loader)) == {"a", "b"}
+    assert set(_get(cache, "me", ["a", "b", "a"], loader)) == {"a", "b"}
+    assert loader.calls == [("me", ["a", "b"])]
+
+
+def test_rows_are_not_shared_across_viewers():
+    cache = ProfileCache(max_entries=10, ttl_seconds=60, clock=Clock())
+    loader = Loader({"friend": {"x"}, "stranger": set()})
+    assert set(_get(cache, "friend", ["x"], loader)) == {"x"}
+    # Loaded under the friend's RLS; the stranger must not see it
+    assert _get(cache, "stranger", ["x"], loader) == {}
+    assert loader.calls == [("friend", ["x"]), ("stranger", ["x"])]
+    # Hidden rows are not cached, so they are looked up again
+    _get(cache, "stranger", ["x"], loader)
+    assert len(loader.calls) == 3
+
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = ProfileCache(max_entries=10, ttl_seconds=60, clock=clock)
+    cache.put("me", "a", {"id": "a"})
+    clock.now = 59.9
+    assert cache.get("me", "a") == {"id": "a"}
+    clock.now = 60
+    assert cache.get("me", "a") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ProfileCache(max_entries=2, ttl_seconds=60, clock=Clock())
+    cache.put("me", "a", {"id": "a"})
+    cache.put("me", "b", {"id": "b"})
+    # Reading a makes b the least recently used
+    assert cache.get("me", "a")
+    cache.put("me", "c", {"id": "c"})
+    assert cache.get("me", "b") is None
+    assert cache.get("me", "a") and cache.get("me", "c")
+    assert len(cache) == 2
+
+
+def test_invalidate_drops_every_viewers_copy():
+    cache = ProfileCache(max_entries=10, ttl_seconds=60, clock=Clock())
+    for viewer in ("a", "b"):
+        cache.put(viewer, "x", {"id": "x"})
+    cache.put("a", "y", {"id": "y"})
+    cache.invalidate("x")
+    assert cache.get("a", "x") is None and cache.get("b", "x") is None
+    assert cache.get("a", "y") == {"id": "y"}
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ProfileCache(max_entries=0, ttl_seconds=60, clock=Clock())
+    cache.put("me", "a", {"id": "a"})
+    assert len(cache) == 0
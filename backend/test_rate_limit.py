@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Checks for the per-user token bucket rate limiter (app/core/rate_limit.py).
+Run: cd backend && python -m pytest test_rate_limit.py
+"""
+
+import asyncio
+import uuid
+
+import jwt
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.auth import create_test_token
+from app.core.config import settings
+from app.core.rate_limit import RateLimitMiddleware, TokenBucketLimiter, client_key, route_cost
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _take(limiter: TokenBucketLimiter, key: str, cost: float = 1) -> float:
+    return asyncio.run(limiter.take(key, cost))
+
+
+def test_burst_then_refill():
+    clock = Clock()
+    limiter = TokenBucketLimiter(rate=2, burst=4, clock=clock)
+    assert [_take(limiter, "a") for _ in range(4)] == [0, 0, 0, 0]
+    assert _take(limiter, "a") == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert _take(limiter, "a") == 0
+    assert _take(limiter, "a") > 0
+
+    # Refill stops at the burst size
+    clock.now += 100
+    assert [_take(limiter, "a") for _ in range(4)] == [0, 0, 0, 0]
+    assert _take(limiter, "a") > 0
+
+
+def test_cost_and_separate_keys():
+    clock = Clock()
+    limiter = TokenBucketLimiter(rate=1, burst=10, clock=clock)
+    assert _take(limiter, "a", 8) == 0
+    # 2 tokens left; a cost of 5 waits for 3 more
+    assert _take(limiter, "a", 5) == pytest.approx(3)
+    assert _take(limiter, "a", 2) == 0
+    assert _take(limiter, "b", 10) == 0
+    # Costs over the burst are capped so they can still be admitted
+    assert _take(limiter, "c", 50) == 0
+
+
+def test_least_recently_used_keys_are_dropped():
+    limiter = TokenBucketLimiter(rate=1, burst=1, max_keys=2, clock=Clock())
+    for key in ("a", "b", "c"):
+        _take(limiter, key)
+    assert list(limiter._buckets) == ["b", "c"]
+
+
+def test_route_costs():
+    assert route_cost("GET", "/api/hives/leaderboard") == 4
+    assert route_cost("GET", f"/api/hives/{uuid.uuid4()}") == 8
+    assert route_cost("POST", "/api/notifications/test") == 10
+    assert route_cost("GET", "/api/habits/") == 1
+
+
+@pytest.fixture
+def limited_client(monkeypatch):
+    monkeypatch.setattr(settings, "TEST_MODE", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/api/habits/")
+    async def habits():
+        return []
+
+    app.add_middleware(RateLimitMiddleware, limiter=TokenBucketLimiter(rate=0.5, burst=3, clock=Clock()))
+    return TestClient(app)
+
+
+def _auth(user_id: str) -> dict:
+    return {"Authorization": f"Bearer {create_test_token(user_id, '+15550001111')}"}
+
+
+def test_429_with_retry_after(limited_client):
+    headers = _auth(str(uuid.uuid4()))
+    assert [limited_client.get("/api/habits/", headers=headers).status_code for _ in range(3)] == [200] * 3
+    response = limited_client.get("/api/habits/", headers=headers)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+
+    # Another user has their own bucket
+    assert limited_client.get("/api/habits/", headers=_auth(str(uuid.uuid4()))).status_code == 200
+
+
+def test_exempt_paths(limited_client):
+    headers = _auth(str(uuid.uuid4()))
+    for _ in range(3):
+        limited_client.get("/api/habits/", headers=headers)
+    assert [limited_client.get("/health", headers=headers).status_code for _ in range(5)] == [200] * 5
+
+
+def test_forged_token_is_keyed_by_address(monkeypatch):
+    monkeypatch.setattr(settings, "TEST_MODE", True)
+    victim = str(uuid.uuid4())
+    forged = jwt.encode({"sub": victim}, "attacker-secret-0123456789abcdef0123", algorithm="HS256")
+
+    class FakeRequest:
+        def __init__(self, token):
+            self.headers = {"authorization": f"Bearer {token}"}
+            self.client = type("Client", (), {"host": "203.0.113.7"})()
+
+    assert client_key(FakeRequest(forged)) == "ip:203.0.113.7"
+    assert client_key(FakeRequest(create_test_token(victim, "+15550001111"))) == f"user:{victim}"
+
+
+def test_spoofed_forwarded_for_keeps_the_bucket(limited_client, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_PROXY_HOPS", 1)
+    statuses = [
+        limited_client.get(
+            "/api/habits/", headers={"X-Forwarded-For": f"198.51.100.{n}, 203.0.113.7"}
+        ).status_code
+        for n in range(5)
+    ]
+    # Rotating the client-written entries does not buy a fresh bucket
+    assert statuses == [200, 200, 200, 429, 429]
+    assert limited_client.get("/api/habits/", headers={"X-Forwarded-For": "203.0.113.8"}).status_code == 200
+
+    class FakeRequest:
+        headers = {"x-forwarded-for": "10.0.0.1"}
+        client = type("Client", (), {"host": "192.0.2.1"})()
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_PROXY_HOPS", 2)
+    assert client_key(FakeRequest()) == "ip:192.0.2.1"
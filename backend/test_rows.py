@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Checks for building response models from repository rows (app/models/rows.py)
+and the validated activity feed.
+Run: cd backend && python -m pytest test_rows.py
+"""
+
+import uuid
+from datetime import date, datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.core.auth import create_test_token
+from app.core.config import settings
+from app.models.rows import construct_rows, validate_rows
+from app.models.schemas import ActivityType, HabitLog
+
+
+def _log(**overrides) -> dict:
+    row = {
+        "id": str(uuid.uuid4()), "habit_id": str(uuid.uuid4()), "user_id": str(uuid.uuid4()),
+        "log_date": "2026-10-19", "value": 2, "source": "manual",
+        "created_at": "2026-10-19T08:30:00+00:00",
+    }
+    row.update(overrides)
+    return row
+
+
+def test_validate_rows_parses_backend_strings():
+    rows = [_log(), _log(log_date=date(2026, 10, 18))]
+    logs = validate_rows(HabitLog, rows)
+    assert [log.log_date for log in logs] == [date(2026, 10, 19), date(2026, 10, 18)]
+    assert logs[0].created_at == datetime(2026, 10, 19, 8, 30, tzinfo=timezone.utc)
+    assert logs[0].id == uuid.UUID(rows[0]["id"])
+    # Same models as the trusted construct path
+    assert [log.model_dump() for log in logs] == [log.model_dump() for log in construct_rows(HabitLog, rows)]
+
+
+def test_validate_rows_reports_the_bad_row():
+    with pytest.raises(ValidationError) as error:
+        validate_rows(HabitLog, [_log(), _log(value=0), _log(habit_id="not-a-uuid")])
+    assert {e["loc"][:2] for e in error.value.errors()} == {(1, "value"), (2, "habit_id")}
+
+
+def test_feed_validates_events_and_keeps_cursor_headers(monkeypatch):
+    monkeypatch.setattr(settings, "TEST_MODE", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", False)
+    from app.main import app
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_test_token(str(uuid.uuid4()), '+15550001111')}"}
+    hive_id = client.post("/api/hives/", headers=headers, json={"name": "Readers"}).json()["id"]
+    for _ in range(2):
+        response = client.post(
+            f"/api/activity/?event_type=hive_advanced&hive_id={hive_id}", headers=headers, json={"streak": 3},
+        )
+        assert response.status_code == 200, response.text
+
+    response = client.get(f"/api/activity/feed?hive_id={hive_id}&limit=1", headers=headers)
+    assert response.status_code == 200
+    assert "X-Next-Cursor" in response.headers and "X-Since-Cursor" in response.headers
+    [event] = response.json()
+    assert event["type"] == ActivityType.hive_advanced.value and event["data"] == {"streak": 3}
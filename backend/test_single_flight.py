@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Checks for coalescing concurrent repository reads (app/core/single_flight.py).
+Run: cd backend && python -m pytest test_single_flight.py
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.single_flight import SingleFlight, share_hive_reads, single_flight
+
+
+class Reads:
+    def __init__(self, user_id: str, calls: list, gate: asyncio.Event):
+        self.user_id = user_id
+        self.calls = calls
+        self.gate = gate
+
+    @single_flight()
+    async def membership(self, hive_id: str):
+        self.calls.append((self.user_id, hive_id))
+        await self.gate.wait()
+        return {"hive_id": hive_id, "user_id": self.user_id}
+
+    @single_flight(hive_scoped=True)
+    async def members(self, hive_ids):
+        self.calls.append((self.user_id, tuple(hive_ids)))
+        await self.gate.wait()
+        return [{"hive_id": hive_id, "roles": ["member"]} for hive_id in hive_ids]
+
+
+def test_concurrent_calls_share_one_read():
+    async def run():
+        calls, gate = [], asyncio.Event()
+        repo = Reads("a", calls, gate)
+        pending = [asyncio.ensure_future(repo.membership("h1")) for _ in range(5)]
+        await asyncio.sleep(0)
+        gate.set()
+        return calls, await asyncio.gather(*pending)
+
+    calls, results = asyncio.run(run())
+    assert calls == [("a", "h1")]
+    assert all(result == {"hive_id": "h1", "user_id": "a"} for result in results)
+
+
+def test_every_caller_gets_its_own_copy():
+    async def run():
+        flights = SingleFlight()
+        shared = [{"id": 1, "tags": ["x"]}]
+        gate = asyncio.Event()
+
+        async def read():
+            await gate.wait()
+            return shared
+
+        leader = asyncio.ensure_future(flights.do("k", read))
+        follower = asyncio.ensure_future(flights.do("k", read))
+        await asyncio.sleep(0)
+        gate.set()
+        first = await leader
+        # The leader mutates its result before the follower has resumed
+        first[0]["tags"].append("leader")
+        first.append({"id": 2})
+        return shared, first, await follower
+
+    shared, first, second = asyncio.run(run())
+    assert shared == [{"id": 1, "tags": ["x"]}]
+    assert second == [{"id": 1, "tags": ["x"]}]
+    assert first is not shared and second is not shared
+
+
+def test_reads_are_scoped_to_the_caller_until_membership_is_confirmed():
+    async def run(confirm: bool):
+        calls, gate = [], asyncio.Event()
+
+        async def request(user_id: str):
+            if confirm:
+                share_hive_reads("h1")
+            return await Reads(user_id, calls, gate).members(["h1"])
+
+        pending = [asyncio.ensure_future(request(user)) for user in ("a", "b")]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(*pending)
+        return calls
+
+    assert len(asyncio.run(run(confirm=False))) == 2
+    assert len(asyncio.run(run(confirm=True))) == 1
+
+
+def test_errors_reach_every_caller_and_the_key_is_released():
+    async def run():
+        flights = SingleFlight()
+        gate = asyncio.Event()
+
+        async def fail():
+            await gate.wait()
+            raise RuntimeError("boom")
+
+        pending = [asyncio.ensure_future(flights.do("k", fail)) for _ in range(3)]
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        await asyncio.sleep(0)
+        return results, len(flights)
+
+    results, in_flight = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert in_flight == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def run():
+        flights = SingleFlight()
+        gate = asyncio.Event()
+
+        async def read():
+            await gate.wait()
+            return {"ok": True}
+
+        leader = asyncio.ensure_future(flights.do("k", read))
+        follower = asyncio.ensure_future(flights.do("k", read))
+        await asyncio.sleep(0)
+        leader.cancel()
+        gate.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == {"ok": True}
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Parity checks for the in-process user day resolver (app/core/user_day.py)
+against SQL public.user_local_date, focused on DST transitions.
+Run: cd backend && python -m pytest test_user_day.py
+
+With DATABASE_URL set, every case is also swept in 15 minute steps across
+each transition and compared with the expression evaluated by Postgres.
+"""
+
+import asyncio
+import os
+from datetime import datetime, date, timedelta, timezone
+
+import pytest
+
+from app.core.user_day import local_date
+
+UTC = timezone.utc
+
+# (timezone, day_start_hour, instant, expected day); None means "unset" and
+# exercises the SQL coalesce defaults ('UTC', 4).
+CASES = [
+    # Defaults
+    (None, None, datetime(2025, 6, 1, 3, 59, tzinfo=UTC), date(2025, 5, 31)),
+    (None, None, datetime(2025, 6, 1, 4, 0, tzinfo=UTC), date(2025, 6, 1)),
+    ("UTC", 0, datetime(2025, 6, 1, 0, 0, tzinfo=UTC), date(2025, 6, 1)),
+    # America/New_York spring forward, 2025-03-09 02:00 EST -> 03:00 EDT (07:00Z).
+    # The offset comes off the wall clock, so 04:30 EDT is already the new day.
+    ("America/New_York", 4, datetime(2025, 3, 9, 7, 59, tzinfo=UTC), date(2025, 3, 8)),
+    ("America/New_York", 4, datetime(2025, 3, 9, 8, 0, tzinfo=UTC), date(2025, 3, 9)),
+    ("America/New_York", 4, datetime(2025, 3, 9, 8, 30, tzinfo=UTC), date(2025, 3, 9)),
+    # America/New_York fall back, 2025-11-02 02:00 EDT -> 01:00 EST (06:00Z)
+    ("America/New_York", 4, datetime(2025, 11, 2, 5, 30, tzinfo=UTC), date(2025, 11, 1)),
+    ("America/New_York", 4, datetime(2025, 11, 2, 6, 30, tzinfo=UTC), date(2025, 11, 1)),
+    ("America/New_York", 4, datetime(2025, 11, 2, 8, 59, tzinfo=UTC), date(2025, 11, 1)),
+    ("America/New_York", 4, datetime(2025, 11, 2, 9, 0, tzinfo=UTC), date(2025, 11, 2)),
+    # Day start inside the skipped / repeated hour
+    ("America/New_York", 2, datetime(2025, 3, 9, 6, 59, tzinfo=UTC), date(2025, 3, 8)),
+    ("America/New_York", 2, datetime(2025, 3, 9, 7, 0, tzinfo=UTC), date(2025, 3, 9)),
+    ("America/New_York", 1, datetime(2025, 11, 2, 5, 0, tzinfo=UTC), date(2025, 11, 2)),
+    ("America/New_York", 1, datetime(2025, 11, 2, 6, 0, tzinfo=UTC), date(2025, 11, 2)),
+    # Europe/London spring forward, 2025-03-30 01:00 GMT -> 02:00 BST (01:00Z)
+    ("Europe/London", 4, datetime(2025, 3, 30, 2, 59, tzinfo=UTC), date(2025, 3, 29)),
+    ("Europe/London", 4, datetime(2025, 3, 30, 3, 0, tzinfo=UTC), date(2025, 3, 30)),
+    # Europe/London fall back, 2025-10-26 02:00 BST -> 01:00 GMT (01:00Z)
+    ("Europe/London", 4, datetime(2025, 10, 26, 3, 59, tzinfo=UTC), date(2025, 10, 25)),
+    ("Europe/London", 4, datetime(2025, 10, 26, 4, 0, tzinfo=UTC), date(2025, 10, 26)),
+    # Southern hemisphere: Australia/Sydney, 2025-04-06 03:00 AEDT -> 02:00 AEST (16:00Z)
+    ("Australia/Sydney", 4, datetime(2025, 4, 5, 17, 59, tzinfo=UTC), date(2025, 4, 5)),
+    ("Australia/Sydney", 4, datetime(2025, 4, 5, 18, 0, tzinfo=UTC), date(2025, 4, 6)),
+    # Half-hour DST shift: Australia/Lord_Howe, 2025-10-05 02:00 -> 02:30 (2025-10-04 15:30Z)
+    ("Australia/Lord_Howe", 4, datetime(2025, 10, 4, 16, 59, tzinfo=UTC), date(2025, 10, 4)),
+    ("Australia/Lord_Howe", 4, datetime(2025, 10, 4, 17, 0, tzinfo=UTC), date(2025, 10, 5)),
+    # Fractional offset without DST
+    ("Asia/Kolkata", 0, datetime(2025, 1, 1, 18, 29, tzinfo=UTC), date(2025, 1, 1)),
+    ("Asia/Kolkata", 0, datetime(2025, 1, 1, 18, 30, tzinfo=UTC), date(2025, 1, 2)),
+]
+
+SQL_USER_LOCAL_DATE = """
+select (($1::timestamptz at time zone coalesce($2::text, 'UTC'))
+        - make_interval(hours => coalesce($3::int, 4)))::date
+"""
+
+
+@pytest.mark.parametrize("tz, day_start_hour, at, expected", CASES)
+def test_known_days(tz, day_start_hour, at, expected):
+    """Hand-checked days around DST transitions"""
+    assert local_date({"timezone": tz, "day_start_hour": day_start_hour}, at) == expected
+
+
+def test_naive_instants_are_utc():
+    """Naive datetimes are treated as UTC, like timestamptz input"""
+    naive = datetime(2025, 3, 9, 8, 30)
+    assert local_date({"timezone": "America/New_York"}, naive) == local_date(
+        {"timezone": "America/New_York"}, naive.replace(tzinfo=UTC)
+    )
+
+
+async def _sql_sweep(dsn: str):
+    import asyncpg
+
+    conn = await asyncpg.connect(dsn)
+    try:
+        mismatches = []
+        for tz, day_start_hour, at, _ in CASES:
+            profile = {"timezone": tz, "day_start_hour": day_start_hour}
+            for step in range(-16, 17):
+                instant = at + timedelta(minutes=15 * step)
+                expected = await conn.fetchval(SQL_USER_LOCAL_DATE, instant, tz, day_start_hour)
+                actual = local_date(profile, instant)
+                if actual != expected:
+                    mismatches.append(f"{tz} start={day_start_hour} at={instant.isoformat()}: {actual} != {expected}")
+        return mismatches
+    finally:
+        await conn.close()
+
+
+@pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL not set")
+def test_sql_parity():
+    """Sweep every case against Postgres"""
+    assert asyncio.run(_sql_sweep(os.environ["DATABASE_URL"])) == []